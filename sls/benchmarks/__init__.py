@@ -0,0 +1,4 @@
+"""
+Benchmarks, run as modules from the repository root. Ex:
+python -m sls.benchmarks.bench_alarm_rules
+"""
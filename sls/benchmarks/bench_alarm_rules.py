@@ -0,0 +1,115 @@
+# pylint: disable=missing-function-docstring, import-error, wrong-import-position
+"""
+Microbenchmark of the alarm rule engine against the former Jinja template rendering
+
+Both sides get the same prefetched discovery data, so only the generation of the
+alarms configuration is measured.
+
+    python -m sls.benchmarks.bench_alarm_rules [--repeat 200]
+"""
+import argparse
+import json
+import os
+import timeit
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import get_alarm_rule_engine, LINUX
+
+THISDIR = os.path.dirname(__file__)  # benchmarks/
+HOSTNAME = "AWS000testing"
+INSTANCE_ID = "i-0123456789abcdef0"
+SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:123456789012:alarms"
+
+
+def get_discovered_filesystems(mounts):
+    return [{"alarmName": f"itx-alarms-{HOSTNAME}-fs{number}-DiskSpaceGt85PercentFor60Mins-uuid",
+             "dimensionValue": f"fs{number}",
+             "dimensions": [{"Name": "InstanceId", "Value": INSTANCE_ID},
+                            {"Name": "Filesystem", "Value": f"/dev/fs{number}"}]}
+            for number in range(mounts)]
+
+
+class TemplateInstance:
+    """
+    Stand-in exposing what the Jinja template used to call on EC2Metrics
+    """
+
+    def __init__(self, filesystems):
+        self.hostname = HOSTNAME
+        self.filesystems = [dict(metric, dimensions=json.dumps(metric["dimensions"]))
+                            for metric in filesystems]
+
+    @staticmethod
+    def is_windows_platform():
+        return False
+
+    @staticmethod
+    def get_partition_config():
+        return []
+
+    def get_disk_space_config(self):
+        return self.filesystems
+
+    @staticmethod
+    def get_memory_namespace():
+        return "System/Linux"
+
+    @staticmethod
+    def get_default_actions():
+        return f""" "AlarmActions": ["{SNS_TOPIC_ARN}"],
+        "OKActions": ["{SNS_TOPIC_ARN}"]"""
+
+    @staticmethod
+    def get_base_dimension():
+        return f""""Dimensions":[
+                    {{"Name": "InstanceId",
+                        "Value": "{INSTANCE_ID}"
+                    }}
+                    ]"""
+
+    def generate_alarm_prefix(self):
+        return f"itx-alarms-{self.hostname}"
+
+
+def generate_with_template(instance):
+    fileloader = FileSystemLoader(searchpath=f"{THISDIR}/templates")
+    template_env = Environment(loader=fileloader, trim_blocks=True,
+                               lstrip_blocks=True, autoescape=select_autoescape(['html', 'xml']))
+    alarm_config_template = template_env.get_template("alarm_config_template.jinja2")
+    return json.loads(alarm_config_template.render(instance=instance))
+
+
+def generate_with_rules(filesystems):
+    context = {"hostname": HOSTNAME, "prefix": f"itx-alarms-{HOSTNAME}", "platform": LINUX,
+               "instance_id": INSTANCE_ID, "sns_topic_arn": SNS_TOPIC_ARN,
+               "memory_namespace": "System/Linux"}
+    return get_alarm_rule_engine().generate(context, {"filesystems": filesystems})
+
+
+def run(mounts_list, repeat):
+    print(f"{'mounts':>6} {'alarms':>6} {'template ms':>12} {'rules ms':>9} {'speedup':>8}")
+    for mounts in mounts_list:
+        filesystems = get_discovered_filesystems(mounts)
+        instance = TemplateInstance(filesystems)
+        template_conf = generate_with_template(instance)
+        rules_conf = generate_with_rules(filesystems)
+        assert sorted(template_conf) == sorted(rules_conf)
+        template_time = min(timeit.repeat(lambda: generate_with_template(instance),
+                                          number=repeat, repeat=3)) / repeat
+        rules_time = min(timeit.repeat(lambda: generate_with_rules(filesystems),
+                                       number=repeat, repeat=3)) / repeat
+        print(f"{mounts:>6} {len(rules_conf):>6} {template_time * 1000:>12.3f} "
+              f"{rules_time * 1000:>9.3f} {template_time / rules_time:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--mounts", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.mounts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# pylint: disable=missing-function-docstring, invalid-name, import-error, wrong-import-position
+"""
+Benchmark of EC2Metrics.put_alarms with the thread pool against the asyncio path
+
+A stand-in CloudWatch client answers PutMetricAlarm and DescribeAlarms after a fixed
+latency, so only the concurrency of the I/O path is measured. Three variants run:
+threads (ThreadPoolExecutor per host), asyncio with the boto3 client on a bounded
+executor, and asyncio with a coroutine client standing in for aiobotocore.
+
+    python -m sls.benchmarks.bench_async_io [--alarms 10 100 500] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+
+from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
+from sls.utils.aio import AsyncCloudWatchClient, THREAD_IO, ASYNC_IO, run_coroutine
+from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.utils.logger import Logger
+
+INSTANCE = {"InstanceId": "i-0123456789abcdef0"}
+
+
+class StandInCloudWatch:
+    """
+    Blocking client storing the alarms in memory
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.alarms = set()
+        self.lock = threading.Lock()
+
+    def put_metric_alarm(self, AlarmName, **kwargs):
+        time.sleep(self.latency)
+        with self.lock:
+            self.alarms.add(AlarmName)
+
+    def describe_alarms(self, AlarmNames, **kwargs):
+        time.sleep(self.latency)
+        return {"MetricAlarms": [{"AlarmName": name} for name in AlarmNames
+                                 if name in self.alarms]}
+
+
+class NativeStandInCloudWatch(StandInCloudWatch):
+    """
+    Coroutine client, awaited directly by AsyncClient
+    """
+
+    async def put_metric_alarm(self, AlarmName, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.alarms.add(AlarmName)
+
+    async def describe_alarms(self, AlarmNames, **kwargs):
+        await asyncio.sleep(self.latency)
+        return {"MetricAlarms": [{"AlarmName": name} for name in AlarmNames
+                                 if name in self.alarms]}
+
+
+def get_cloudwatch_client(client, logger):
+    cloudwatch_client = CloudWatchClient.__new__(CloudWatchClient)
+    cloudwatch_client.client = client
+    cloudwatch_client.logger = logger
+    return cloudwatch_client
+
+
+def get_alarms_conf(alarms):
+    return {f"itx-alarms-bench-{number}": {"MetricName": "CPUUtilization"}
+            for number in range(alarms)}
+
+
+def put_alarms(client, io_mode, alarms_conf, concurrency):
+    logger = Logger()
+    cloudwatch_client = get_cloudwatch_client(client, logger)
+    ec2_metrics = EC2Metrics(None, "us-east-1", "bench", "sns", logger, instance=INSTANCE,
+                             cloudwatch_client=cloudwatch_client, io_mode=io_mode)
+    start = time.perf_counter()
+    if io_mode == ASYNC_IO:
+        async def put():
+            aio_cloudwatch = AsyncCloudWatchClient(cloudwatch_client, concurrency)
+            try:
+                return await ec2_metrics.put_alarms_async(alarms_conf, aio_cloudwatch)
+            finally:
+                aio_cloudwatch.close()
+        report = run_coroutine(put())
+    else:
+        report = ec2_metrics.put_alarms(alarms_conf)
+    elapsed = time.perf_counter() - start
+    assert len(report["created"]) == len(alarms_conf)
+    return elapsed
+
+
+def run(alarms_list, latency, concurrency):
+    logging.getLogger("sls.utils.logger").setLevel(logging.WARNING)
+    print(f"{'alarms':>6} {'threads ms':>11} {'asyncio ms':>11} {'native ms':>10}")
+    for alarms in alarms_list:
+        alarms_conf = get_alarms_conf(alarms)
+        thread_time = put_alarms(StandInCloudWatch(latency), THREAD_IO,
+                                 alarms_conf, concurrency)
+        async_time = put_alarms(StandInCloudWatch(latency), ASYNC_IO,
+                                alarms_conf, concurrency)
+        native_time = put_alarms(NativeStandInCloudWatch(latency), ASYNC_IO,
+                                 alarms_conf, concurrency)
+        print(f"{alarms:>6} {thread_time * 1000:>11.1f} {async_time * 1000:>11.1f} "
+              f"{native_time * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--alarms", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    run(args.alarms, args.latency, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+# pylint: disable=missing-function-docstring, missing-class-docstring, invalid-name, unused-argument, import-error
+"""
+End to end benchmark of the create and delete alarms Lambda handlers
+
+Events shaped like common_bdd/events/event.json are replayed in process against
+stand-ins for CloudWatch, EC2, resource groups tagging, Secrets Manager and vpcxiam.
+For each number of discovered filesystems the benchmark reports:
+  - cold latency: first request after the container caches are dropped
+  - warm latency percentiles
+  - AWS calls per cold and warm request
+  - peak traced memory of a warm request
+
+    python -m sls.benchmarks.bench_handlers [--mounts 1 10 100] [--requests 50]
+"""
+import argparse
+import collections
+import copy
+import json
+import logging
+import os
+import time
+import tracemalloc
+import types
+from unittest.mock import patch
+
+from botocore.hooks import HierarchicalEmitter
+
+from sls.ec2_alarms_api.create_ec2_alarms import index as create_index
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import get_alarm_rule_engine
+from sls.ec2_alarms_api.delete_ec2_alarms import index as delete_index
+from sls.utils.aws_creds import CREDENTIALS_CACHE
+from sls.utils.aws_ec2 import INSTANCE_TYPE_CATALOG
+from sls.utils.aws_regions import REGION_CATALOG
+from sls.utils.client_pool import CLIENT_POOL, Boto3ClientPool
+from sls.utils.hostname_index import HOSTNAME_INDEX
+from sls.utils.metric_discovery_cache import METRIC_DISCOVERY_CACHE
+from sls.utils.secret_cache import SECRET_CACHE
+
+THISDIR = os.path.dirname(__file__)  # benchmarks/
+EVENT_FILE = os.path.join(THISDIR, "..", "ec2_alarms_api", "common_bdd", "events", "event.json")
+HOSTNAME = "AWS000bench"
+INSTANCE_ID = "i-0123456789abcdef0"
+SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:123456789012:alarms"
+ENVIRONMENT = {
+    "AZURE_AUTH_SECRET_NAME": "azure-auth",
+    "LDAP_GROUP_NAME": "{project_id}-admins",
+    "vpcxiam_endpoint": "https://vpcxiam.local",
+    "vpcxiam_scope": "scope",
+    "vpcxiam_host": "vpcxiam.local",
+}
+
+
+class ResourceNotFound(Exception):
+    pass
+
+
+class StandInPaginator:
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **kwargs):
+        yield self.method(**kwargs)
+
+
+class StandInClient:
+    """
+    Base of the stand-in clients, counts the calls by service and operation
+    """
+
+    def __init__(self, service_name, world):
+        self.service_name = service_name
+        self.world = world
+        self.meta = types.SimpleNamespace(events=HierarchicalEmitter())
+        self.exceptions = types.SimpleNamespace(ResourceNotFound=ResourceNotFound)
+
+    def get_paginator(self, operation):
+        return StandInPaginator(getattr(self, operation))
+
+    def count(self, operation):
+        self.world.calls[f"{self.service_name}.{operation}"] += 1
+
+
+class StandInCloudWatch(StandInClient):
+    def put_metric_alarm(self, AlarmName, **kwargs):
+        self.count("PutMetricAlarm")
+        self.world.alarms[AlarmName] = dict(kwargs, AlarmName=AlarmName)
+
+    def describe_alarms(self, AlarmNames=None, AlarmNamePrefix=None, **kwargs):
+        self.count("DescribeAlarms")
+        if AlarmNames is not None:
+            names = [name for name in AlarmNames if name in self.world.alarms]
+        else:
+            names = [name for name in self.world.alarms if name.startswith(AlarmNamePrefix or "")]
+        return {"MetricAlarms": [self.world.alarms[name] for name in sorted(names)]}
+
+    def delete_alarms(self, AlarmNames):
+        self.count("DeleteAlarms")
+        for name in AlarmNames:
+            self.world.alarms.pop(name, None)
+
+    def list_metrics(self, MetricName, Dimensions, **kwargs):
+        self.count("ListMetrics")
+        if MetricName != "DiskSpaceUtilization":
+            return {"Metrics": []}
+        return {"Metrics": [{"Namespace": "System/Linux", "MetricName": MetricName,
+                             "Dimensions": [{"Name": "InstanceId", "Value": INSTANCE_ID},
+                                            {"Name": "Filesystem", "Value": f"/dev/fs{number}"}]}
+                            for number in range(self.world.mounts)]}
+
+
+class StandInEC2(StandInClient):
+    def describe_instances(self, Filters, **kwargs):
+        self.count("DescribeInstances")
+        instance = {"InstanceId": INSTANCE_ID, "InstanceType": "t3.micro",
+                    "State": {"Code": 16, "Name": "running"},
+                    "Tags": [{"Key": "Hostname", "Value": HOSTNAME}]}
+        return {"Reservations": [{"Instances": [instance]}]}
+
+
+class StandInTagging(StandInClient):
+    def get_resources(self, **kwargs):
+        self.count("GetResources")
+        return {"ResourceTagMappingList": [{"ResourceARN": SNS_TOPIC_ARN}]}
+
+
+class StandInSecretsManager(StandInClient):
+    def get_secret_value(self, SecretId):
+        self.count("GetSecretValue")
+        return {"SecretString": json.dumps({"client_secret": "secret"}), "VersionId": "1"}
+
+
+class StandInAws:
+    """
+    In-memory AWS account with the call counters of every stand-in
+    """
+
+    CLIENTS = {"cloudwatch": StandInCloudWatch, "ec2": StandInEC2,
+               "resourcegroupstaggingapi": StandInTagging, "secretsmanager": StandInSecretsManager}
+
+    def __init__(self, mounts):
+        self.mounts = mounts
+        self.alarms = {}
+        self.calls = collections.Counter()
+
+    def create_client(self, service_name, region, credentials):
+        return self.CLIENTS[service_name](service_name, self)
+
+    def vpcxiam_request(self, method, url, **kwargs):
+        self.calls["vpcxiam.GetCredentials"] += 1
+        credentials = {"AccessKeyId": "bench", "SecretAccessKey": "bench",
+                       "SessionToken": "bench", "Expiration": time.time() + 3600}
+        return types.SimpleNamespace(status_code=200,
+                                     text=json.dumps({"credentials": credentials}))
+
+
+def get_event():
+    with open(EVENT_FILE) as event_file:
+        event = json.load(event_file)
+    event["pathParameters"]["ec2_hostname"] = HOSTNAME
+    return event
+
+
+def drop_container_caches():
+    CLIENT_POOL.clear()
+    CREDENTIALS_CACHE.invalidate()
+    SECRET_CACHE.invalidate()
+    HOSTNAME_INDEX.invalidate()
+    INSTANCE_TYPE_CATALOG.clear()
+    REGION_CATALOG.invalidate()
+    METRIC_DISCOVERY_CACHE.invalidate()
+    get_alarm_rule_engine.cache_clear()
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def invoke(handler, event, world):
+    calls_before = sum(world.calls.values())
+    start = time.perf_counter()
+    output = handler(copy.deepcopy(event), None)
+    elapsed = time.perf_counter() - start
+    assert output["statusCode"] == 200, output
+    return elapsed, sum(world.calls.values()) - calls_before
+
+
+def bench_handler(name, handler, world, requests, cold_runs, setup=None):
+    """
+    Returns:
+        dict: cold and warm latencies in ms, calls per request and peak memory in KiB
+    """
+    event = get_event()
+    cold, cold_calls = [], []
+    for _ in range(cold_runs):
+        if setup:
+            setup()
+        drop_container_caches()
+        elapsed, calls = invoke(handler, event, world)
+        cold.append(elapsed * 1000)
+        cold_calls.append(calls)
+
+    warm, warm_calls = [], []
+    for _ in range(requests):
+        if setup:
+            setup()
+        elapsed, calls = invoke(handler, event, world)
+        warm.append(elapsed * 1000)
+        warm_calls.append(calls)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    invoke(handler, event, world)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"handler": name, "cold_p50": percentile(cold, 50), "cold_max": max(cold),
+            "warm_p50": percentile(warm, 50), "warm_p95": percentile(warm, 95),
+            "warm_p99": percentile(warm, 99), "cold_calls": max(cold_calls),
+            "warm_calls": max(warm_calls), "peak_kib": peak / 1024}
+
+
+def run(mounts_list, requests, cold_runs):
+    logging.disable(logging.INFO)
+    os.environ.update({key: value for key, value in ENVIRONMENT.items()
+                       if key not in os.environ})
+    print(f"{'handler':>7} {'mounts':>6} {'cold p50':>9} {'cold max':>9} {'warm p50':>9} "
+          f"{'warm p95':>9} {'warm p99':>9} {'cold calls':>10} {'warm calls':>10} {'peak KiB':>9}")
+    for mounts in mounts_list:
+        world = StandInAws(mounts)
+        with patch.object(Boto3ClientPool, "_create_client", world.create_client), \
+                patch("sls.utils.api_request.req", world.vpcxiam_request):
+            create_alarms = lambda: create_index.handler(get_event(), None)
+            results = [bench_handler("create", create_index.handler, world, requests, cold_runs),
+                       bench_handler("delete", delete_index.handler, world, requests, cold_runs,
+                                     setup=create_alarms)]
+        drop_container_caches()
+        for result in results:
+            print(f"{result['handler']:>7} {mounts:>6} {result['cold_p50']:>9.2f} "
+                  f"{result['cold_max']:>9.2f} {result['warm_p50']:>9.2f} "
+                  f"{result['warm_p95']:>9.2f} {result['warm_p99']:>9.2f} "
+                  f"{result['cold_calls']:>10} {result['warm_calls']:>10} "
+                  f"{result['peak_kib']:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mounts", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--cold", type=int, default=5)
+    args = parser.parse_args()
+    run(args.mounts, args.requests, args.cold)
+
+
+if __name__ == "__main__":
+    main()
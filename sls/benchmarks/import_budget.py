@@ -0,0 +1,100 @@
+# pylint: disable=missing-function-docstring, import-error
+"""
+Import-time budget of the Lambda handlers
+
+Each handler module is imported in a fresh interpreter with python -X importtime.
+The check fails when an import takes longer than the budget or pulls in a module
+that must stay out of the cold-start import graph.
+
+    python -m sls.benchmarks.import_budget [--budget-ms 400] [--top 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HANDLER_MODULES = (
+    "sls.ec2_alarms_api.create_ec2_alarms.index",
+    "sls.ec2_alarms_api.batch_create_ec2_alarms.index",
+    "sls.ec2_alarms_api.delete_ec2_alarms.index",
+    "sls.ec2_alarms_api.alarm_job_worker.index",
+    "sls.ec2_alarms_api.get_alarm_job.index",
+    "sls.ec2_alarms_api.ec2_state_change_alarms.index",
+    "sls.ec2_alarms_api.alarm_sweeper.index",
+    "sls.ec2_alarms_api.multi_account_create_ec2_alarms.index",
+    "sls.ec2_alarms_api.alarm_name_migration.index",
+)
+# Modules only needed by tooling, tests or on a cold credentials fetch
+FORBIDDEN_MODULES = ("flask", "werkzeug", "jinja2", "requests")
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "400"))
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def parse_importtime(output):
+    """
+    Parse the stderr of python -X importtime
+
+    Returns:
+        dict: (self us, cumulative us) by module name
+    """
+    imports = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return imports
+
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter
+
+    Returns:
+        dict: (self us, cumulative us) by imported module name
+    """
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT_DIR, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def check_budget(modules=HANDLER_MODULES, budget_ms=IMPORT_BUDGET_MS):
+    """
+    Returns:
+        tuple: import report by module, list of budget violations
+    """
+    reports, violations = {}, []
+    for module in modules:
+        imports = measure_import(module)
+        reports[module] = imports
+        total_ms = imports[module][1] / 1000
+        if total_ms > budget_ms:
+            violations.append(f"{module} imports in {total_ms:.0f} ms, budget {budget_ms:.0f} ms")
+        forbidden = sorted(name for name in imports if name in FORBIDDEN_MODULES)
+        if forbidden:
+            violations.append(f"{module} imports {', '.join(forbidden)}")
+    return reports, violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    reports, violations = check_budget(budget_ms=args.budget_ms)
+    for module, imports in reports.items():
+        print(f"{module}: {imports[module][1] / 1000:.1f} ms, {len(imports)} modules")
+        slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (self_us, _) in slowest[:args.top]:
+            print(f"    {self_us / 1000:>8.1f} ms  {name}")
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+
+from sls.benchmarks.import_budget import check_budget, parse_importtime
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   sls.utils.logger
+import time:       300 |        420 | sls.utils
+"""
+
+
+class TestImportBudget(unittest.TestCase):
+    def test_parse_importtime(self):
+        self.assertEqual(parse_importtime(IMPORTTIME_OUTPUT),
+                         {"sls.utils.logger": (120, 120), "sls.utils": (300, 420)})
+
+    def test_handlers_within_budget(self):
+        # A wide budget on shared runners, the forbidden modules are checked exactly
+        _, violations = check_budget(budget_ms=2000)
+        self.assertEqual(violations, [])
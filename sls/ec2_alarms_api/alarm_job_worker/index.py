@@ -0,0 +1,90 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
+"""
+Worker running the asynchronous alarm jobs queued by the EC2Alarms endpoints
+"""
+import importlib
+import json
+
+from sls.utils.jobs import (get_job_queue, get_job_store, JobProgress, JOB_SUCCEEDED, JOB_FAILED,
+                            JOB_MAX_ATTEMPTS)
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+# Operation name: (handler module, function called with the job event and a progress callable)
+JOB_OPERATIONS = {
+    "create_ec2_alarms": ("sls.ec2_alarms_api.create_ec2_alarms.index", "create_alarms"),
+    "batch_create_ec2_alarms": ("sls.ec2_alarms_api.batch_create_ec2_alarms.index",
+                                "create_alarms_batch"),
+    "delete_ec2_alarms": ("sls.ec2_alarms_api.delete_ec2_alarms.index", "delete_alarms"),
+}
+
+
+def get_operation(operation):
+    """
+    Returns:
+        callable: function of the operation, its module is imported on first use
+    """
+    module_name, function_name = JOB_OPERATIONS[operation]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_job(job_id, store=None):
+    """
+    Claim a queued job and run it, recording its progress, result or error in the job
+    store. A job that another worker claimed, ex: a message delivered twice, is skipped.
+    A job still running past its deadline was left by a worker that timed out: it is
+    run again, or marked failed after JOB_MAX_ATTEMPTS claims.
+
+    Args:
+        job_id: id of the job
+        store: job store, get_job_store() when None
+
+    Returns:
+        str: final status of the job, None when the job was skipped
+    """
+    store = store or get_job_store()
+    job = store.claim(job_id)
+    if job is None:
+        logger.info(f"Skipping job {job_id}: not found or claimed by another worker")
+        return None
+    event = job["event"]
+    logger.set_uuid(event["headers"]["request-context-id"])
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        logger.error(f"Job {job_id} failed: timed out {JOB_MAX_ATTEMPTS} times")
+        store.update(job_id, status=JOB_FAILED,
+                     error=f"Timed out after {JOB_MAX_ATTEMPTS} attempts")
+        return JOB_FAILED
+    TRACER.start_trace(logger.get_uuid())
+    progress = JobProgress(store, job_id)
+    try:
+        with TRACER.span("job", operation=job["operation"]):
+            result = get_operation(job["operation"])(event, progress=progress)
+        store.update(job_id, status=JOB_SUCCEEDED, result=result, progress=progress.summary())
+        return JOB_SUCCEEDED
+    except Exception as exc:
+        logger.error(f"Job {job_id} failed: {exc}")
+        store.update(job_id, status=JOB_FAILED, error=str(exc), progress=progress.summary())
+        return JOB_FAILED
+    finally:
+        TRACER.end_trace()
+
+
+def process_queue(queue=None, store=None, max_messages=10):
+    """
+    Run the jobs waiting in a queue that is polled, ex: the in-memory queue
+
+    Returns:
+        dict: final status by job id
+    """
+    queue = queue or get_job_queue()
+    return {message["job_id"]: run_job(message["job_id"], store)
+            for message in queue.receive(max_messages)}
+
+
+def handler(event, context):
+    """
+    SQS entry function, each record is a job message
+    """
+    for record in event.get("Records", []):
+        run_job(json.loads(record["body"])["job_id"])
@@ -0,0 +1,95 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sls.ec2_alarms_api.alarm_job_worker.index import process_queue, run_job, handler
+from sls.ec2_alarms_api.get_alarm_job.index import get_alarm_job
+from sls.utils.jobs import InMemoryJobQueue, InMemoryJobStore, submit_job
+from sls.utils.lambda_handler_helper import process_api_request
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+EVENT = {
+    "pathParameters": {"account_id": "itx-000", "region_name": "us-east-1",
+                       "ec2_hostname": "AWS000testing"},
+    "queryStringParameters": {"async": "true"}
+}
+
+
+def create_alarms(event, progress=None):
+    progress("AWS000testing", "alarm1", "created")
+    progress("AWS000testing", "alarm2", "created")
+    return "Alarms created for AWS000testing"
+
+
+def delete_alarms(event, progress=None):
+    raise Exception("Some alarms not deleted")
+
+
+class TestAlarmJobWorker(unittest.TestCase):
+    def setUp(self):
+        self.queue, self.store = InMemoryJobQueue(), InMemoryJobStore()
+        patchers = [patch("sls.utils.jobs.get_job_queue", return_value=self.queue),
+                    patch("sls.utils.jobs.get_job_store", return_value=self.store),
+                    patch("sls.ec2_alarms_api.alarm_job_worker.index.get_job_queue",
+                          return_value=self.queue),
+                    patch("sls.ec2_alarms_api.alarm_job_worker.index.get_job_store",
+                          return_value=self.store),
+                    patch("sls.ec2_alarms_api.get_alarm_job.index.get_job_store",
+                          return_value=self.store),
+                    patch.object(TRACER, "exporter", MagicMock()),
+                    patch("sls.utils.lambda_handler_helper.authorize_lambda"),
+                    patch("sls.utils.lambda_handler_helper.is_region_valid", return_value=True),
+                    patch("sls.ec2_alarms_api.alarm_job_worker.index.get_operation",
+                          side_effect={"create_ec2_alarms": create_alarms,
+                                       "delete_ec2_alarms": delete_alarms}.get)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_async_request_accepted_then_run(self):
+        response = process_api_request(EVENT, create_alarms, Logger(), "create_ec2_alarms")
+        self.assertEqual(response["statusCode"], 202)
+        job_id = json.loads(response["body"])["job"]["job_id"]
+
+        self.assertEqual(process_queue(), {job_id: "succeeded"})
+        job = get_alarm_job({"pathParameters": {"account_id": "itx-000", "job_id": job_id}})
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["progress"], {"AWS000testing": {"created": 2}})
+        self.assertEqual(job["result"], "Alarms created for AWS000testing")
+
+    def test_failed_job_recorded_and_not_run_twice(self):
+        job = submit_job("delete_ec2_alarms", EVENT, "request-id")
+        handler({"Records": [{"body": json.dumps({"job_id": job["job_id"]})}]}, None)
+        stored = self.store.get(job["job_id"])
+        self.assertEqual(stored["status"], "failed")
+        self.assertEqual(stored["error"], "Some alarms not deleted")
+        self.assertIsNone(run_job(job["job_id"]))
+
+    def test_job_of_timed_out_worker_run_again(self):
+        job = submit_job("create_ec2_alarms", EVENT, "request-id")
+        # A worker claimed the job then timed out, past the deadline of its claim
+        self.store.claim(job["job_id"], lease_seconds=0)
+        self.assertEqual(run_job(job["job_id"]), "succeeded")
+        self.assertEqual(self.store.get(job["job_id"])["attempts"], 2)
+
+    @patch("sls.ec2_alarms_api.alarm_job_worker.index.JOB_MAX_ATTEMPTS", 1)
+    def test_job_failed_after_max_attempts(self):
+        job = submit_job("create_ec2_alarms", EVENT, "request-id")
+        self.store.claim(job["job_id"], lease_seconds=0)
+        self.assertEqual(run_job(job["job_id"]), "failed")
+        stored = self.store.get(job["job_id"])
+        self.assertEqual(stored["error"], "Timed out after 1 attempts")
+        self.assertEqual(stored["progress"], {})
+
+    def test_job_of_other_account_not_found(self):
+        job = submit_job("create_ec2_alarms", EVENT, "request-id")
+        response = process_api_request(
+            {"pathParameters": {"account_id": "itx-001", "region_name": "us-east-1",
+                                "job_id": job["job_id"]}}, get_alarm_job, Logger())
+        self.assertEqual(response["statusCode"], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
+"""
+One-time migration renaming the uuid-suffixed alarms of discovered metrics to the hash
+naming scheme, see sls/utils/alarm_names. CloudWatch cannot rename an alarm, so each alarm
+is put under its new name with the same definition, confirmed, then the old alarm is deleted.
+"""
+import concurrent.futures
+import os
+
+from sls.utils.alarm_fingerprint import get_put_parameters
+from sls.utils.alarm_names import get_hashed_alarm_name, strip_uuid_suffix
+from sls.utils.aws_creds import AwsCreds, prefetch_creds
+from sls.utils.aws_cloudwatch import CloudWatchClient, ALARM_DELETED
+from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import (METRIC_DISCOVERIES,
+                                                              get_dimension_value,
+                                                              get_full_dimension_value)
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+ALARM_PREFIX = "itx-alarms-"
+# Alarms put in parallel for one account and region
+MIGRATION_MAX_WORKERS = int(os.environ.get("MIGRATION_MAX_WORKERS", "20"))
+# Metric name of the discovered metrics: (dimension name, alarm name suffix)
+DISCOVERED_METRICS = {metric_name: (dimension_name, suffix) for _, metric_name, dimension_name,
+                      suffix in METRIC_DISCOVERIES.values()}
+
+
+def get_migrated_name(alarm):
+    """
+    The hostname is what remains of the name between the alarm prefix and the
+    "-{dimension value}-{suffix}" tail that build_metric_config appended
+
+    Args:
+        alarm: DescribeAlarms MetricAlarm dict
+
+    Returns:
+        str: hash scheme name of a uuid-suffixed alarm of a discovered metric,
+             None when the alarm is not one
+    """
+    base = strip_uuid_suffix(alarm["AlarmName"])
+    if base is None or alarm.get("MetricName") not in DISCOVERED_METRICS:
+        return None
+    dimension_name, suffix = DISCOVERED_METRICS[alarm["MetricName"]]
+    if not any(item["Name"] == dimension_name for item in alarm.get("Dimensions", [])):
+        return None
+    tail = f"-{get_dimension_value(alarm, dimension_name)}-{suffix}"
+    hostname = base[len(ALARM_PREFIX):-len(tail)]
+    if not base.startswith(ALARM_PREFIX) or not base.endswith(tail) or not hostname:
+        return None
+    return get_hashed_alarm_name(base, hostname, alarm["MetricName"],
+                                 get_full_dimension_value(alarm, dimension_name))
+
+
+def plan_migration(alarms):
+    """
+    Args:
+        alarms: DescribeAlarms MetricAlarm dicts of an account and region
+
+    Returns:
+        dict: renames {old name: (new name, alarm)}, already_migrated old names whose
+              new name exists, conflicts old names sharing a new name and skipped
+              uuid-suffixed names that are not recognized
+    """
+    existing = {alarm["AlarmName"] for alarm in alarms}
+    plan = {"renames": {}, "already_migrated": [], "conflicts": [], "skipped": []}
+    claimed = {}
+    for alarm in alarms:
+        name = alarm["AlarmName"]
+        if strip_uuid_suffix(name) is None:
+            continue
+        new_name = get_migrated_name(alarm)
+        if new_name is None:
+            plan["skipped"].append(name)
+        elif new_name in existing:
+            plan["already_migrated"].append(name)
+        else:
+            claimed.setdefault(new_name, []).append(name)
+    for new_name, names in claimed.items():
+        if len(names) > 1:
+            # Alarms of the same metric with different instances, ex: a replaced host
+            plan["conflicts"].extend(names)
+        else:
+            alarm = next(alarm for alarm in alarms if alarm["AlarmName"] == names[0])
+            plan["renames"][names[0]] = (new_name, alarm)
+    return plan
+
+
+def put_renamed_alarm(cloudwatch_client, new_name, alarm):
+    cloudwatch_client.put_metric_alarm(new_name, **get_put_parameters(alarm))
+
+
+def migrate_account_region(account, region, max_workers=MIGRATION_MAX_WORKERS, dry_run=False):
+    """
+    Rename the uuid-suffixed alarms of one account and region. An old alarm is only
+    deleted once its renamed copy is confirmed, so a failed run can be run again.
+
+    Returns:
+        dict: counts of the migration
+    """
+    aws_creds = AwsCreds(account, logger)
+    cloudwatch_client = CloudWatchClient(aws_creds, region, logger)
+    with TRACER.span("alarm_scan"):
+        alarms = list(cloudwatch_client.iter_alarm_definitions(ALARM_PREFIX))
+    plan = plan_migration(alarms)
+    report = {"account_id": account, "region": region, "dry_run": dry_run,
+              "alarms_scanned": len(alarms), "renames_planned": len(plan["renames"]),
+              "already_migrated": len(plan["already_migrated"]),
+              "conflicts": plan["conflicts"], "skipped": plan["skipped"],
+              "renamed": 0, "failed": {}}
+    if dry_run:
+        return report
+
+    submitted = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_name = {executor.submit(TRACER.wrap_task("put_alarm", put_renamed_alarm),
+                                          cloudwatch_client, new_name, alarm): old_name
+                          for old_name, (new_name, alarm) in plan["renames"].items()}
+        for future in concurrent.futures.as_completed(future_to_name):
+            old_name = future_to_name[future]
+            try:
+                future.result()
+                submitted.append(old_name)
+            except Exception as exc:
+                report["failed"][old_name] = str(exc)
+    unconfirmed = set(cloudwatch_client.wait_for_alarms(
+        [plan["renames"][old_name][0] for old_name in submitted]))
+    confirmed = [old_name for old_name in submitted
+                 if plan["renames"][old_name][0] not in unconfirmed]
+    report["failed"].update({old_name: "unconfirmed" for old_name in submitted
+                             if old_name not in confirmed})
+
+    outcomes = cloudwatch_client.delete_metric_alarms(confirmed + plan["already_migrated"])
+    report["failed"].update({name: f"not deleted: {outcome}" for name, outcome in outcomes.items()
+                             if outcome != ALARM_DELETED})
+    report["renamed"] = sum(1 for name in confirmed if outcomes.get(name) == ALARM_DELETED)
+    return report
+
+
+def handler(event, context):
+    """
+    Entry function invoked directly, the event lists the accounts and regions to migrate:
+    {"targets": [{"account_id": "itx-000", "region": "us-east-1"}], "dry_run": true}
+    """
+    logger.set_new_uuid()
+    TRACER.start_trace(logger.get_uuid())
+    reports = []
+    try:
+        prefetch_creds([target["account_id"] for target in event.get("targets", [])], logger)
+        for target in event.get("targets", []):
+            account, region = target["account_id"], target["region"]
+            try:
+                report = migrate_account_region(account, region,
+                                                dry_run=bool(event.get("dry_run")))
+            except Exception as exc:
+                logger.error(f"Migration failed in {account} {region}: {exc}")
+                report = {"account_id": account, "region": region, "error": str(exc)}
+            logger.info("Migration report", **report)
+            reports.append(report)
+    finally:
+        TRACER.end_trace()
+    return {"reports": reports}
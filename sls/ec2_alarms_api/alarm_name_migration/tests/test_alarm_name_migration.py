@@ -0,0 +1,93 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+import uuid
+from unittest.mock import MagicMock, patch
+
+from sls.ec2_alarms_api.alarm_name_migration.index import (get_migrated_name, handler,
+                                                           plan_migration)
+from sls.utils.alarm_names import get_hashed_alarm_name
+from sls.utils.tracing import TRACER
+
+MODULE = "sls.ec2_alarms_api.alarm_name_migration.index"
+SUFFIX = "DiskSpaceGt85PercentFor60Mins"
+
+
+def get_disk_alarm(hostname, filesystem, instance_id="i-1", name=None):
+    short = filesystem.split("/")[-1][:5]
+    return {"AlarmName": name or f"itx-alarms-{hostname}-{short}-{SUFFIX}-{uuid.uuid1()}",
+            "MetricName": "DiskSpaceUtilization", "Namespace": "System/Linux",
+            "Statistic": "Maximum", "Period": 900, "EvaluationPeriods": 4, "Threshold": 85.0,
+            "ComparisonOperator": "GreaterThanThreshold", "AlarmActions": ["topic"],
+            "StateValue": "OK", "AlarmArn": "arn",
+            "Dimensions": [{"Name": "InstanceId", "Value": instance_id},
+                           {"Name": "Filesystem", "Value": filesystem}]}
+
+
+class TestPlanMigration(unittest.TestCase):
+    def test_migrated_name(self):
+        alarm = get_disk_alarm("web-01", "/dev/nvme1n1")
+        self.assertEqual(get_migrated_name(alarm), get_hashed_alarm_name(
+            f"itx-alarms-web-01-nvme1-{SUFFIX}", "web-01", "DiskSpaceUtilization",
+            "/dev/nvme1n1"))
+        self.assertIsNone(get_migrated_name(dict(alarm, AlarmName="itx-alarms-web-01-Cpu")))
+        self.assertIsNone(get_migrated_name(dict(alarm, MetricName="CPUUtilization")))
+
+    def test_plan(self):
+        renamed = get_disk_alarm("web-01", "/dev/nvme1n1")
+        migrated = get_disk_alarm("web-01", "/dev/nvme1n2")
+        conflicts = [get_disk_alarm("web-02", "/data", instance_id)
+                     for instance_id in ("i-2", "i-3")]
+        alarms = [renamed, migrated, dict(migrated, AlarmName=get_migrated_name(migrated)),
+                  *conflicts, get_disk_alarm("web-03", "/data", name="itx-alarms-web-03-Cpu"),
+                  dict(get_disk_alarm("web-04", "/data"), MetricName="Other")]
+        plan = plan_migration(alarms)
+        self.assertEqual(list(plan["renames"]), [renamed["AlarmName"]])
+        self.assertEqual(plan["already_migrated"], [migrated["AlarmName"]])
+        self.assertEqual(plan["conflicts"], [alarm["AlarmName"] for alarm in conflicts])
+        self.assertEqual(plan["skipped"], [alarms[-1]["AlarmName"]])
+
+
+class TestMigrationHandler(unittest.TestCase):
+    def setUp(self):
+        patchers = [patch.object(TRACER, "exporter", MagicMock())]
+        for name in ("AwsCreds", "CloudWatchClient", "prefetch_creds"):
+            patchers.append(patch(f"{MODULE}.{name}"))
+        self.mocks = {}
+        for patcher in patchers:
+            self.mocks[getattr(patcher, "attribute", None)] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.alarms = [get_disk_alarm("web-01", "/dev/nvme1n1"),
+                       get_disk_alarm("web-01", "/dev/nvme1n2")]
+        self.cloudwatch_client = self.mocks["CloudWatchClient"].return_value
+        self.cloudwatch_client.iter_alarm_definitions.return_value = self.alarms
+        self.cloudwatch_client.delete_metric_alarms.side_effect = lambda names: {
+            name: "deleted" for name in names}
+        self.event = {"targets": [{"account_id": "itx-000", "region": "us-east-1"}]}
+
+    def test_alarms_renamed(self):
+        failed_name = get_migrated_name(self.alarms[1])
+        self.cloudwatch_client.wait_for_alarms.side_effect = lambda names: [
+            name for name in names if name == failed_name]
+        report = handler(self.event, None)["reports"][0]
+
+        new_name = get_migrated_name(self.alarms[0])
+        put = {call.args[0]: call.kwargs
+               for call in self.cloudwatch_client.put_metric_alarm.call_args_list}
+        self.assertEqual(sorted(put), sorted([new_name, failed_name]))
+        self.assertEqual(put[new_name]["Dimensions"], self.alarms[0]["Dimensions"])
+        self.assertNotIn("StateValue", put[new_name])
+        # The old alarm is only deleted once its renamed copy is confirmed
+        self.cloudwatch_client.delete_metric_alarms.assert_called_once_with(
+            [self.alarms[0]["AlarmName"]])
+        self.assertEqual(report["renamed"], 1)
+        self.assertEqual(report["failed"], {self.alarms[1]["AlarmName"]: "unconfirmed"})
+
+    def test_dry_run(self):
+        report = handler(dict(self.event, dry_run=True), None)["reports"][0]
+        self.cloudwatch_client.put_metric_alarm.assert_not_called()
+        self.cloudwatch_client.delete_metric_alarms.assert_not_called()
+        self.assertEqual(report["renames_planned"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,233 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
+"""
+Scheduled sweeper reconciling the alarms of a fleet: for each account and region, one
+paginated DescribeAlarms pass and one paginated DescribeInstances pass are joined in
+memory, the missing alarms of the running hosts are created and the orphaned alarms
+are deleted
+"""
+import collections
+import concurrent.futures
+import os
+import time
+
+from sls.utils.aws_creds import AwsCreds, prefetch_creds
+from sls.utils.aws_cloudwatch import CloudWatchClient, AlarmNameIndex, ALARM_DELETED
+from sls.utils.aws_ec2 import EC2Client, get_hostname
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import get_alarm_rule_engine
+from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
+from sls.ec2_alarms_api.create_ec2_alarms.index import get_sns_topic_arn
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+ALARM_PREFIX = "itx-alarms-"
+RUNNING_STATES = ("running", "rebooting")
+# Hosts of one account and region fixed in parallel
+SWEEP_MAX_WORKERS = int(os.environ.get("SWEEP_MAX_WORKERS", "20"))
+# Milliseconds of the invocation kept for the orphans and the report, no host is
+# started after that
+SWEEP_TIME_MARGIN_MS = int(os.environ.get("SWEEP_TIME_MARGIN_MS", "60000"))
+
+HOST_FIXED = "fixed"
+HOST_FAILED = "failed"
+HOST_DEFERRED = "deferred"
+
+
+def get_alarm_instance_id(alarm):
+    """
+    Returns:
+        str: value of the InstanceId dimension of an alarm, None when it has none
+    """
+    for dimension in alarm.get("Dimensions", []):
+        if dimension.get("Name") == "InstanceId":
+            return dimension.get("Value")
+    return None
+
+
+def join_fleet(instances, alarms):
+    """
+    Join the instances and the alarms of an account and region on the InstanceId
+    dimension. An alarm is orphaned when its instance is terminated, or when the
+    instance Hostname tag no longer matches the alarm name. Alarms without an
+    InstanceId dimension are left alone.
+
+    Args:
+        instances: instance details of the instances that are not terminated
+        alarms: DescribeAlarms MetricAlarm dicts
+
+    Returns:
+        tuple: ({instance id: set of alarm names}, list of orphaned alarm names)
+    """
+    hostnames = {instance["InstanceId"]: get_hostname(instance) for instance in instances}
+    alarms_by_instance = collections.defaultdict(set)
+    orphans = []
+    for alarm in alarms:
+        instance_id = get_alarm_instance_id(alarm)
+        if instance_id is None:
+            continue
+        name = alarm["AlarmName"]
+        hostname = hostnames.get(instance_id, "")
+        if instance_id not in hostnames or \
+                (hostname and not name.startswith(f"{ALARM_PREFIX}{hostname}-")):
+            orphans.append(name)
+        else:
+            alarms_by_instance[instance_id].add(name)
+    return alarms_by_instance, orphans
+
+
+def get_missing_alarms(ec2_metrics, existing):
+    """
+    Compare the alarms of the rules without discovery, whose names are known without
+    any call, with the existing alarms of the host
+
+    Args:
+        ec2_metrics: EC2Metrics of the host
+        existing: set of the alarm names of the instance
+
+    Returns:
+        list: names of the missing alarms
+    """
+    expected = get_alarm_rule_engine().generate(ec2_metrics.get_rule_context(), {})
+    return [name for name in expected if name not in existing]
+
+
+def fix_host(ec2_metrics, existing, deadline=None, clock=time.monotonic):
+    """
+    Put the alarms of the host that do not exist yet, discovered metrics included
+
+    Args:
+        ec2_metrics: EC2Metrics of the host
+        existing: set of the alarm names of the instance
+        deadline: clock value after which the host is deferred to the next sweep
+
+    Returns:
+        tuple: (HOST_FIXED, HOST_FAILED or HOST_DEFERRED, number of alarms created)
+    """
+    if deadline is not None and clock() >= deadline:
+        return HOST_DEFERRED, 0
+    try:
+        alarms_conf = ec2_metrics.generate_alarms_conf()
+        report = ec2_metrics.put_alarms({name: config for name, config in alarms_conf.items()
+                                         if name not in existing})
+    except Exception as exc:
+        logger.error(f"Alarms not fixed for {ec2_metrics.hostname}: {exc}")
+        return HOST_FAILED, 0
+    if report["failed"] or report["unconfirmed"]:
+        logger.error(f"Some alarms not created for {ec2_metrics.hostname}. "
+                     f"FailedAlarms: {report['failed']}. "
+                     f"UnconfirmedAlarms: {report['unconfirmed']}")
+        return HOST_FAILED, len(report["created"])
+    return HOST_FIXED, len(report["created"])
+
+
+def sweep_account_region(account, region, max_workers=SWEEP_MAX_WORKERS, deadline=None,
+                         dry_run=False, clock=time.monotonic):
+    """
+    Reconcile the alarms of every host of one account and region
+
+    Args:
+        account: account id
+        region: region name
+        max_workers: hosts fixed in parallel
+        deadline: clock value after which no host is started, the remaining hosts
+                  are reported as deferred
+        dry_run: only report what would be fixed and deleted
+        clock: callable returning monotonic seconds
+
+    Returns:
+        dict: counts of the sweep and the hosts scanned and fixed per second
+    """
+    started = clock()
+    aws_creds = AwsCreds(account, logger)
+    ec2_client = EC2Client(aws_creds, region, logger)
+    cloudwatch_client = CloudWatchClient(aws_creds, region, logger)
+    # Alarms are scanned first: an instance launched during the scans has its alarms
+    # either missed by the alarm scan or matched by the later instance scan, never
+    # reported as orphans
+    with TRACER.span("alarm_scan"):
+        alarms = list(cloudwatch_client.iter_alarm_definitions(ALARM_PREFIX))
+    with TRACER.span("instance_scan"):
+        instances = list(ec2_client.scan_live_instances())
+    alarms_by_instance, orphans = join_fleet(instances, alarms)
+    alarm_name_index = AlarmNameIndex(alarm["AlarmName"] for alarm in alarms)
+
+    hosts = [(get_hostname(instance), instance) for instance in instances
+             if instance.get("State", {}).get("Name") in RUNNING_STATES and get_hostname(instance)]
+    to_fix = []
+    with TRACER.span("alarm_diff", hosts=len(hosts)):
+        for hostname, instance in hosts:
+            ec2_metrics = EC2Metrics(aws_creds, region, hostname, None, logger,
+                                     instance=instance, cloudwatch_client=cloudwatch_client,
+                                     alarm_name_index=alarm_name_index)
+            if get_missing_alarms(ec2_metrics, alarms_by_instance[instance["InstanceId"]]):
+                to_fix.append(ec2_metrics)
+
+    outcomes = collections.Counter()
+    alarms_created = 0
+    orphans_deleted = 0
+    if not dry_run:
+        if to_fix:
+            sns_topic_arn = get_sns_topic_arn(aws_creds, region)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = []
+                for ec2_metrics in to_fix:
+                    ec2_metrics.sns_topic_arn = sns_topic_arn
+                    futures.append(executor.submit(
+                        TRACER.wrap_task("sweep_host", fix_host), ec2_metrics,
+                        alarms_by_instance[ec2_metrics.get_instance_id()], deadline, clock))
+                for future in concurrent.futures.as_completed(futures):
+                    outcome, created = future.result()
+                    outcomes[outcome] += 1
+                    alarms_created += created
+        with TRACER.span("delete_orphans", alarms=len(orphans)):
+            deleted = cloudwatch_client.delete_metric_alarms(orphans)
+        orphans_deleted = sum(1 for outcome in deleted.values() if outcome == ALARM_DELETED)
+
+    elapsed = max(clock() - started, 1e-6)
+    return {
+        "account_id": account,
+        "region": region,
+        "dry_run": dry_run,
+        "instances_scanned": len(instances),
+        "hosts_scanned": len(hosts),
+        "alarms_scanned": len(alarms),
+        "hosts_missing_alarms": len(to_fix),
+        "hosts_fixed": outcomes[HOST_FIXED],
+        "hosts_failed": outcomes[HOST_FAILED],
+        "hosts_deferred": outcomes[HOST_DEFERRED],
+        "alarms_created": alarms_created,
+        "orphaned_alarms": len(orphans),
+        "orphaned_alarms_deleted": orphans_deleted,
+        "elapsed_seconds": round(elapsed, 3),
+        "hosts_scanned_per_second": round(len(hosts) / elapsed, 1),
+        "hosts_fixed_per_second": round(outcomes[HOST_FIXED] / elapsed, 1)
+    }
+
+
+def handler(event, context, clock=time.monotonic):
+    """
+    Scheduled entry function, the event lists the accounts and regions to sweep:
+    {"targets": [{"account_id": "itx-000", "region": "us-east-1"}], "dry_run": false}
+    """
+    logger.set_new_uuid()
+    deadline = None
+    if context is not None:
+        deadline = clock() + (context.get_remaining_time_in_millis() -
+                              SWEEP_TIME_MARGIN_MS) / 1000
+    TRACER.start_trace(logger.get_uuid())
+    reports = []
+    try:
+        prefetch_creds([target["account_id"] for target in event.get("targets", [])], logger)
+        for target in event.get("targets", []):
+            account, region = target["account_id"], target["region"]
+            try:
+                report = sweep_account_region(account, region, deadline=deadline,
+                                              dry_run=bool(event.get("dry_run")), clock=clock)
+            except Exception as exc:
+                logger.error(f"Sweep failed in {account} {region}: {exc}")
+                report = {"account_id": account, "region": region, "error": str(exc)}
+            logger.info("Sweep report", **report)
+            reports.append(report)
+    finally:
+        TRACER.end_trace()
+    return {"reports": reports}
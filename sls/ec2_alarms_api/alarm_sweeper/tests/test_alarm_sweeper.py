@@ -0,0 +1,150 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sls.ec2_alarms_api.alarm_sweeper.index import handler, join_fleet, sweep_account_region
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import get_alarm_rule_engine, LINUX
+from sls.utils.metric_discovery_cache import METRIC_DISCOVERY_CACHE
+from sls.utils.tracing import TRACER
+
+MODULE = "sls.ec2_alarms_api.alarm_sweeper.index"
+
+
+def get_instance(instance_id, hostname=None, state="running"):
+    tags = [{"Key": "Hostname", "Value": hostname}] if hostname else []
+    return {"InstanceId": instance_id, "State": {"Name": state}, "Tags": tags}
+
+
+def get_alarm(name, instance_id=None):
+    dimensions = [{"Name": "InstanceId", "Value": instance_id}] if instance_id else []
+    return {"AlarmName": name, "Dimensions": dimensions}
+
+
+def get_static_alarms(hostname, instance_id):
+    context = {"hostname": hostname, "prefix": f"itx-alarms-{hostname}", "platform": LINUX,
+               "instance_id": instance_id, "sns_topic_arn": None,
+               "memory_namespace": "System/Linux"}
+    return [get_alarm(name, instance_id)
+            for name in get_alarm_rule_engine().generate(context, {})]
+
+
+class TestJoinFleet(unittest.TestCase):
+    def test_orphans(self):
+        instances = [get_instance("i-1", "host1"), get_instance("i-2", "host2", "stopped"),
+                     get_instance("i-3")]
+        alarms = [get_alarm("itx-alarms-host1-Cpu", "i-1"),
+                  get_alarm("itx-alarms-host10-Cpu", "i-1"),
+                  get_alarm("itx-alarms-host2-Cpu", "i-2"),
+                  get_alarm("itx-alarms-host3-Cpu", "i-3"),
+                  get_alarm("itx-alarms-host9-Cpu", "i-9"),
+                  get_alarm("itx-alarms-composite")]
+        alarms_by_instance, orphans = join_fleet(instances, alarms)
+        self.assertEqual(alarms_by_instance["i-1"], {"itx-alarms-host1-Cpu"})
+        self.assertEqual(alarms_by_instance["i-2"], {"itx-alarms-host2-Cpu"})
+        self.assertEqual(alarms_by_instance["i-3"], {"itx-alarms-host3-Cpu"})
+        # Renamed host and terminated instance
+        self.assertEqual(orphans, ["itx-alarms-host10-Cpu", "itx-alarms-host9-Cpu"])
+
+
+class TestSweepAccountRegion(unittest.TestCase):
+    def setUp(self):
+        patchers = [patch.object(TRACER, "exporter", MagicMock())]
+        for name in ("AwsCreds", "EC2Client", "CloudWatchClient", "get_sns_topic_arn",
+                     "prefetch_creds"):
+            patchers.append(patch(f"{MODULE}.{name}"))
+        self.mocks = {}
+        for patcher in patchers:
+            self.mocks[getattr(patcher, "attribute", None)] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(METRIC_DISCOVERY_CACHE.invalidate)
+        self.mocks["AwsCreds"].side_effect = lambda account, logger: MagicMock(account=account)
+        self.mocks["get_sns_topic_arn"].return_value = "topic"
+        self.ec2_client = self.mocks["EC2Client"].return_value
+        self.ec2_client.scan_live_instances.return_value = [
+            get_instance("i-1", "host1"), get_instance("i-2", "host2"),
+            get_instance("i-3", "host3", "stopped"), get_instance("i-4")]
+        self.cloudwatch_client = self.mocks["CloudWatchClient"].return_value
+        self.cloudwatch_client.iter_alarm_definitions.return_value = \
+            get_static_alarms("host1", "i-1") + get_static_alarms("host2", "i-2")[1:] + \
+            [get_alarm("itx-alarms-host9-Cpu", "i-9")]
+        self.cloudwatch_client.list_metrics.return_value = []
+        self.cloudwatch_client.wait_for_alarms.return_value = []
+        self.cloudwatch_client.delete_metric_alarms.side_effect = lambda names: {
+            name: "deleted" for name in names}
+
+    def test_missing_alarms_created_and_orphans_deleted(self):
+        report = sweep_account_region("itx-000", "us-east-1", max_workers=2)
+
+        self.ec2_client.scan_live_instances.assert_called_once_with()
+        self.cloudwatch_client.iter_alarm_definitions.assert_called_once_with("itx-alarms-")
+        missing = get_static_alarms("host2", "i-2")[0]["AlarmName"]
+        put = [call.args[0] for call in self.cloudwatch_client.put_metric_alarm.call_args_list]
+        self.assertEqual(put, [missing])
+        self.assertEqual(self.cloudwatch_client.put_metric_alarm.call_args.kwargs[
+            "AlarmActions"], ["topic"])
+        self.cloudwatch_client.delete_metric_alarms.assert_called_once_with(
+            ["itx-alarms-host9-Cpu"])
+        self.assertEqual(report["hosts_scanned"], 2)
+        self.assertEqual(report["hosts_missing_alarms"], 1)
+        self.assertEqual(report["hosts_fixed"], 1)
+        self.assertEqual(report["alarms_created"], 1)
+        self.assertEqual(report["orphaned_alarms_deleted"], 1)
+        self.assertGreater(report["hosts_scanned_per_second"], 0)
+
+    def test_instance_launched_between_scans_keeps_its_alarms(self):
+        launched = []
+        instances = self.ec2_client.scan_live_instances.return_value
+        alarms = self.cloudwatch_client.iter_alarm_definitions.return_value
+
+        def scan(items, launched_items):
+            result = items + (launched_items if launched else [])
+            # The instance is launched and its alarms created after the first scan
+            launched.append(True)
+            return result
+
+        self.ec2_client.scan_live_instances.side_effect = lambda: scan(
+            instances, [get_instance("i-5", "host5")])
+        self.cloudwatch_client.iter_alarm_definitions.side_effect = lambda prefix: scan(
+            alarms, get_static_alarms("host5", "i-5"))
+
+        report = sweep_account_region("itx-000", "us-east-1")
+
+        self.cloudwatch_client.delete_metric_alarms.assert_called_once_with(
+            ["itx-alarms-host9-Cpu"])
+        self.assertEqual(report["orphaned_alarms"], 1)
+
+    def test_dry_run(self):
+        report = sweep_account_region("itx-000", "us-east-1", dry_run=True)
+        self.cloudwatch_client.put_metric_alarm.assert_not_called()
+        self.cloudwatch_client.delete_metric_alarms.assert_not_called()
+        self.assertEqual(report["hosts_missing_alarms"], 1)
+        self.assertEqual(report["orphaned_alarms"], 1)
+
+    def test_hosts_deferred_after_deadline(self):
+        report = sweep_account_region("itx-000", "us-east-1", deadline=0, clock=lambda: 1)
+        self.cloudwatch_client.put_metric_alarm.assert_not_called()
+        self.assertEqual(report["hosts_deferred"], 1)
+        self.assertEqual(report["hosts_fixed"], 0)
+
+    def test_handler_reports_each_target(self):
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 900000
+        self.mocks["AwsCreds"].side_effect = [MagicMock(account="itx-000"),
+                                              Exception("no credentials")]
+        response = handler({"targets": [{"account_id": "itx-000", "region": "us-east-1"},
+                                        {"account_id": "itx-001", "region": "us-east-1"}]},
+                           context)
+        self.assertEqual(response["reports"][0]["hosts_fixed"], 1)
+        self.assertEqual(response["reports"][1], {"account_id": "itx-001", "region": "us-east-1",
+                                                  "error": "no credentials"})
+
+    def test_new_request_id_per_invocation(self):
+        with patch.object(TRACER, "start_trace") as start_trace:
+            handler({"targets": []}, None)
+            handler({"targets": []}, None)
+        first, second = (call.args[0] for call in start_trace.call_args_list)
+        self.assertNotEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
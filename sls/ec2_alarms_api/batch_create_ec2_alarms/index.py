@@ -0,0 +1,247 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
+"""
+Handler for batch ec2 alarms api
+"""
+import asyncio
+import concurrent.futures
+import json
+
+from sls.utils.lambda_handler_helper import process_api_request
+from sls.utils.aio import AsyncCloudWatchClient, THREAD_IO, ASYNC_IO, IO_MODES, \
+    DEFAULT_CONCURRENCY, run_coroutine
+from sls.utils.aws_creds import AwsCreds
+from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.utils.aws_ec2 import EC2Client
+from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
+from sls.ec2_alarms_api.create_ec2_alarms.index import get_sns_topic_arn
+from sls.utils.exceptions import InvalidParameter
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+MAX_BATCH_HOSTNAMES = 1000
+DEFAULT_MAX_WORKERS = 10
+MAX_WORKERS_LIMIT = 50
+MAX_CONCURRENCY_LIMIT = 200
+# Name of create_alarms_batch in the job worker registry
+OPERATION = "batch_create_ec2_alarms"
+
+
+def load_request_body(event):
+    """
+    Returns:
+        dict: the JSON request body
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError as error:
+        raise InvalidParameter("Request body is not valid JSON") from error
+    if not isinstance(body, dict):
+        raise InvalidParameter("Request body must be a JSON object")
+    return body
+
+
+def parse_batch_request(event):
+    """
+    Validate the request body
+
+    Args:
+        event: API gateway proxy event. The body has either a list of hostnames
+               {"hostnames": ["host1", "host2"]} or a list of EC2 tag filters
+               {"tag_filters": [{"Key": "Environment", "Values": ["dev"]}]}
+               and optionally "max_workers"
+
+    Returns:
+        tuple: hostnames, tag_filters, max_workers
+    """
+    body = load_request_body(event)
+    hostnames = body.get('hostnames') or []
+    tag_filters = body.get('tag_filters') or []
+    if bool(hostnames) == bool(tag_filters):
+        raise InvalidParameter("Provide either hostnames or tag_filters")
+    if not isinstance(hostnames, list) or not all(isinstance(name, str) for name in hostnames):
+        raise InvalidParameter("hostnames must be a list of strings")
+    if len(hostnames) > MAX_BATCH_HOSTNAMES:
+        raise InvalidParameter(f"At most {MAX_BATCH_HOSTNAMES} hostnames can be provided")
+    if not isinstance(tag_filters, list) or not all(
+            isinstance(tag_filter, dict) and tag_filter.get('Key')
+            and isinstance(tag_filter.get('Values'), list) for tag_filter in tag_filters):
+        raise InvalidParameter("tag_filters must be a list of {'Key': key, 'Values': [values]}")
+    try:
+        max_workers = int(body.get('max_workers', DEFAULT_MAX_WORKERS))
+    except (TypeError, ValueError) as error:
+        raise InvalidParameter("max_workers must be an integer") from error
+    if not 1 <= max_workers <= MAX_WORKERS_LIMIT:
+        raise InvalidParameter(f"max_workers must be between 1 and {MAX_WORKERS_LIMIT}")
+    return list(dict.fromkeys(hostnames)), tag_filters, max_workers
+
+
+def parse_io_options(event):
+    """
+    Validate the optional "io" and "concurrency" of the request body
+
+    Returns:
+        tuple: io mode, maximum number of AWS calls in flight in asyncio mode
+    """
+    body = load_request_body(event)
+    io_mode = body.get('io', THREAD_IO)
+    if io_mode not in IO_MODES:
+        raise InvalidParameter(f"io must be one of {', '.join(IO_MODES)}")
+    try:
+        concurrency = int(body.get('concurrency', DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError) as error:
+        raise InvalidParameter("concurrency must be an integer") from error
+    if not 1 <= concurrency <= MAX_CONCURRENCY_LIMIT:
+        raise InvalidParameter(f"concurrency must be between 1 and {MAX_CONCURRENCY_LIMIT}")
+    return io_mode, concurrency
+
+
+def get_host_result(hostname, instance, report):
+    """
+    Returns:
+        dict: result for the host from its alarms report
+    """
+    result = {"hostname": hostname, "instanceId": instance.get("InstanceId")}
+    if report["failed"] or report["unconfirmed"]:
+        result.update({"status": "failed",
+                       "message": f"Some alarms not created for {hostname}",
+                       "failedAlarms": report["failed"],
+                       "unconfirmedAlarms": report["unconfirmed"]})
+    else:
+        result.update({"status": "created",
+                       "message": f"{len(report['created'])} alarms created for {hostname}"})
+    return result
+
+
+def create_host_alarms(aws_creds, region, hostname, instance, sns_topic_arn, cloudwatch_client,
+                       progress=None):
+    """
+    Create the alarms of one host of the batch
+
+    Returns:
+        dict: result for the host
+    """
+    try:
+        ec2_metrics = EC2Metrics(aws_creds, region, hostname, sns_topic_arn, logger,
+                                 instance=instance, cloudwatch_client=cloudwatch_client,
+                                 progress=progress)
+        return get_host_result(hostname, instance, ec2_metrics.create_alarms_report())
+    except Exception as exc:
+        logger.error(f"Alarms not created for {hostname}: {exc}")
+        return {"hostname": hostname, "instanceId": instance.get("InstanceId"),
+                "status": "failed", "message": str(exc)}
+
+
+async def create_host_alarms_async(aws_creds, region, hostname, instance, sns_topic_arn,
+                                   cloudwatch_client, aio_cloudwatch, progress=None):
+    """
+    Coroutine version of create_host_alarms using the batch AsyncCloudWatchClient
+
+    Returns:
+        dict: result for the host
+    """
+    try:
+        ec2_metrics = EC2Metrics(aws_creds, region, hostname, sns_topic_arn, logger,
+                                 instance=instance, cloudwatch_client=cloudwatch_client,
+                                 io_mode=ASYNC_IO, progress=progress)
+        report = await ec2_metrics.create_alarms_report_async(aio_cloudwatch)
+        return get_host_result(hostname, instance, report)
+    except Exception as exc:
+        logger.error(f"Alarms not created for {hostname}: {exc}")
+        return {"hostname": hostname, "instanceId": instance.get("InstanceId"),
+                "status": "failed", "message": str(exc)}
+
+
+async def create_hosts_alarms_async(aws_creds, region, instances, sns_topic_arn,
+                                    cloudwatch_client, max_workers, concurrency, progress=None):
+    """
+    Create the alarms of the hosts on one event loop. At most max_workers hosts are
+    processed at a time and at most concurrency AWS calls are in flight for the batch.
+
+    Args:
+        instances: instance details by hostname
+        progress: callable(hostname, alarm_name, outcome) recording the progress of a job
+
+    Returns:
+        list: result for each host
+    """
+    aio_cloudwatch = AsyncCloudWatchClient(cloudwatch_client, concurrency)
+    hosts_semaphore = asyncio.Semaphore(max_workers)
+
+    async def create(hostname):
+        async with hosts_semaphore:
+            return await create_host_alarms_async(aws_creds, region, hostname,
+                                                  instances[hostname], sns_topic_arn,
+                                                  cloudwatch_client, aio_cloudwatch, progress)
+    try:
+        return await asyncio.gather(*[create(hostname) for hostname in instances])
+    finally:
+        aio_cloudwatch.close()
+
+
+def create_alarms_batch(event, progress=None):
+    """
+    Create the alarms for every host of the batch. Credentials, SNS topic discovery,
+    instance lookup and the cloudwatch client are shared by the whole batch.
+
+    Args:
+        event: API gateway proxy event
+        progress: callable(hostname, alarm_name, outcome) recording the progress of a job
+
+    Returns:
+        dict: summary and result for each host
+    """
+    path_params = event.get('pathParameters', {})
+    account_id = path_params.get('account_id')
+    region = path_params.get('region_name')
+    hostnames, tag_filters, max_workers = parse_batch_request(event)
+    io_mode, concurrency = parse_io_options(event)
+
+    logger.info(f"Account: {account_id}")
+    logger.info(f"Region: {region}")
+
+    aws_creds = AwsCreds(account_id, logger)
+    sns_topic_arn = get_sns_topic_arn(aws_creds, region)
+    ec2_client = EC2Client(aws_creds, region, logger)
+    with TRACER.span("instance_lookup"):
+        if hostnames:
+            instances = ec2_client.get_running_instances_by_hostnames(hostnames)
+        else:
+            instances = ec2_client.get_running_instances_by_tags(tag_filters)
+            hostnames = sorted(instances)
+    logger.info(f"Creating alarms for {len(instances)} of {len(hostnames)} hosts")
+
+    results = [{"hostname": hostname, "status": "not_found",
+                "message": "Running instance with tag key: Hostname "
+                           f"and tag value: {hostname} not found"}
+               for hostname in hostnames if hostname not in instances]
+    cloudwatch_client = CloudWatchClient(aws_creds, region, logger)
+    if io_mode == ASYNC_IO:
+        found = {hostname: instances[hostname] for hostname in hostnames if hostname in instances}
+        results.extend(run_coroutine(create_hosts_alarms_async(
+            aws_creds, region, found, sns_topic_arn, cloudwatch_client, max_workers, concurrency,
+            progress)))
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(TRACER.wrap_task("host_alarms", create_host_alarms),
+                                       aws_creds, region, hostname,
+                                       instances[hostname], sns_topic_arn, cloudwatch_client,
+                                       progress)
+                       for hostname in hostnames if hostname in instances]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
+
+    results.sort(key=lambda result: result["hostname"])
+    summary = {status: sum(1 for result in results if result["status"] == status)
+               for status in ("created", "failed", "not_found")}
+    return {"summary": summary, "results": results}
+
+
+def handler(event, context):
+    """
+    api entry function
+    """
+    logger.info(context)
+    output = process_api_request(event, create_alarms_batch, logger, operation=OPERATION)
+    logger.info(output)
+    return output
@@ -0,0 +1,119 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring, wrong-import-position
+import json
+import unittest
+
+from unittest.mock import patch
+import os, sys
+module_dir = os.path.dirname(os.path.abspath(__file__))
+module_par = os.path.normpath(os.path.join(module_dir, '../../../../'))
+sys.path.append(module_par)
+from sls.ec2_alarms_api.batch_create_ec2_alarms.index import create_alarms_batch, parse_batch_request, \
+    parse_io_options
+from sls.utils.exceptions import InvalidParameter
+
+MODULE = "sls.ec2_alarms_api.batch_create_ec2_alarms.index"
+
+
+def get_event(body):
+    return {
+        "pathParameters": {"account_id": "itx-000", "region_name": "us-east-1"},
+        "body": json.dumps(body)
+    }
+
+
+class TestBatchCreateEC2Alarms(unittest.TestCase):
+    def test_parse_batch_request(self):
+        hostnames, tag_filters, max_workers = parse_batch_request(
+            get_event({"hostnames": ["host1", "host2", "host1"], "max_workers": 5}))
+        self.assertEqual(hostnames, ["host1", "host2"])
+        self.assertEqual(tag_filters, [])
+        self.assertEqual(max_workers, 5)
+
+    def test_parse_batch_request_invalid(self):
+        for body in [{}, {"hostnames": ["host1"], "tag_filters": [{"Key": "k", "Values": ["v"]}]},
+                     {"hostnames": "host1"}, {"tag_filters": [{"Key": "k"}]},
+                     {"hostnames": ["host1"], "max_workers": 0}]:
+            self.assertRaises(InvalidParameter, parse_batch_request, get_event(body))
+        self.assertRaises(InvalidParameter, parse_batch_request, {"body": "not json"})
+
+    def test_parse_io_options(self):
+        self.assertEqual(parse_io_options(get_event({"io": "asyncio", "concurrency": 20})),
+                         ("asyncio", 20))
+        self.assertEqual(parse_io_options(get_event({}))[0], "threads")
+        for body in [{"io": "gevent"}, {"io": "asyncio", "concurrency": 0}]:
+            self.assertRaises(InvalidParameter, parse_io_options, get_event(body))
+
+    @patch(f"{MODULE}.EC2Metrics")
+    @patch(f"{MODULE}.CloudWatchClient")
+    @patch(f"{MODULE}.EC2Client")
+    @patch(f"{MODULE}.get_sns_topic_arn", return_value="test_sns")
+    @patch(f"{MODULE}.AwsCreds")
+    def test_create_alarms_batch(self, mock_creds, mock_sns, mock_ec2, mock_cloudwatch, mock_metrics):
+        ec2_client = mock_ec2.return_value
+        ec2_client.get_running_instances_by_hostnames.return_value = {
+            "host1": {"InstanceId": "i-1"},
+            "host2": {"InstanceId": "i-2"}
+        }
+        mock_metrics.return_value.create_alarms_report.side_effect = [
+            {"created": ["alarm1"], "failed": {}, "unconfirmed": []},
+            {"created": [], "failed": {}, "unconfirmed": ["alarm2"]}
+        ]
+        output = create_alarms_batch(get_event({"hostnames": ["host1", "host2", "host3"],
+                                                "max_workers": 1}))
+
+        ec2_client.get_running_instances_by_hostnames.assert_called_once_with(
+            ["host1", "host2", "host3"])
+        mock_sns.assert_called_once()
+        mock_cloudwatch.assert_called_once()
+        self.assertEqual(output["summary"], {"created": 1, "failed": 1, "not_found": 1})
+        self.assertEqual([result["status"] for result in output["results"]],
+                         ["created", "failed", "not_found"])
+        self.assertEqual(output["results"][1]["unconfirmedAlarms"], ["alarm2"])
+        for call in mock_metrics.call_args_list:
+            self.assertIs(call.kwargs["cloudwatch_client"], mock_cloudwatch.return_value)
+
+    @patch(f"{MODULE}.EC2Metrics")
+    @patch(f"{MODULE}.CloudWatchClient")
+    @patch(f"{MODULE}.EC2Client")
+    @patch(f"{MODULE}.get_sns_topic_arn", return_value="test_sns")
+    @patch(f"{MODULE}.AwsCreds")
+    def test_create_alarms_batch_tag_filters(self, mock_creds, mock_sns, mock_ec2,
+                                             mock_cloudwatch, mock_metrics):
+        tag_filters = [{"Key": "Environment", "Values": ["dev"]}]
+        ec2_client = mock_ec2.return_value
+        ec2_client.get_running_instances_by_tags.return_value = {"host1": {"InstanceId": "i-1"}}
+        mock_metrics.return_value.create_alarms_report.return_value = {
+            "created": ["alarm1"], "failed": {}, "unconfirmed": []}
+        output = create_alarms_batch(get_event({"tag_filters": tag_filters}))
+        ec2_client.get_running_instances_by_tags.assert_called_once_with(tag_filters)
+        self.assertEqual(output["summary"], {"created": 1, "failed": 0, "not_found": 0})
+
+    @patch(f"{MODULE}.EC2Metrics")
+    @patch(f"{MODULE}.CloudWatchClient")
+    @patch(f"{MODULE}.EC2Client")
+    @patch(f"{MODULE}.get_sns_topic_arn", return_value="test_sns")
+    @patch(f"{MODULE}.AwsCreds")
+    def test_create_alarms_batch_asyncio(self, mock_creds, mock_sns, mock_ec2,
+                                         mock_cloudwatch, mock_metrics):
+        ec2_client = mock_ec2.return_value
+        ec2_client.get_running_instances_by_hostnames.return_value = {
+            "host1": {"InstanceId": "i-1"},
+            "host2": {"InstanceId": "i-2"}
+        }
+        reports = {"host1": {"created": ["alarm1"], "failed": {}, "unconfirmed": []},
+                   "host2": {"created": [], "failed": {"alarm2": "error"}, "unconfirmed": []}}
+
+        def get_metrics(aws_creds, region, hostname, *args, **kwargs):
+            async def create_alarms_report_async(aio_cloudwatch):
+                return reports[hostname]
+            metrics = mock_metrics.return_value
+            metrics.create_alarms_report_async = create_alarms_report_async
+            return metrics
+        mock_metrics.side_effect = get_metrics
+
+        output = create_alarms_batch(get_event({"hostnames": ["host1", "host2"], "io": "asyncio"}))
+        self.assertEqual(output["summary"], {"created": 1, "failed": 1, "not_found": 0})
+        self.assertEqual(output["results"][1]["failedAlarms"], {"alarm2": "error"})
+        mock_metrics.return_value.create_alarms_report.assert_not_called()
+        for call in mock_metrics.call_args_list:
+            self.assertEqual(call.kwargs["io_mode"], "asyncio")
@@ -0,0 +1,137 @@
+"""
+Module to generate the alarms configuration of an instance from the declarative
+alarm rules in alarm_rules.json
+"""
+# pylint: disable=protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
+import functools
+import json
+import os
+
+THISDIR = os.path.dirname(__file__)  # create_ec2_alarms/
+ALARM_RULES_FILE = os.path.join(THISDIR, "alarm_rules.json")
+
+WINDOWS = "windows"
+LINUX = "linux"
+
+
+def compile_value(value):
+    """
+    Compile a rule property into a callable returning its value for a context.
+    Strings are rendered with str.format_map, lists and dicts are compiled recursively.
+
+    Args:
+        value: property value from the rule
+
+    Returns:
+        callable: takes the context dict and returns the value
+    """
+    if isinstance(value, str):
+        if "{" not in value:
+            return lambda context: value
+        return lambda context: value.format_map(context)
+    if isinstance(value, list):
+        items = [compile_value(item) for item in value]
+        return lambda context: [item(context) for item in items]
+    if isinstance(value, dict):
+        fields = [(key, compile_value(item)) for key, item in value.items()]
+        return lambda context: {key: item(context) for key, item in fields}
+    return lambda context: value
+
+
+class AlarmRule:
+    """
+    One compiled alarm rule
+    """
+
+    def __init__(self, rule):
+        """
+        Args:
+            rule: dict with
+                  id: rule identifier
+                  name: alarm name template, for rules without discovery
+                  when: optional conditions, platform and hostname_prefix
+                  discovery: optional key of the discovered metrics the rule
+                             creates one alarm for, the alarm names and dimensions
+                             come from the discovered metrics
+                  properties: PutMetricAlarm parameters, strings can use the context
+        """
+        self.rule_id = rule["id"]
+        self.discovery = rule.get("discovery")
+        when = rule.get("when", {})
+        self.platform = when.get("platform")
+        self.hostname_prefix = when.get("hostname_prefix")
+        self.name = compile_value(rule.get("name", ""))
+        self.properties = compile_value(rule["properties"])
+
+    def applies_to(self, context):
+        """
+        Check the rule conditions against the context
+        """
+        if self.platform and self.platform != context["platform"]:
+            return False
+        if self.hostname_prefix and not context["hostname"].startswith(self.hostname_prefix):
+            return False
+        return True
+
+    def generate(self, context, discovered):
+        """
+        Returns:
+            Iterator: (alarm name, alarm configuration) for the rule
+        """
+        if not self.discovery:
+            yield self.name(context), self.properties(context)
+            return
+        for metric in discovered.get(self.discovery, []):
+            metric_context = dict(context, dimension_value=metric["dimensionValue"])
+            config = self.properties(metric_context)
+            config["Dimensions"] = list(metric["dimensions"])
+            yield metric["alarmName"], config
+
+
+class AlarmRuleEngine:
+    """
+    Generate alarm configurations from compiled rules
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules: list of rule dicts, see AlarmRule
+        """
+        self.rules = [AlarmRule(rule) for rule in rules]
+
+    def required_discoveries(self, context):
+        """
+        Returns:
+            list: discovery keys needed by the rules applying to the context
+        """
+        return [rule.discovery for rule in self.rules
+                if rule.discovery and rule.applies_to(context)]
+
+    def generate(self, context, discovered):
+        """
+        Generate the alarms configuration
+
+        Args:
+            context: dict with hostname, prefix, platform, instance_id,
+                     sns_topic_arn and memory_namespace
+            discovered: dict of discovered metrics by discovery key, each metric is a dict
+                        with alarmName, dimensionValue and dimensions
+
+        Returns:
+            dict: alarm configuration by alarm name
+        """
+        alarms_conf = {}
+        for rule in self.rules:
+            if rule.applies_to(context):
+                alarms_conf.update(rule.generate(context, discovered))
+        return alarms_conf
+
+
+@functools.lru_cache(maxsize=None)
+def get_alarm_rule_engine(rules_file=ALARM_RULES_FILE):
+    """
+    Returns the rule engine for the rules file, loaded once per container
+    """
+    with open(rules_file) as rules:
+        return AlarmRuleEngine(json.load(rules))
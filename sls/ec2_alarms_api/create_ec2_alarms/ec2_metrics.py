@@ -2,21 +2,37 @@
 Module to create metrics alarms for ec2
 """
 # pylint: disable=protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
-import json
+import asyncio
 import os
 import re
 import uuid
 import concurrent.futures
-import jmespath
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import (get_alarm_rule_engine,
+                                                              WINDOWS, LINUX)
+from sls.utils.aio import (AsyncCloudWatchClient, THREAD_IO, ASYNC_IO, run_coroutine,
+                           get_running_loop)
+from sls.utils.alarm_fingerprint import alarm_fingerprint
+from sls.utils.alarm_names import get_hashed_alarm_name, ALARM_NAME_SCHEME, NAME_SCHEME_HASH
+from sls.utils.aws_cloudwatch import (CloudWatchClient, AlarmNameIndex, ALARM_DELETED,
+                                      RECENTLY_ACTIVE)
 from sls.utils.aws_ec2 import EC2Client
 from sls.utils.logger import Logger
 from sls.utils.exceptions import InvalidParameter
+from sls.utils.metric_discovery_cache import METRIC_DISCOVERY_CACHE
+from sls.utils.tracing import TRACER
 
 lgr = Logger()
-THISDIR = os.path.dirname(__file__)  # create_ec2_alarms/
+# Threads putting the alarms of a host. The puts share the rate limit of the account, a few
+# threads keep it busy, more threads only wait for tokens.
+PUT_ALARMS_MAX_WORKERS = int(os.environ.get("PUT_ALARMS_MAX_WORKERS", "8"))
+# Discovery key: (namespace, metric name, dimension name, alarm name suffix)
+METRIC_DISCOVERIES = {
+    "partitions": ("System/Windows", "PartitionUtilization", "DriveLetter",
+                   "PartitionUtilizationGt85PercentFor60Mins"),
+    "filesystems": ("System/Linux", "DiskSpaceUtilization", "Filesystem",
+                    "DiskSpaceGt85PercentFor60Mins")
+}
 
 
 class EC2Metrics:
@@ -24,7 +40,9 @@ class EC2Metrics:
     Create metric alarms for EC2 instances
     """
 
-    def __init__(self, aws_creds, ec2_region, hostname, sns_topic_arn, logger=None):
+    def __init__(self, aws_creds, ec2_region, hostname, sns_topic_arn, logger=None,
+                 instance=None, cloudwatch_client=None, io_mode=THREAD_IO, progress=None,
+                 alarm_name_index=None):
         """
         Set up clients to create the ec2 metric alarms
 
@@ -34,15 +52,29 @@ class EC2Metrics:
             hostname: value of the tag key Hostname for the instance
             sns_topic_arn: Cloudwatch alarm sns topic arn
             logger: instance of Logger
+            instance: instance details, looked up by hostname when not provided
+            cloudwatch_client: CloudWatchClient shared by several hosts
+            io_mode: THREAD_IO or ASYNC_IO, how the alarms are put and confirmed
+            progress: callable(hostname, alarm_name, outcome) called with the outcome of
+                      the alarms put, confirmed or deleted. Ex: JobProgress of an
+                      asynchronous job
+            alarm_name_index: AlarmNameIndex of the existing alarms, scanned by prefix
+                              when not provided
         """
         self.logger = logger or lgr
-        self.cloudwatch_client = CloudWatchClient(aws_creds, ec2_region, self.logger)
+        self.cloudwatch_client = cloudwatch_client or CloudWatchClient(aws_creds, ec2_region,
+                                                                        self.logger)
         self.hostname = hostname
         self.aws_creds = aws_creds
         self.ec2_region = ec2_region
-        self.instance = self.get_instance()
+        self.instance = instance or self.get_instance()
         self.sns_topic_arn = sns_topic_arn
+        self.io_mode = io_mode
+        self.progress = progress
+        self.name_scheme = ALARM_NAME_SCHEME
+        self._alarm_name_index = alarm_name_index
 
+    @TRACER.traced("instance_lookup")
     def get_instance(self):
         """
         Retrieves the instance details using the hostname
@@ -50,96 +82,374 @@ class EC2Metrics:
         ec2_client = EC2Client(self.aws_creds, self.ec2_region, self.logger)
         return ec2_client.get_running_instance_by_hostname(self.hostname)
 
-    def create_all_alarms(self):
+    def create_all_alarms(self, reconcile=False):
         """
         Retrieve a dict of the alarms configuration using generate_alarms_conf
         Create the alarms for each key-value pair: the key is the alarm name
         and the value is the configuration for the alarm
+
+        Args:
+            reconcile: only put new or changed alarms and remove stale ones,
+                       see reconcile_alarms
+
+        Returns:
+            str: message, or dict of the reconcile counts
+        """
+        report = self.reconcile_alarms() if reconcile else self.create_alarms_report()
+        if report["failed"] or report["unconfirmed"]:
+            raise Exception(f"Some alarms not created for {self.hostname}. "
+                            f"FailedAlarms: {report['failed']}. "
+                            f"UnconfirmedAlarms: {report['unconfirmed']}. "
+                            f"InstanceId: {self.get_instance_id()}")
+        if reconcile:
+            return {key: report[key] for key in ("created", "updated", "unchanged", "removed")}
+        return f"Alarms created for {self.hostname}"
+
+    def create_alarms_report(self):
+        """
+        Submit every PutMetricAlarm, then confirm all the alarms together
+
+        Returns:
+            dict: created alarm names, failed alarms with their error and
+                  alarm names not found after creation
         """
+        if self.io_mode == ASYNC_IO:
+            return run_coroutine(self.create_alarms_report_async())
         self.logger.info("Generating the alarms configuration for the instance")
         alarms_conf = self.generate_alarms_conf()
+        return self.put_alarms(alarms_conf)
+
+    async def create_alarms_report_async(self, aio_cloudwatch=None):
+        """
+        Coroutine version of create_alarms_report. The alarm name scan and the metric
+        discoveries run concurrently, then the alarms are put concurrently.
+
+        Args:
+            aio_cloudwatch: AsyncCloudWatchClient shared by several hosts, created
+                            and closed by the call when not provided
+
+        Returns:
+            dict: see create_alarms_report
+        """
+        if aio_cloudwatch is None:
+            aio_cloudwatch = AsyncCloudWatchClient(self.cloudwatch_client)
+            try:
+                return await self.create_alarms_report_async(aio_cloudwatch)
+            finally:
+                aio_cloudwatch.close()
 
-        self.logger.info(f"Creating {len(alarms_conf)} alarms for the instance with config: {alarms_conf}")
-        failed_alarms = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_to_alarm = {executor.submit(create_metric, self.cloudwatch_client,
-                                               alarm_name, config): alarm_name
+        self.logger.info("Generating the alarms configuration for the instance")
+        engine = get_alarm_rule_engine()
+        context = self.get_rule_context()
+        keys = engine.required_discoveries(context)
+        scan_names = bool(keys) and self.name_scheme != NAME_SCHEME_HASH and \
+            self._alarm_name_index is None
+        with TRACER.span("metric_discovery"):
+            metrics = await asyncio.gather(
+                *[self.discover_metrics_async(aio_cloudwatch, key) for key in keys],
+                *([aio_cloudwatch.build_alarm_name_index(self.generate_alarm_prefix())]
+                  if scan_names else []))
+        if scan_names:
+            self._alarm_name_index = metrics.pop()
+        discovered = {key: self.build_metric_config(key_metrics, *METRIC_DISCOVERIES[key][2:])
+                      for key, key_metrics in zip(keys, metrics)}
+        with TRACER.span("template_render"):
+            alarms_conf = engine.generate(context, discovered)
+        self.logger.info("Generated %d alarms for %s", len(alarms_conf), self.hostname)
+        self.logger.debug("Alarms configuration: %s", alarms_conf)
+        return await self.put_alarms_async(alarms_conf, aio_cloudwatch)
+
+    def reconcile_alarms(self):
+        """
+        Fetch the current alarms of the instance in bulk and compare their canonical
+        fingerprint with the generated configuration. Only new or changed alarms are put,
+        alarms of the instance that are no longer generated are deleted.
+
+        Returns:
+            dict: created, updated, unchanged and removed counts, failed alarms with
+                  their error and alarm names not found after creation
+        """
+        instance_id = self.get_instance_id()
+        existing = {alarm["AlarmName"]: alarm for alarm in
+                    self.cloudwatch_client.iter_alarm_definitions(self.generate_alarm_prefix())}
+        self._alarm_name_index = AlarmNameIndex(existing)
+        # The alarms of the metrics no longer discovered are deleted, so the metrics are
+        # listed in full: a cached discovery can still hold an unmounted filesystem
+        alarms_conf = self.generate_alarms_conf(full_discovery=True)
+
+        new_alarms = [name for name in alarms_conf if name not in existing]
+        changed_alarms = [name for name in alarms_conf if name in existing and
+                          alarm_fingerprint(existing[name]) != alarm_fingerprint(alarms_conf[name])]
+        stale_alarms = [name for name, alarm in existing.items()
+                        if name not in alarms_conf and
+                        {"Name": "InstanceId", "Value": instance_id} in alarm.get("Dimensions", [])]
+        self.logger.info("Reconciling alarms for %s: new %s, changed %s, stale %s",
+                         self.hostname, new_alarms, changed_alarms, stale_alarms)
+
+        report = self.put_alarms({name: alarms_conf[name]
+                                  for name in new_alarms + changed_alarms})
+        outcomes = self.cloudwatch_client.delete_metric_alarms(stale_alarms)
+        self.record_progress(outcomes)
+        report["failed"].update({name: outcome for name, outcome in outcomes.items()
+                                 if outcome != ALARM_DELETED})
+        report.update({
+            "created": sum(1 for name in new_alarms if name in report["created"]),
+            "updated": sum(1 for name in changed_alarms if name in report["created"]),
+            "unchanged": len(alarms_conf) - len(new_alarms) - len(changed_alarms),
+            "removed": sum(1 for outcome in outcomes.values() if outcome == ALARM_DELETED)
+        })
+        return report
+
+    def put_alarms(self, alarms_conf):
+        """
+        Submit a PutMetricAlarm for each alarm, then confirm all the alarms together
+
+        Args:
+            alarms_conf: alarm configuration by alarm name
+
+        Returns:
+            dict: created alarm names, failed alarms with their error and
+                  alarm names not found after creation
+        """
+        if self.io_mode == ASYNC_IO:
+            return run_coroutine(self.put_alarms_async(alarms_conf))
+        self.logger.info("Creating %d alarms for the instance", len(alarms_conf))
+        failed_alarms = {}
+        submitted = []
+        max_workers = max(1, min(len(alarms_conf), PUT_ALARMS_MAX_WORKERS))
+        with TRACER.span("put_alarms", alarms=len(alarms_conf)), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_alarm = {executor.submit(TRACER.wrap_task("put_alarm", create_metric),
+                                               self.cloudwatch_client, alarm_name,
+                                               config): alarm_name
                                for alarm_name, config in alarms_conf.items()}
             for future in concurrent.futures.as_completed(future_to_alarm):
                 alarm_name = future_to_alarm[future]
                 try:
                     future.result()
+                    submitted.append(alarm_name)
                 except Exception as exc:
-                    failed_alarms.append({alarm_name: exc})
+                    failed_alarms[alarm_name] = str(exc)
+        self.record_progress(self.get_submit_outcomes(submitted, failed_alarms))
 
-        if failed_alarms:
-            raise Exception(f"Some alarms not created for {self.hostname}. "
-                            f"FailedAlarms: {failed_alarms}. InstanceId: {self.get_instance_id()}")
-        return f"Alarms created for {self.hostname}"
+        with TRACER.span("wait_for_alarms"):
+            unconfirmed = list(self.cloudwatch_client.wait_for_alarms(submitted))
+        report = self.get_put_report(submitted, failed_alarms, unconfirmed)
+        self.record_progress(self.get_confirm_outcomes(submitted, unconfirmed))
+        return report
+
+    async def put_alarms_async(self, alarms_conf, aio_cloudwatch=None):
+        """
+        Coroutine version of put_alarms, the PutMetricAlarm calls are bounded by the
+        client semaphore instead of a thread per alarm
+
+        Args:
+            alarms_conf: alarm configuration by alarm name
+            aio_cloudwatch: AsyncCloudWatchClient, created and closed by the call when not provided
+
+        Returns:
+            dict: see put_alarms
+        """
+        if aio_cloudwatch is None:
+            aio_cloudwatch = AsyncCloudWatchClient(self.cloudwatch_client)
+            try:
+                return await self.put_alarms_async(alarms_conf, aio_cloudwatch)
+            finally:
+                aio_cloudwatch.close()
+
+        self.logger.info("Creating %d alarms for the instance", len(alarms_conf))
+        names = list(alarms_conf)
+        with TRACER.span("put_alarms", alarms=len(alarms_conf)):
+            results = await asyncio.gather(
+                *[aio_cloudwatch.put_metric_alarm(name, **alarms_conf[name]) for name in names],
+                return_exceptions=True)
+        failed_alarms = {name: str(result) for name, result in zip(names, results)
+                         if isinstance(result, Exception)}
+        submitted = [name for name in names if name not in failed_alarms]
+        # The progress callable may block on the job store, it runs off the event loop
+        await get_running_loop().run_in_executor(
+            None, self.record_progress, self.get_submit_outcomes(submitted, failed_alarms))
+
+        with TRACER.span("wait_for_alarms"):
+            unconfirmed = list(await aio_cloudwatch.wait_for_alarms(submitted))
+        report = self.get_put_report(submitted, failed_alarms, unconfirmed)
+        await get_running_loop().run_in_executor(
+            None, self.record_progress, self.get_confirm_outcomes(submitted, unconfirmed))
+        return report
+
+    @staticmethod
+    def get_put_report(submitted, failed_alarms, unconfirmed):
+        """
+        Returns:
+            dict: see put_alarms
+        """
+        return {
+            "created": [name for name in submitted if name not in unconfirmed],
+            "failed": failed_alarms,
+            "unconfirmed": unconfirmed
+        }
+
+    @staticmethod
+    def get_submit_outcomes(submitted, failed_alarms):
+        """
+        Returns:
+            dict: outcome by alarm name once the PutMetricAlarm calls returned
+        """
+        outcomes = {name: "submitted" for name in submitted}
+        outcomes.update({name: f"failed: {error}" for name, error in failed_alarms.items()})
+        return outcomes
+
+    @staticmethod
+    def get_confirm_outcomes(submitted, unconfirmed):
+        """
+        Returns:
+            dict: outcome by alarm name once the submitted alarms are confirmed
+        """
+        return {name: "unconfirmed" if name in unconfirmed else "created"
+                for name in submitted}
+
+    def record_progress(self, outcomes):
+        """
+        Report the outcomes of the alarms of the host to the progress callable, if any.
+        The progress is informative: an error of the callable is logged and never fails
+        the alarms.
 
-    def generate_alarms_conf(self):
+        Args:
+            outcomes: outcome by alarm name
         """
-        Import the jinja template for configuration and replace variable
+        if self.progress is None:
+            return
+        try:
+            for alarm_name, outcome in outcomes.items():
+                self.progress(self.hostname, alarm_name, outcome)
+        except Exception as exc:
+            self.logger.warn("Progress of %s not recorded: %s", self.hostname, exc)
+
+    def generate_alarms_conf(self, full_discovery=False):
         """
-        fileloader = FileSystemLoader(searchpath=f"{THISDIR}/jinja_templates")
-        template_env = Environment(loader=fileloader, trim_blocks=True,
-                                   lstrip_blocks=True, autoescape=select_autoescape(['html', 'xml']))
-        alarm_config_template = template_env.get_template("alarm_config_template.jinja2")
-        alarm_config = alarm_config_template.render(instance=self)
-        self.logger.info(alarm_config)
-        return json.loads(alarm_config)
+        Prefetch the metrics the alarm rules need, then generate the alarms configuration
+
+        Args:
+            full_discovery: True to list the discovered metrics in full instead of using
+                            METRIC_DISCOVERY_CACHE, see get_discovered_metrics
 
-    def get_partition_config(self):
+        Returns:
+            dict: alarm configuration by alarm name
+        """
+        engine = get_alarm_rule_engine()
+        context = self.get_rule_context()
+        discoveries = {"partitions": self.get_partition_config,
+                       "filesystems": self.get_disk_space_config}
+        with TRACER.span("metric_discovery"):
+            discovered = {key: discoveries[key](full=full_discovery)
+                          for key in engine.required_discoveries(context)}
+        with TRACER.span("template_render"):
+            alarms_conf = engine.generate(context, discovered)
+        self.logger.info("Generated %d alarms for %s", len(alarms_conf), self.hostname)
+        self.logger.debug("Alarms configuration: %s", alarms_conf)
+        return alarms_conf
+
+    def get_rule_context(self):
+        """
+        Returns the values available to the alarm rules
+        """
+        return {
+            "hostname": self.hostname,
+            "prefix": self.generate_alarm_prefix(),
+            "platform": WINDOWS if self.is_windows_platform() else LINUX,
+            "instance_id": self.get_instance_id(),
+            "sns_topic_arn": self.sns_topic_arn,
+            "memory_namespace": self.get_memory_namespace()
+        }
+
+    def get_partition_config(self, full=False):
         """
         Retrieve the list of metrics defined for PartitionUtilization
         that have DriveLetter dimension
         Returns:
             list : dict of the alarmName, dimension value and dimensions
         """
-        metric_filter = {"Namespace": "System/Windows",
-                         "MetricName": "PartitionUtilization",
-                         "Dimensions": [
-                             {"Name": "InstanceId", "Value": f"{self.get_instance_id}"},
-                             {"Name": "DriveLetter"}
-                         ]
-                         }
-
-        return self.get_metric_config(metric_filter, "DriveLetter", "PartitionUtilizationGt85PercentFor60Mins")
+        return self.get_discovered_metrics("partitions", full)
 
-    def get_disk_space_config(self):
+    def get_disk_space_config(self, full=False):
         """
         Generate the alarm configuration for the DiskSpaceUtilization metric
         Returns:
             dict: key-value pair of alarm configuration and alarm name
         """
-        metric_filter = {"Namespace": "System/Linux",
-                         "MetricName": "DiskSpaceUtilization",
+        return self.get_discovered_metrics("filesystems", full)
+
+    def get_discovered_metrics(self, key, full=False):
+        """
+        Args:
+            key: discovery key
+            full: True to list the metrics in full, the listing refreshes the cache
+
+        Returns:
+            list: dict for each metric of the discovery key, see build_metric_config. The
+                  metrics are served from METRIC_DISCOVERY_CACHE while it is fresh.
+        """
+        _, _, dimension_name, metric_desc_suffix = METRIC_DISCOVERIES[key]
+        metrics = METRIC_DISCOVERY_CACHE.get(
+            self.get_discovery_cache_key(key),
+            lambda recently_active: self.cloudwatch_client.list_metrics(
+                self.get_discovery_filter(key, recently_active)), full=full)
+        return self.build_metric_config(metrics, dimension_name, metric_desc_suffix)
+
+    async def discover_metrics_async(self, aio_cloudwatch, key):
+        """
+        Coroutine version of the cached ListMetrics of get_discovered_metrics
+
+        Returns:
+            list: ListMetrics metrics of the discovery key
+        """
+        return await METRIC_DISCOVERY_CACHE.get_async(
+            self.get_discovery_cache_key(key),
+            lambda recently_active: aio_cloudwatch.list_metrics(
+                self.get_discovery_filter(key, recently_active)))
+
+    def get_discovery_cache_key(self, key):
+        """
+        Returns:
+            tuple: METRIC_DISCOVERY_CACHE key of the discovery key for the instance
+        """
+        return self.aws_creds.account, self.ec2_region, self.get_instance_id(), key
+
+    def get_discovery_filter(self, key, recently_active=False):
+        """
+        Args:
+            key: discovery key
+            recently_active: only list the metrics with data points in the past 3 hours
+
+        Returns:
+            dict: ListMetrics parameters for the metrics of the instance for the discovery key
+        """
+        namespace, metric_name, dimension_name, _ = METRIC_DISCOVERIES[key]
+        metric_filter = {"Namespace": namespace,
+                         "MetricName": metric_name,
                          "Dimensions": [
-                             {"Name": "InstanceId", "Value": f"{self.get_instance_id}"},
-                             {"Name": "Filesystem"}
+                             {"Name": "InstanceId", "Value": self.get_instance_id()},
+                             {"Name": dimension_name}
                          ]
                          }
-        return self.get_metric_config(metric_filter, "Filesystem", "DiskSpaceGt85PercentFor60Mins")
-
-    def get_metric_config(self, metric_filter, dimension_name, metric_desc_suffix):
-        """
-           Return list of dict with alarm name, dimension value and dimensions
-           Args:
-               metric_filter: filter to retrieve the metrics
-               dimension_name: the dimension name to retrieve. Ex: DriveLetter
-               metric_desc_suffix: description for the metric. Ex PartitionUtilizationGt85PercentFor60Mins
-           Returns:
-               List : dict for each metric
-       """
+        if recently_active:
+            metric_filter["RecentlyActive"] = RECENTLY_ACTIVE
+        return metric_filter
+
+    def build_metric_config(self, metrics, dimension_name, metric_desc_suffix):
+        """
+        Returns:
+            list: dict with alarm name, dimension value and dimensions for each listed metric
+        """
         metric_conf = []
-        metrics = self.cloudwatch_client.list_metrics(metric_filter)
         for metric in metrics:
             dimension_value = get_dimension_value(metric, dimension_name)
             prefix = f"{self.generate_alarm_prefix()}-{dimension_value}-{metric_desc_suffix}"
-            alarm_name = self.get_alarm_name(prefix)
+            alarm_name = self.get_alarm_name(prefix, metric.get("MetricName", ""),
+                                             get_full_dimension_value(metric, dimension_name))
             metric_conf.append({"alarmName": alarm_name,
                                 "dimensionValue": dimension_value,
-                                "dimensions": json.dumps(metric["Dimensions"])})
+                                "dimensions": metric["Dimensions"]})
         return metric_conf
 
     def get_instance_id(self):
@@ -163,17 +473,6 @@ class EC2Metrics:
         """
         return "Platform" in self.instance and self.instance["Platform"] == "Windows"
 
-    def get_default_actions(self):
-        return f""" "AlarmActions": ["{self.sns_topic_arn}"],
-        "OKActions": ["{self.sns_topic_arn}"]"""
-
-    def get_base_dimension(self):
-        return f""""Dimensions":[
-                    {{"Name": "InstanceId",
-                        "Value": "{self.get_instance_id()}"
-                    }}
-                    ]"""
-
     def generate_alarm_prefix(self):
         """
         Generate the cloudwatch alarm name prefix
@@ -181,11 +480,24 @@ class EC2Metrics:
         """
         return f"itx-alarms-{self.hostname}"
 
-    def get_alarm_name(self, prefix):
+    def get_alarm_name_index(self):
+        """
+        Returns the index of the existing alarms of the instance, scanned once per request
         """
-        Return alarm name for metric with same potential metric
+        if self._alarm_name_index is None:
+            self._alarm_name_index = self.cloudwatch_client.build_alarm_name_index(
+                self.generate_alarm_prefix())
+        return self._alarm_name_index
+
+    def get_alarm_name(self, prefix, metric_name=None, dimension_value=None):
         """
-        existing_name = self.cloudwatch_client.find_existing_alarm_name(prefix)
+        Return alarm name for metric with same potential metric. With the hash scheme
+        the name is derived from the hostname, metric name and full dimension value,
+        else the existing uuid-suffixed name is looked up in the alarm name index.
+        """
+        if self.name_scheme == NAME_SCHEME_HASH and metric_name and dimension_value is not None:
+            return get_hashed_alarm_name(prefix, self.hostname, metric_name, dimension_value)
+        existing_name = self.get_alarm_name_index().find_unique(prefix)
         if not existing_name:
             return prefix + "-" + str(uuid.uuid1())
         return existing_name
@@ -204,8 +516,8 @@ def get_dimension_value(metric, dimension):
     use the first 5 characters of the last section of the filesystem.
     If not a filesystem (no / in input_string) we return the input_string
     """
-    dimension_value = jmespath.search(f"Dimensions[?Name == '{dimension}'].Value", metric)
-    input_string = dimension_value[0]
+    input_string = next(item["Value"] for item in metric["Dimensions"]
+                        if item["Name"] == dimension)
     try:
         if input_string == '/':
             return ''
@@ -217,6 +529,14 @@ def get_dimension_value(metric, dimension):
         return ''
 
 
+def get_full_dimension_value(metric, dimension):
+    """
+    Returns:
+        str: value of the dimension of a Cloudwatch metric dict, not shortened
+    """
+    return next((item["Value"] for item in metric["Dimensions"] if item["Name"] == dimension), "")
+
+
 def alphanum_string(input_string):
     """
     Removes all non-alphanumeric characters from the given string.
@@ -226,4 +546,4 @@ def alphanum_string(input_string):
 
 
 def create_metric(client, name, config):
-    client.create_metric_alarm(name, **config)
+    client.put_metric_alarm(name, **config)
@@ -4,17 +4,23 @@ Handler for ec2 alarms api
 """
 
 from sls.utils.lambda_handler_helper import process_api_request
+from sls.utils.aio import THREAD_IO, IO_MODES
 from sls.utils.aws_creds import AwsCreds
 from sls.utils.aws_resource_groups_tagging import ResourceGroupsTaggingClient
 from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
-from sls.utils.exceptions import SnsTopicNotFound
+from sls.utils.exceptions import SnsTopicNotFound, InvalidParameter
 from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
 
 logger = Logger()
 SNS_TOPIC_TAG_KEY = "vpcx-Cloudwatch-Alarm-Topic"
 SNS_TOPIC_TAG_VALUE = "true"
+RECONCILE_MODE = "reconcile"
+# Name of create_alarms in the job worker registry
+OPERATION = "create_ec2_alarms"
 
 
+@TRACER.traced("sns_lookup")
 def get_sns_topic_arn(aws_creds, ec2_region):
     """
     Retrieves the sns topic arn for the account
@@ -27,12 +33,13 @@ def get_sns_topic_arn(aws_creds, ec2_region):
     return sns_topic_arn
 
 
-def create_alarms(event):
+def create_alarms(event, progress=None):
     """
     Create the alarms
 
     Args:
         event: API gateway proxy event
+        progress: callable(hostname, alarm_name, outcome) recording the progress of a job
 
     Returns:
     """
@@ -40,6 +47,11 @@ def create_alarms(event):
     account_id = path_params.get('account_id')
     region = path_params.get('region_name')
     hostname = path_params.get('ec2_hostname')
+    query_params = event.get('queryStringParameters') or {}
+    reconcile = query_params.get('mode') == RECONCILE_MODE
+    io_mode = query_params.get('io') or THREAD_IO
+    if io_mode not in IO_MODES:
+        raise InvalidParameter(f"io must be one of {', '.join(IO_MODES)}")
 
     aws_creds = AwsCreds(account_id, logger)
     sns_topic_arn = get_sns_topic_arn(aws_creds, region)
@@ -48,8 +60,9 @@ def create_alarms(event):
     logger.info(f"Region: {region}")
     logger.info(f"Hostname: {hostname}")
 
-    ec2_metrics = EC2Metrics(aws_creds, region, hostname, sns_topic_arn, logger)
-    return ec2_metrics.create_all_alarms()
+    ec2_metrics = EC2Metrics(aws_creds, region, hostname, sns_topic_arn, logger, io_mode=io_mode,
+                             progress=progress)
+    return ec2_metrics.create_all_alarms(reconcile=reconcile)
 
 
 def handler(event, context):
@@ -57,6 +70,6 @@ def handler(event, context):
     api entry function
     """
     logger.info(context)
-    output = process_api_request(event, create_alarms, logger)
+    output = process_api_request(event, create_alarms, logger, operation=OPERATION)
     logger.info(output)
     return output
@@ -0,0 +1,83 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+
+import os, sys
+module_dir = os.path.dirname(os.path.abspath(__file__))
+module_par = os.path.normpath(os.path.join(module_dir, '../../../../'))
+sys.path.append(module_par)
+from sls.ec2_alarms_api.create_ec2_alarms.alarm_rules import (get_alarm_rule_engine,
+                                                              AlarmRuleEngine, compile_value)
+
+
+def get_context(hostname="AWS_test", platform="linux"):
+    return {
+        "hostname": hostname,
+        "prefix": f"itx-alarms-{hostname}",
+        "platform": platform,
+        "instance_id": "i-1",
+        "sns_topic_arn": "test_sns",
+        "memory_namespace": "System/Windows" if platform == "windows" else "System/Linux"
+    }
+
+
+def get_discovered_metric(name, value, dimension_name):
+    return {"alarmName": name, "dimensionValue": value,
+            "dimensions": [{"Name": "InstanceId", "Value": "i-1"},
+                           {"Name": dimension_name, "Value": value}]}
+
+
+class TestAlarmRules(unittest.TestCase):
+    def setUp(self):
+        self.engine = get_alarm_rule_engine()
+
+    def test_engine_loaded_once(self):
+        self.assertIs(self.engine, get_alarm_rule_engine())
+
+    def test_compile_value(self):
+        value = compile_value({"A": ["{x}-1", 2], "B": "static"})
+        self.assertEqual(value({"x": "y"}), {"A": ["y-1", 2], "B": "static"})
+        self.assertIsNot(value({"x": "y"})["A"], value({"x": "y"})["A"])
+
+    def test_linux_aws_hostname(self):
+        context = get_context()
+        self.assertEqual(self.engine.required_discoveries(context), ["filesystems"])
+        discovered = {"filesystems": [get_discovered_metric("fs-alarm", "tmpfs", "Filesystem")]}
+        alarms_conf = self.engine.generate(context, discovered)
+        self.assertEqual(sorted(alarms_conf), sorted([
+            "itx-alarms-AWS_test-StatusCheckFailedfor10Mins",
+            "itx-alarms-AWS_test-CpuUtilizationGt95PercentFor60Mins",
+            "itx-alarms-AWS_test-MemoryUtilizationGt95PercentFor60Mins",
+            "itx-alarms-AWS_test-SwapspaceUtilizationGt95PercentFor60Mins",
+            "fs-alarm"
+        ]))
+        cpu = alarms_conf["itx-alarms-AWS_test-CpuUtilizationGt95PercentFor60Mins"]
+        self.assertEqual(cpu["Dimensions"], [{"Name": "InstanceId", "Value": "i-1"}])
+        self.assertEqual(cpu["AlarmActions"], ["test_sns"])
+        self.assertEqual(cpu["Threshold"], 95)
+        self.assertEqual(alarms_conf["fs-alarm"]["AlarmDescription"],
+                         "AWS_test tmpfs  DiskSpace > 85% for 60 mins")
+        self.assertEqual(alarms_conf["fs-alarm"]["Dimensions"],
+                         discovered["filesystems"][0]["dimensions"])
+        memory = alarms_conf["itx-alarms-AWS_test-MemoryUtilizationGt95PercentFor60Mins"]
+        self.assertEqual(memory["AlarmDescription"], "AWS_test Memory Utilization > 95% for 60 mins")
+
+    def test_windows_hostname(self):
+        context = get_context("test", "windows")
+        self.assertEqual(self.engine.required_discoveries(context), ["partitions"])
+        discovered = {"partitions": [get_discovered_metric("e-alarm", "E", "DriveLetter"),
+                                     get_discovered_metric("f-alarm", "F", "DriveLetter")]}
+        alarms_conf = self.engine.generate(context, discovered)
+        self.assertEqual(sorted(alarms_conf), sorted([
+            "e-alarm", "f-alarm",
+            "itx-alarms-test-StatusCheckFailedfor10Mins",
+            "itx-alarms-test-CpuUtilizationGt95PercentFor60Mins"
+        ]))
+        self.assertEqual(alarms_conf["f-alarm"]["Namespace"], "System/Windows")
+
+    def test_custom_rules(self):
+        engine = AlarmRuleEngine([{"id": "Custom", "name": "{prefix}-Custom",
+                                   "when": {"hostname_prefix": "DB"},
+                                   "properties": {"MetricName": "Custom"}}])
+        self.assertEqual(engine.generate(get_context(), {}), {})
+        self.assertEqual(engine.generate(get_context("DB1"), {}),
+                         {"itx-alarms-DB1-Custom": {"MetricName": "Custom"}})
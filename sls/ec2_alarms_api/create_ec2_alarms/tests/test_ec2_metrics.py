@@ -1,11 +1,14 @@
 import unittest
 
-from unittest.mock import patch, call
+from unittest.mock import patch, call, MagicMock
 import os, sys
 module_dir = os.path.dirname(os.path.abspath(__file__))
 module_par = os.path.normpath(os.path.join(module_dir, '../../../../'))
 sys.path.append(module_par)
 from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
+from sls.utils.aio import ASYNC_IO
+from sls.utils.aws_cloudwatch import AlarmNameIndex
+from sls.utils.metric_discovery_cache import METRIC_DISCOVERY_CACHE
 
 
 def get_driver_letter_name(hostname):
@@ -32,13 +35,16 @@ class TestEC2Metrics(unittest.TestCase):
     @patch("sls.utils.aws_creds.AwsCreds")
     def setUp(self, mock_creds):
         self.aws_creds = mock_creds.return_value
+        METRIC_DISCOVERY_CACHE.invalidate()
+        self.addCleanup(METRIC_DISCOVERY_CACHE.invalidate)
 
     def call_create_metric(self, mock_get_instance, mock_cloudwatch, hostname,
                            platform="Windows", status="running",
                            list_metrics_return=[]):
         cloudwatch_client = mock_cloudwatch.return_value
         cloudwatch_client.list_metrics.return_value = list_metrics_return
-        cloudwatch_client.find_existing_alarm_name.return_value = None
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        cloudwatch_client.wait_for_alarms.return_value = []
 
         mock_get_instance.return_value = {
             "InstanceId": "test_ec2_metrics_instance_id",
@@ -134,3 +140,188 @@ class TestEC2Metrics(unittest.TestCase):
                                 hostname, platform="linux", list_metrics_return=list_metrics_return)
 
         self.assertEqual(len(mock_create_metric.mock_calls), 5)
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_alarm_name_index_scanned_once(self, mock_get_instance, mock_cloudwatch):
+        hostname = "AWS_test"
+        prefix = get_filesystem_name(hostname).format(filesystem="data-")
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex([prefix + "existing"])
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns")
+
+        self.assertEqual(ec2_metric.get_alarm_name(prefix), prefix + "existing")
+        self.assertTrue(ec2_metric.get_alarm_name(prefix + "other").startswith(prefix + "other-"))
+        cloudwatch_client.build_alarm_name_index.assert_called_once_with(f"itx-alarms-{hostname}")
+        cloudwatch_client.find_existing_alarm_name.assert_not_called()
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_hash_scheme_names_without_lookup(self, mock_get_instance, mock_cloudwatch):
+        hostname = "AWS_test"
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.list_metrics.return_value = [
+            {"MetricName": "DiskSpaceUtilization", "Dimensions": [
+                {"Name": "InstanceId", "Value": "test_ec2_metrics_instance_id"},
+                {"Name": "Filesystem", "Value": f"/dev/{device}"}]}
+            for device in ("nvme1n1", "nvme1n2")]
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns")
+        ec2_metric.name_scheme = "hash"
+
+        names = [metric["alarmName"] for metric in ec2_metric.get_disk_space_config()]
+        self.assertEqual(names, [metric["alarmName"]
+                                 for metric in ec2_metric.get_disk_space_config()])
+        self.assertEqual(len(set(names)), 2)
+        self.assertTrue(names[0].startswith(get_filesystem_name(hostname).format(
+            filesystem="nvme1-")))
+        cloudwatch_client.build_alarm_name_index.assert_not_called()
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_discovery_cached_per_instance(self, mock_get_instance, mock_cloudwatch):
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.list_metrics.return_value = [
+            {"MetricName": "DiskSpaceUtilization", "Dimensions": [
+                {"Name": "InstanceId", "Value": "test_ec2_metrics_instance_id"},
+                {"Name": "Filesystem", "Value": "/data"}]}]
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        for _ in range(3):
+            ec2_metric = EC2Metrics(self.aws_creds, "test_region", "host", "test_sns")
+            self.assertEqual(len(ec2_metric.get_disk_space_config()), 1)
+        cloudwatch_client.list_metrics.assert_called_once_with(
+            ec2_metric.get_discovery_filter("filesystems"))
+        self.assertEqual(ec2_metric.get_discovery_filter("filesystems", recently_active=True)[
+            "RecentlyActive"], "PT3H")
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_unconfirmed_alarms_reported(self, mock_get_instance, mock_cloudwatch):
+        hostname = "test"
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        cloudwatch_client.wait_for_alarms.return_value = [get_cpu_name(hostname)]
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns")
+
+        report = ec2_metric.create_alarms_report()
+        self.assertEqual(report["created"], [get_status_failed_name(hostname)])
+        self.assertEqual(report["unconfirmed"], [get_cpu_name(hostname)])
+        self.assertEqual(cloudwatch_client.put_metric_alarm.call_count, 2)
+        cloudwatch_client.create_metric_alarm.assert_not_called()
+        self.assertRaises(Exception, ec2_metric.create_all_alarms)
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_progress_recorded_per_alarm(self, mock_get_instance, mock_cloudwatch):
+        hostname = "test"
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        cloudwatch_client.wait_for_alarms.return_value = [get_cpu_name(hostname)]
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        progress = {}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns",
+                                progress=lambda host, name, outcome:
+                                progress.__setitem__((host, name), outcome))
+
+        ec2_metric.create_alarms_report()
+        self.assertEqual(progress, {(hostname, get_status_failed_name(hostname)): "created",
+                                    (hostname, get_cpu_name(hostname)): "unconfirmed"})
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_progress_error_does_not_fail_alarms(self, mock_get_instance, mock_cloudwatch):
+        hostname = "test"
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        cloudwatch_client.wait_for_alarms.return_value = []
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id"}
+        progress = MagicMock(side_effect=Exception("ProvisionedThroughputExceededException"))
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns",
+                                progress=progress)
+
+        report = ec2_metric.create_alarms_report()
+        self.assertEqual(len(report["created"]), 2)
+        self.assertEqual(report["failed"], {})
+        self.assertTrue(progress.called)
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_reconcile_alarms(self, mock_get_instance, mock_cloudwatch):
+        hostname = "test"
+        instance_id = "test_ec2_metrics_instance_id"
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.wait_for_alarms.return_value = []
+        mock_get_instance.return_value = {"InstanceId": instance_id, "Platform": "Windows"}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns")
+        cloudwatch_client.list_metrics.return_value = []
+        cloudwatch_client.build_alarm_name_index.return_value = AlarmNameIndex()
+        desired = ec2_metric.generate_alarms_conf()
+        status_failed = get_status_failed_name(hostname)
+        cpu_name = get_cpu_name(hostname)
+        stale_name = get_driver_letter_name(hostname).format(drive_letter="E-") + "-uuid"
+        other_host_alarm = "itx-alarms-test-other-CpuUtilizationGt95PercentFor60Mins"
+        changed_cpu = dict(desired[cpu_name], AlarmName=cpu_name, Threshold=90.0)
+        cloudwatch_client.iter_alarm_definitions.return_value = [
+            dict(desired[status_failed], AlarmName=status_failed),
+            changed_cpu,
+            {"AlarmName": stale_name, "Dimensions": [{"Name": "InstanceId", "Value": instance_id},
+                                                     {"Name": "DriveLetter", "Value": "E"}]},
+            {"AlarmName": other_host_alarm, "Dimensions": [{"Name": "InstanceId", "Value": "i-2"}]}
+        ]
+        cloudwatch_client.delete_metric_alarms.return_value = {stale_name: "deleted"}
+
+        result = ec2_metric.create_all_alarms(reconcile=True)
+        self.assertEqual(result, {"created": 0, "updated": 1, "unchanged": 1, "removed": 1})
+        cloudwatch_client.put_metric_alarm.assert_called_once_with(cpu_name, **desired[cpu_name])
+        cloudwatch_client.delete_metric_alarms.assert_called_once_with([stale_name])
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_reconcile_lists_metrics_in_full(self, mock_get_instance, mock_cloudwatch):
+        cloudwatch_client = mock_cloudwatch.return_value
+        cloudwatch_client.wait_for_alarms.return_value = []
+        cloudwatch_client.iter_alarm_definitions.return_value = []
+        cloudwatch_client.delete_metric_alarms.return_value = {}
+        cloudwatch_client.list_metrics.return_value = [
+            {"Dimensions": [{"Name": "InstanceId", "Value": "test_ec2_metrics_instance_id"},
+                            {"Name": "DriveLetter", "Value": "E:"}]}]
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id",
+                                          "Platform": "Windows"}
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", "test", "test_sns")
+        self.assertEqual(len(ec2_metric.get_partition_config()), 1)
+
+        # The cached discovery still holds E:, reconcile lists the partitions again
+        cloudwatch_client.list_metrics.return_value = []
+        ec2_metric.create_all_alarms(reconcile=True)
+        self.assertEqual(cloudwatch_client.list_metrics.call_count, 2)
+        self.assertNotIn("RecentlyActive", cloudwatch_client.list_metrics.call_args.args[0])
+        self.assertEqual(ec2_metric.get_partition_config(), [])
+
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.CloudWatchClient")
+    @patch("sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics.EC2Metrics.get_instance")
+    def test_create_alarms_report_asyncio(self, mock_get_instance, mock_cloudwatch):
+        hostname = "test"
+        client = mock_cloudwatch.return_value.client
+        client.describe_alarms.side_effect = lambda **kwargs: {"MetricAlarms": [
+            {"AlarmName": name} for name in kwargs.get("AlarmNames", [])]}
+        client.list_metrics.return_value = {"Metrics": [
+            {"Dimensions": [{"Name": "InstanceId", "Value": "test_ec2_metrics_instance_id"},
+                            {"Name": "DriveLetter", "Value": "C:"}]}]}
+        mock_get_instance.return_value = {"InstanceId": "test_ec2_metrics_instance_id",
+                                          "Platform": "Windows"}
+        progress = MagicMock()
+        ec2_metric = EC2Metrics(self.aws_creds, "test_region", hostname, "test_sns",
+                                io_mode=ASYNC_IO, progress=progress)
+
+        report = ec2_metric.create_alarms_report()
+        self.assertEqual(len(report["created"]), 3)
+        self.assertEqual(progress.call_count, 6)
+        self.assertEqual(report["failed"], {})
+        self.assertEqual(report["unconfirmed"], [])
+        self.assertEqual(client.put_metric_alarm.call_count, 3)
+        self.assertTrue(any(name.startswith(get_driver_letter_name(hostname).format(drive_letter="C-"))
+                            for name in report["created"]))
+        mock_cloudwatch.return_value.put_metric_alarm.assert_not_called()
@@ -1,22 +1,25 @@
-# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
 """
 Handler to delete ec2 alarms api
 """
 
 from sls.utils.lambda_handler_helper import process_api_request
 from sls.utils.aws_creds import AwsCreds
-from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.utils.aws_cloudwatch import CloudWatchClient, ALARM_DELETED
 from sls.utils.logger import Logger
 
 logger = Logger()
+# Name of delete_alarms in the job worker registry
+OPERATION = "delete_ec2_alarms"
 
 
-def delete_alarms(event):
+def delete_alarms(event, progress=None):
     """
     Create the alarms
 
     Args:
         event: API gateway proxy event
+        progress: callable(hostname, alarm_name, outcome) recording the progress of a job
 
     Returns:
     """
@@ -34,7 +37,17 @@ def delete_alarms(event):
     cloudwatch_client = CloudWatchClient(aws_creds, region, logger)
     alarm_prefix = f"itx-alarms-{hostname}"
     alarms_names = cloudwatch_client.find_existing_alarms_list(alarm_prefix)
-    cloudwatch_client.delete_metric_alarms(alarms_names)
+    outcomes = cloudwatch_client.delete_metric_alarms(alarms_names)
+    if progress is not None:
+        try:
+            for name, outcome in outcomes.items():
+                progress(hostname, name, outcome)
+        except Exception as exc:
+            logger.warn("Progress of %s not recorded: %s", hostname, exc)
+    not_deleted = {name: outcome for name, outcome in outcomes.items()
+                   if outcome != ALARM_DELETED}
+    if not_deleted:
+        raise Exception(f"Some alarms not deleted for {hostname}. FailedAlarms: {not_deleted}")
     return f" EC2 Alarms: {alarms_names} deleted for {hostname}"
 
 
@@ -43,6 +56,6 @@ def handler(event, context):
     api entry function
     """
     logger.info(context)
-    output = process_api_request(event, delete_alarms, logger)
+    output = process_api_request(event, delete_alarms, logger, operation=OPERATION)
     logger.info(output)
     return output
@@ -0,0 +1,185 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
+"""
+Handler creating and deleting the alarms of EC2 instances from batches of EC2 instance
+state-change events, delivered by EventBridge through an SQS queue
+"""
+import collections
+import concurrent.futures
+import json
+import os
+
+from sls.utils.aws_creds import AwsCreds
+from sls.utils.aws_cloudwatch import CloudWatchClient, ALARM_DELETED
+from sls.utils.aws_ec2 import EC2Client, get_hostname
+from sls.utils.hostname_index import HOSTNAME_INDEX
+from sls.ec2_alarms_api.create_ec2_alarms.ec2_metrics import EC2Metrics
+from sls.ec2_alarms_api.create_ec2_alarms.index import get_sns_topic_arn
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+STATE_RUNNING = "running"
+STATE_TERMINATED = "terminated"
+HANDLED_STATES = (STATE_RUNNING, STATE_TERMINATED)
+# Instances of one account and region processed in parallel
+STATE_CHANGE_MAX_WORKERS = int(os.environ.get("STATE_CHANGE_MAX_WORKERS", "10"))
+
+
+def parse_records(records):
+    """
+    Group the state-change events of a batch by account and region, keeping the latest
+    running or terminated event of each instance. Malformed records are dropped.
+
+    Args:
+        records: SQS records whose body is an EventBridge EC2 state-change event
+
+    Returns:
+        dict: {(account, region): {instance id: (state, [SQS message ids])}}
+    """
+    latest = {}
+    for record in records:
+        try:
+            event = json.loads(record["body"])
+            key = (event["account"], event["region"], event["detail"]["instance-id"])
+            state = event["detail"]["state"]
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.error(f"Dropping malformed record {record.get('messageId')}: {exc}")
+            continue
+        if state not in HANDLED_STATES:
+            continue
+        latest_time, latest_state, message_ids = latest.get(key, ("", None, []))
+        if event.get("time", "") >= latest_time:
+            latest_time, latest_state = event.get("time", ""), state
+        latest[key] = (latest_time, latest_state, message_ids + [record["messageId"]])
+
+    groups = collections.defaultdict(dict)
+    for (account, region, instance_id), (_, state, message_ids) in latest.items():
+        groups[(account, region)][instance_id] = (state, message_ids)
+    return groups
+
+
+def create_instance_alarms(aws_creds, region, hostname, instance, sns_topic_arn,
+                           cloudwatch_client):
+    """
+    Returns:
+        bool: True when every alarm of the instance is created and confirmed
+    """
+    HOSTNAME_INDEX.upsert((aws_creds.account, region), hostname, instance)
+    ec2_metrics = EC2Metrics(aws_creds, region, hostname, sns_topic_arn, logger,
+                             instance=instance, cloudwatch_client=cloudwatch_client)
+    report = ec2_metrics.create_alarms_report()
+    if report["failed"] or report["unconfirmed"]:
+        logger.error(f"Some alarms not created for {hostname}. FailedAlarms: {report['failed']}. "
+                     f"UnconfirmedAlarms: {report['unconfirmed']}")
+        return False
+    logger.info(f"{len(report['created'])} alarms created for {hostname}")
+    return True
+
+
+def delete_instance_alarms(aws_creds, region, hostname, instance_id, cloudwatch_client):
+    """
+    Delete the alarms of the host having the InstanceId dimension of the terminated
+    instance, the alarms of a replacement instance with the same hostname are kept
+
+    Returns:
+        bool: True when every alarm of the instance is deleted
+    """
+    HOSTNAME_INDEX.remove((aws_creds.account, region), hostname, instance_id)
+    dimension = {"Name": "InstanceId", "Value": instance_id}
+    names = [alarm["AlarmName"] for alarm in
+             cloudwatch_client.iter_alarm_definitions(f"itx-alarms-{hostname}")
+             if dimension in alarm.get("Dimensions", [])]
+    outcomes = cloudwatch_client.delete_metric_alarms(names)
+    not_deleted = {name: outcome for name, outcome in outcomes.items()
+                   if outcome != ALARM_DELETED}
+    if not_deleted:
+        logger.error(f"Some alarms not deleted for {hostname}. FailedAlarms: {not_deleted}")
+        return False
+    logger.info(f"{len(names)} alarms deleted for {hostname}")
+    return True
+
+
+def apply_state_change(aws_creds, region, instance_id, state, instance, sns_topic_arn,
+                       cloudwatch_client):
+    """
+    Create or delete the alarms of one instance
+
+    Returns:
+        bool: False when the change must be retried
+    """
+    if instance is None:
+        # A new instance may not be visible yet, a terminated one is already gone
+        logger.info(f"Instance {instance_id} not found for state {state}")
+        return state != STATE_RUNNING
+    hostname = get_hostname(instance)
+    if not hostname:
+        logger.info(f"Instance {instance_id} has no Hostname tag, skipping")
+        return True
+    try:
+        if state == STATE_RUNNING:
+            if instance.get("State", {}).get("Name") != STATE_RUNNING:
+                logger.info(f"Instance {instance_id} is no longer running, skipping")
+                return True
+            return create_instance_alarms(aws_creds, region, hostname, instance, sns_topic_arn,
+                                          cloudwatch_client)
+        return delete_instance_alarms(aws_creds, region, hostname, instance_id,
+                                      cloudwatch_client)
+    except Exception as exc:
+        logger.error(f"Alarms not updated for {hostname} ({instance_id}): {exc}")
+        return False
+
+
+def process_account_region(account, region, changes, max_workers=STATE_CHANGE_MAX_WORKERS):
+    """
+    Apply the state changes of one account and region. Credentials, the instance
+    lookup, the SNS topic and the cloudwatch client are shared by the whole batch.
+
+    Args:
+        changes: {instance id: (state, message ids)}
+
+    Returns:
+        list: instance ids whose change failed
+    """
+    aws_creds = AwsCreds(account, logger)
+    ec2_client = EC2Client(aws_creds, region, logger)
+    cloudwatch_client = CloudWatchClient(aws_creds, region, logger)
+    with TRACER.span("instance_lookup"):
+        instances = ec2_client.get_instances_by_ids(list(changes))
+    sns_topic_arn = None
+    if any(state == STATE_RUNNING for state, _ in changes.values()):
+        sns_topic_arn = get_sns_topic_arn(aws_creds, region)
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_instance = {
+            executor.submit(TRACER.wrap_task("state_change", apply_state_change),
+                            aws_creds, region, instance_id, state, instances.get(instance_id),
+                            sns_topic_arn, cloudwatch_client): instance_id
+            for instance_id, (state, _) in changes.items()}
+        for future in concurrent.futures.as_completed(future_to_instance):
+            if not future.result():
+                failed.append(future_to_instance[future])
+    return failed
+
+
+def handler(event, context):
+    """
+    SQS entry function, the records whose change failed are returned as batch item
+    failures so only they are delivered again
+    """
+    logger.set_new_uuid()
+    TRACER.start_trace(logger.get_uuid())
+    failures = []
+    try:
+        for (account, region), changes in parse_records(event.get("Records", [])).items():
+            logger.info(f"Applying {len(changes)} state changes in {account} {region}")
+            try:
+                failed = process_account_region(account, region, changes)
+            except Exception as exc:
+                logger.error(f"State changes not applied in {account} {region}: {exc}")
+                failed = list(changes)
+            failures.extend(message_id for instance_id in failed
+                            for message_id in changes[instance_id][1])
+    finally:
+        TRACER.end_trace()
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]}
@@ -0,0 +1,104 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sls.ec2_alarms_api.ec2_state_change_alarms.index import handler, parse_records
+from sls.utils.tracing import TRACER
+
+MODULE = "sls.ec2_alarms_api.ec2_state_change_alarms.index"
+EVENTS_FILE = os.path.join(os.path.dirname(__file__), "events", "ec2_state_change_events.json")
+
+
+def get_sqs_event(events):
+    """Feed recorded EventBridge events the way the SQS event source delivers them"""
+    return {"Records": [{"messageId": f"message-{number}", "body": json.dumps(event),
+                         "eventSource": "aws:sqs"} for number, event in enumerate(events)]}
+
+
+def get_recorded_events():
+    with open(EVENTS_FILE) as events_file:
+        return json.load(events_file)
+
+
+def get_instance(instance_id, hostname, state="running"):
+    return {"InstanceId": instance_id, "State": {"Name": state},
+            "Tags": [{"Key": "Hostname", "Value": hostname}]}
+
+
+class TestEC2StateChangeAlarms(unittest.TestCase):
+    def setUp(self):
+        patchers = [patch.object(TRACER, "exporter", MagicMock())]
+        for name in ("AwsCreds", "EC2Client", "CloudWatchClient", "EC2Metrics",
+                     "get_sns_topic_arn", "HOSTNAME_INDEX"):
+            patchers.append(patch(f"{MODULE}.{name}"))
+        self.mocks = {}
+        for patcher in patchers:
+            self.mocks[getattr(patcher, "attribute", None)] = patcher.start()
+            self.addCleanup(patcher.stop)
+        instances = {"i-0000000000000001": get_instance("i-0000000000000001", "host1"),
+                     "i-0000000000000002": get_instance("i-0000000000000002", "host2",
+                                                        "terminated"),
+                     "i-0000000000000003": get_instance("i-0000000000000003", "host3",
+                                                        "terminated"),
+                     "i-0000000000000004": get_instance("i-0000000000000004", "host4")}
+        self.mocks["AwsCreds"].side_effect = lambda account, logger: MagicMock(account=account)
+        ec2_client = self.mocks["EC2Client"].return_value
+        ec2_client.get_instances_by_ids.side_effect = lambda ids: {
+            instance_id: instances[instance_id] for instance_id in ids if instance_id in instances}
+        cloudwatch_client = self.mocks["CloudWatchClient"].return_value
+        cloudwatch_client.iter_alarm_definitions.side_effect = lambda prefix: [
+            {"AlarmName": f"{prefix}-Cpu", "Dimensions": [
+                {"Name": "InstanceId", "Value": "i-0000000000000003"}]},
+            {"AlarmName": f"{prefix}-Replacement", "Dimensions": [
+                {"Name": "InstanceId", "Value": "i-0000000000000009"}]}]
+        cloudwatch_client.delete_metric_alarms.side_effect = lambda names: {
+            name: "deleted" for name in names}
+        self.mocks["EC2Metrics"].return_value.create_alarms_report.return_value = {
+            "created": ["alarm"], "failed": {}, "unconfirmed": []}
+
+    def test_parse_records(self):
+        groups = parse_records(get_sqs_event(get_recorded_events())["Records"] +
+                               [{"messageId": "bad", "body": "not json"}])
+        self.assertEqual(sorted(groups), [("123456789012", "us-east-1"),
+                                          ("210987654321", "us-west-2")])
+        self.assertEqual(groups[("123456789012", "us-east-1")]["i-0000000000000002"],
+                         ("terminated", ["message-1", "message-3"]))
+        self.assertNotIn("i-0000000000000005", groups[("210987654321", "us-west-2")])
+
+    def test_batch_applied_per_account_and_region(self):
+        response = handler(get_sqs_event(get_recorded_events()), None)
+
+        self.assertEqual(response, {"batchItemFailures": []})
+        self.assertEqual(self.mocks["AwsCreds"].call_count, 2)
+        self.assertEqual(self.mocks["EC2Client"].return_value.get_instances_by_ids.call_count, 2)
+        self.assertEqual(self.mocks["get_sns_topic_arn"].call_count, 2)
+        created = sorted(call.args[2] for call in self.mocks["EC2Metrics"].call_args_list)
+        self.assertEqual(created, ["host1", "host4"])
+        deleted = [call.args[0] for call in
+                   self.mocks["CloudWatchClient"].return_value.delete_metric_alarms.call_args_list]
+        self.assertEqual(sorted(deleted), [[], ["itx-alarms-host3-Cpu"]])
+        self.mocks["HOSTNAME_INDEX"].remove.assert_any_call(
+            ("123456789012", "us-east-1"), "host3", "i-0000000000000003")
+
+    def test_failed_changes_reported_for_retry(self):
+        self.mocks["EC2Metrics"].return_value.create_alarms_report.return_value = {
+            "created": [], "failed": {"alarm": "throttled"}, "unconfirmed": []}
+        self.mocks["get_sns_topic_arn"].side_effect = [Exception("no topic"), "topic"]
+        response = handler(get_sqs_event(get_recorded_events()), None)
+        failures = sorted(item["itemIdentifier"] for item in response["batchItemFailures"])
+        # Every record of the first account, and the failed create of the second
+        self.assertEqual(failures, ["message-0", "message-1", "message-2", "message-3",
+                                    "message-4"])
+
+    def test_new_request_id_per_invocation(self):
+        with patch.object(TRACER, "start_trace") as start_trace:
+            handler({"Records": []}, None)
+            handler({"Records": []}, None)
+        first, second = (call.args[0] for call in start_trace.call_args_list)
+        self.assertNotEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
+"""
+Handler returning the status of an asynchronous alarm job
+"""
+
+from sls.utils.lambda_handler_helper import process_api_request
+from sls.utils.jobs import get_job_store, public_job
+from sls.utils.exceptions import ResourceNotFound
+from sls.utils.logger import Logger
+
+logger = Logger()
+
+
+def get_alarm_job(event):
+    """
+    Return the status, alarm outcome counts by host and result of a job of the account
+
+    Args:
+        event: API gateway proxy event
+
+    Returns:
+        dict: the job
+    """
+    path_params = event.get('pathParameters', {})
+    account_id = path_params.get('account_id')
+    job_id = path_params.get('job_id')
+    job = get_job_store().get(job_id) if job_id else None
+    if job is None or job.get("account_id") != account_id:
+        raise ResourceNotFound(f"Job not found: {job_id}")
+    return public_job(job)
+
+
+def handler(event, context):
+    """
+    api entry function
+    """
+    logger.info(context)
+    output = process_api_request(event, get_alarm_job, logger)
+    logger.info(output)
+    return output
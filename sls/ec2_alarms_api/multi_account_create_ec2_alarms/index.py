@@ -0,0 +1,224 @@
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position, broad-except
+"""
+Handler creating the alarms of the hosts of many accounts and regions in one invocation.
+The credentials of every account are prefetched concurrently, then the hosts are processed
+in parallel with a limit per account and a global limit.
+"""
+import functools
+import time
+
+from sls.utils.aws_creds import AwsCreds, prefetch_creds
+from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.utils.aws_ec2 import EC2Client
+from sls.utils.fanout import run_bounded
+from sls.ec2_alarms_api.batch_create_ec2_alarms.index import (create_host_alarms,
+                                                              MAX_BATCH_HOSTNAMES,
+                                                              DEFAULT_MAX_WORKERS,
+                                                              MAX_WORKERS_LIMIT)
+from sls.ec2_alarms_api.create_ec2_alarms.index import get_sns_topic_arn
+from sls.utils.exceptions import InvalidParameter
+from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
+
+logger = Logger()
+MAX_TARGETS = 500
+DEFAULT_MAX_TOTAL_WORKERS = 50
+MAX_TOTAL_WORKERS_LIMIT = 200
+HOST_STATUSES = ("created", "failed", "not_found")
+
+
+def parse_target(target):
+    """
+    Validate one target: {"account_id": "itx-000", "region": "us-east-1"} with either
+    "hostnames" or "tag_filters", see batch_create_ec2_alarms
+
+    Returns:
+        dict: account_id, region, hostnames and tag_filters
+    """
+    if not isinstance(target, dict) or not target.get('account_id') or not target.get('region'):
+        raise InvalidParameter("Each target needs an account_id and a region")
+    hostnames = target.get('hostnames') or []
+    tag_filters = target.get('tag_filters') or []
+    if bool(hostnames) == bool(tag_filters):
+        raise InvalidParameter(f"Provide either hostnames or tag_filters for "
+                               f"{target['account_id']} {target['region']}")
+    if not isinstance(hostnames, list) or not all(isinstance(name, str) for name in hostnames):
+        raise InvalidParameter("hostnames must be a list of strings")
+    if len(hostnames) > MAX_BATCH_HOSTNAMES:
+        raise InvalidParameter(f"At most {MAX_BATCH_HOSTNAMES} hostnames can be provided "
+                               "per target")
+    if not isinstance(tag_filters, list) or not all(
+            isinstance(tag_filter, dict) and tag_filter.get('Key')
+            and isinstance(tag_filter.get('Values'), list) for tag_filter in tag_filters):
+        raise InvalidParameter("tag_filters must be a list of {'Key': key, 'Values': [values]}")
+    return {"account_id": target['account_id'], "region": target['region'],
+            "hostnames": list(dict.fromkeys(hostnames)), "tag_filters": tag_filters}
+
+
+def parse_limit(event, name, default, limit):
+    """
+    Returns:
+        int: the integer option of the event, between 1 and limit
+    """
+    try:
+        value = int(event.get(name, default))
+    except (TypeError, ValueError) as error:
+        raise InvalidParameter(f"{name} must be an integer") from error
+    if not 1 <= value <= limit:
+        raise InvalidParameter(f"{name} must be between 1 and {limit}")
+    return value
+
+
+def parse_multi_account_request(event):
+    """
+    Validate the event
+
+    Args:
+        event: {"targets": [target, ...], "max_workers": hosts in flight per account,
+                "max_total_workers": hosts in flight for the whole invocation}
+
+    Returns:
+        tuple: targets, max_workers, max_total_workers
+    """
+    targets = event.get('targets')
+    if not isinstance(targets, list) or not targets:
+        raise InvalidParameter("targets must be a non empty list")
+    if len(targets) > MAX_TARGETS:
+        raise InvalidParameter(f"At most {MAX_TARGETS} targets can be provided")
+    return ([parse_target(target) for target in targets],
+            parse_limit(event, 'max_workers', DEFAULT_MAX_WORKERS, MAX_WORKERS_LIMIT),
+            parse_limit(event, 'max_total_workers', DEFAULT_MAX_TOTAL_WORKERS,
+                        MAX_TOTAL_WORKERS_LIMIT))
+
+
+def prepare_target(target):
+    """
+    Look up the SNS topic and the instances of one account and region, with clients
+    shared by the hosts of the target
+
+    Returns:
+        dict: the target with aws_creds, sns_topic_arn, cloudwatch_client and
+              instances by hostname
+    """
+    aws_creds = AwsCreds(target["account_id"], logger)
+    region = target["region"]
+    ec2_client = EC2Client(aws_creds, region, logger)
+    with TRACER.span("instance_lookup"):
+        if target["hostnames"]:
+            instances = ec2_client.get_running_instances_by_hostnames(target["hostnames"])
+        else:
+            instances = ec2_client.get_running_instances_by_tags(target["tag_filters"])
+    return dict(target, aws_creds=aws_creds, instances=instances,
+                sns_topic_arn=get_sns_topic_arn(aws_creds, region),
+                cloudwatch_client=CloudWatchClient(aws_creds, region, logger))
+
+
+def get_not_found_results(target):
+    """
+    Returns:
+        list: not_found result for each hostname of the target without a running instance
+    """
+    return [{"hostname": hostname, "status": "not_found",
+             "message": "Running instance with tag key: Hostname "
+                        f"and tag value: {hostname} not found"}
+            for hostname in target["hostnames"] if hostname not in target["instances"]]
+
+
+def get_account_report(account, errors, results, started, finished):
+    """
+    Returns:
+        dict: host counts, failures and hosts per second of one account
+    """
+    counts = {status: sum(1 for result in results if result["status"] == status)
+              for status in HOST_STATUSES}
+    elapsed = max((finished or 0) - (started or 0), 1e-6) if started is not None else 0
+    processed = counts["created"] + counts["failed"]
+    return dict(counts, account_id=account, errors=errors,
+                failures=[result for result in results if result["status"] == "failed"],
+                elapsed_seconds=round(elapsed, 3),
+                hosts_per_second=round(processed / elapsed, 1) if elapsed else 0)
+
+
+def create_alarms_multi_account(event, clock=time.monotonic):
+    """
+    Create the alarms of the hosts of every target
+
+    Args:
+        event: see parse_multi_account_request
+        clock: callable returning monotonic seconds
+
+    Returns:
+        dict: summary of the invocation and report of each account
+    """
+    targets, max_workers, max_total_workers = parse_multi_account_request(event)
+    started = clock()
+    accounts = list(dict.fromkeys(target["account_id"] for target in targets))
+    logger.info(f"Creating alarms for {len(targets)} targets in {len(accounts)} accounts")
+
+    with TRACER.span("prefetch_credentials", accounts=len(accounts)):
+        credential_errors = prefetch_creds(accounts, logger, max_workers=max_total_workers)
+    errors = {account: [f"Credentials not retrieved: {error}"]
+              for account, error in credential_errors.items()}
+    for account in accounts:
+        errors.setdefault(account, [])
+
+    with TRACER.span("prepare_targets", targets=len(targets)):
+        prepared = run_bounded(
+            {account: [functools.partial(TRACER.wrap_task("prepare_target", prepare_target),
+                                         target)
+                       for target in targets if target["account_id"] == account]
+             for account in accounts if account not in credential_errors},
+            max_workers, max_total_workers, clock)
+
+    results = {account: [] for account in accounts}
+    host_tasks = {}
+    for account, outcome in prepared.items():
+        host_tasks[account] = []
+        for target in outcome["results"]:
+            if isinstance(target, Exception):
+                errors[account].append(str(target))
+                continue
+            results[account].extend(get_not_found_results(target))
+            host_tasks[account].extend(
+                functools.partial(TRACER.wrap_task("host_alarms", create_host_alarms),
+                                  target["aws_creds"], target["region"], hostname, instance,
+                                  target["sns_topic_arn"], target["cloudwatch_client"])
+                for hostname, instance in target["instances"].items())
+
+    with TRACER.span("create_alarms", hosts=sum(len(tasks) for tasks in host_tasks.values())):
+        created = run_bounded(host_tasks, max_workers, max_total_workers, clock)
+
+    reports = []
+    for account in accounts:
+        account_started = prepared.get(account, {}).get("started")
+        account_finished = created.get(account, {}).get("finished") or \
+            prepared.get(account, {}).get("finished")
+        results[account].extend(created.get(account, {}).get("results", []))
+        report = get_account_report(account, errors[account], results[account],
+                                    account_started, account_finished)
+        logger.info("Account report", **{key: value for key, value in report.items()
+                                          if key != "failures"})
+        reports.append(report)
+
+    elapsed = max(clock() - started, 1e-6)
+    summary = {status: sum(report[status] for report in reports) for status in HOST_STATUSES}
+    summary.update(accounts=len(accounts),
+                   accounts_failed=sum(1 for report in reports
+                                       if report["errors"] or report["failed"]),
+                   elapsed_seconds=round(elapsed, 3),
+                   hosts_per_second=round((summary["created"] + summary["failed"]) / elapsed, 1))
+    return {"summary": summary, "accounts": reports}
+
+
+def handler(event, context):
+    """
+    Entry function invoked directly, ex: by an orchestration job or aws lambda invoke
+    """
+    logger.set_new_uuid()
+    TRACER.start_trace(logger.get_uuid())
+    try:
+        output = create_alarms_multi_account(event)
+        logger.info("Multi-account summary", **output["summary"])
+        return output
+    finally:
+        TRACER.end_trace()
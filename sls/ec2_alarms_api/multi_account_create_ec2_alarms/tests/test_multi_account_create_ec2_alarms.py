@@ -0,0 +1,91 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sls.ec2_alarms_api.multi_account_create_ec2_alarms.index import (
+    handler, parse_multi_account_request)
+from sls.utils.exceptions import InvalidParameter
+from sls.utils.tracing import TRACER
+
+MODULE = "sls.ec2_alarms_api.multi_account_create_ec2_alarms.index"
+
+
+def get_instances(hostnames):
+    return {hostname: {"InstanceId": f"i-{hostname}"} for hostname in hostnames
+            if hostname != "missing"}
+
+
+class TestParseMultiAccountRequest(unittest.TestCase):
+    def test_invalid_requests(self):
+        for event in ({}, {"targets": []},
+                      {"targets": [{"account_id": "itx-000"}]},
+                      {"targets": [{"account_id": "itx-000", "region": "us-east-1"}]},
+                      {"targets": [{"account_id": "itx-000", "region": "us-east-1",
+                                    "hostnames": ["host"]}], "max_total_workers": 0}):
+            with self.assertRaises(InvalidParameter):
+                parse_multi_account_request(event)
+
+    def test_defaults(self):
+        targets, max_workers, max_total_workers = parse_multi_account_request(
+            {"targets": [{"account_id": "itx-000", "region": "us-east-1",
+                          "hostnames": ["host", "host"]}]})
+        self.assertEqual(targets[0]["hostnames"], ["host"])
+        self.assertEqual((max_workers, max_total_workers), (10, 50))
+
+
+class TestMultiAccountCreateAlarms(unittest.TestCase):
+    def setUp(self):
+        patchers = [patch.object(TRACER, "exporter", MagicMock())]
+        for name in ("AwsCreds", "EC2Client", "CloudWatchClient", "get_sns_topic_arn",
+                     "prefetch_creds", "create_host_alarms"):
+            patchers.append(patch(f"{MODULE}.{name}"))
+        self.mocks = {}
+        for patcher in patchers:
+            self.mocks[getattr(patcher, "attribute", None)] = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mocks["AwsCreds"].side_effect = lambda account, logger: MagicMock(account=account)
+        self.mocks["prefetch_creds"].return_value = {"itx-002": "Invalid account"}
+        ec2_client = self.mocks["EC2Client"].return_value
+        ec2_client.get_running_instances_by_hostnames.side_effect = get_instances
+        ec2_client.get_running_instances_by_tags.return_value = get_instances(["web1", "web2"])
+        self.mocks["create_host_alarms"].side_effect = \
+            lambda aws_creds, region, hostname, *args: {
+                "hostname": hostname, "status": "failed" if hostname == "bad" else "created"}
+
+    def test_accounts_reported(self):
+        event = {"targets": [
+            {"account_id": "itx-000", "region": "us-east-1", "hostnames": ["host1", "missing"]},
+            {"account_id": "itx-000", "region": "us-west-2", "tag_filters": [
+                {"Key": "Environment", "Values": ["dev"]}]},
+            {"account_id": "itx-001", "region": "us-east-1", "hostnames": ["host2", "bad"]},
+            {"account_id": "itx-002", "region": "us-east-1", "hostnames": ["host3"]}],
+            "max_workers": 2, "max_total_workers": 3}
+        output = handler(event, None)
+
+        self.mocks["prefetch_creds"].assert_called_once()
+        self.assertEqual(self.mocks["prefetch_creds"].call_args[0][0],
+                         ["itx-000", "itx-001", "itx-002"])
+        reports = {report["account_id"]: report for report in output["accounts"]}
+        self.assertEqual((reports["itx-000"]["created"], reports["itx-000"]["not_found"]),
+                         (3, 1))
+        self.assertEqual(reports["itx-001"]["failed"], 1)
+        self.assertEqual(reports["itx-001"]["failures"], [{"hostname": "bad",
+                                                          "status": "failed"}])
+        self.assertEqual(reports["itx-002"]["errors"],
+                         ["Credentials not retrieved: Invalid account"])
+        self.assertGreater(reports["itx-000"]["hosts_per_second"], 0)
+        self.assertEqual(output["summary"]["accounts_failed"], 2)
+        self.assertEqual(output["summary"]["created"], 4)
+        # No lookup for the account without credentials
+        self.assertEqual(self.mocks["get_sns_topic_arn"].call_count, 3)
+
+    def test_target_failure_reported(self):
+        self.mocks["get_sns_topic_arn"].side_effect = Exception("no topic")
+        output = handler({"targets": [{"account_id": "itx-000", "region": "us-east-1",
+                                       "hostnames": ["host1"]}]}, None)
+        self.assertEqual(output["accounts"][0]["errors"], ["no topic"])
+        self.assertEqual(output["accounts"][0]["hosts_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
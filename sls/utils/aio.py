@@ -0,0 +1,166 @@
+"""
+Module to run the CloudWatch operations of the alarm puts on asyncio with bounded
+concurrency. With a regular boto3 client the calls still block, so they run on an
+executor of `concurrency` threads per client: the event loop bounds the calls in flight
+and shares that executor across the hosts of a batch, it does not remove the threads.
+Only a coroutine client, ex: aiobotocore, runs the calls without threads.
+"""
+# pylint: disable=protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
+import asyncio
+import concurrent.futures
+import functools
+import os
+
+from sls.utils.aws_cloudwatch import AlarmNameIndex, MAX_ALARM_NAMES, ALARM_WAIT_TIMEOUT
+from sls.utils.backoff import chunks, poll_with_backoff_async
+from sls.utils.tracing import TRACER
+
+THREAD_IO = "threads"
+ASYNC_IO = "asyncio"
+IO_MODES = (THREAD_IO, ASYNC_IO)
+# Maximum number of AWS calls in flight for one client
+DEFAULT_CONCURRENCY = int(os.environ.get("ASYNC_IO_CONCURRENCY", "50"))
+# asyncio.get_running_loop is not available before python 3.7, where get_event_loop
+# returns the running loop when called from a coroutine
+get_running_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+
+
+def run_coroutine(coroutine):
+    """
+    Run a coroutine to completion on a new event loop
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class AsyncClient:
+    """
+    Coroutine interface over a boto3 client with a semaphore bounding the calls in flight.
+
+    Clients whose methods are coroutine functions (ex: aiobotocore) are awaited directly.
+    The methods of a regular boto3 client run on an executor sized to the concurrency.
+    Create instances from inside the event loop that will use them.
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Args:
+            client: boto3 client
+            concurrency: maximum number of calls in flight
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._executor = None
+
+    async def call(self, operation, **kwargs):
+        """
+        Call a client operation. Ex: await call("describe_alarms", AlarmNames=names)
+        """
+        method = getattr(self.client, operation)
+        async with self.semaphore:
+            if asyncio.iscoroutinefunction(method):
+                return await method(**kwargs)
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.concurrency)
+            return await get_running_loop().run_in_executor(
+                self._executor, TRACER.wrap_task(f"executor.{operation}",
+                                                 functools.partial(method, **kwargs)))
+
+    async def paginate(self, operation, token_key="NextToken", request_token_key=None, **kwargs):
+        """
+        Call a paginated operation until the response has no token
+
+        Args:
+            operation: client operation
+            token_key: response key of the pagination token
+            request_token_key: request parameter of the pagination token, token_key when None
+            kwargs: operation parameters
+
+        Returns:
+            list: response pages
+        """
+        pages = []
+        while True:
+            page = await self.call(operation, **kwargs)
+            pages.append(page)
+            token = page.get(token_key)
+            if not token:
+                return pages
+            kwargs[request_token_key or token_key] = token
+
+    def close(self):
+        """
+        Release the executor threads
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class AsyncCloudWatchClient(AsyncClient):
+    """Coroutine version of the CloudWatchClient operations"""
+
+    def __init__(self, cloudwatch_client, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Args:
+            cloudwatch_client: CloudWatchClient instance
+            concurrency: maximum number of calls in flight
+        """
+        super().__init__(cloudwatch_client.client, concurrency)
+
+    async def put_metric_alarm(self, alarm_name, **kwargs):
+        """
+        Create or update Cloudwatch alarm without waiting for it to exist
+        """
+        await self.call("put_metric_alarm", AlarmName=alarm_name, **kwargs)
+
+    async def get_existing_alarm_names(self, alarm_names):
+        """
+        Returns:
+            set: names of the alarms that exist among alarm_names, checked 100 names per call
+        """
+        responses = await asyncio.gather(*[
+            self.call("describe_alarms", AlarmNames=names, MaxRecords=MAX_ALARM_NAMES)
+            for names in chunks(list(alarm_names), MAX_ALARM_NAMES)])
+        return {alarm["AlarmName"] for response in responses for alarm in
+                response.get("MetricAlarms", []) + response.get("CompositeAlarms", [])}
+
+    async def find_missing_alarms(self, alarm_names):
+        """
+        Returns the alarm names not returned by DescribeAlarms
+        """
+        found = await self.get_existing_alarm_names(alarm_names)
+        return [name for name in alarm_names if name not in found]
+
+    async def wait_for_alarms(self, alarm_names, timeout=ALARM_WAIT_TIMEOUT):
+        """
+        Wait for alarms to exist, re-checking only the unconfirmed ones with backoff
+
+        Returns:
+            list: alarm names still not found at the deadline
+        """
+        return await poll_with_backoff_async(alarm_names, self.find_missing_alarms, timeout)
+
+    async def list_metrics(self, kwargs):
+        """
+        Returns:
+            list: metrics matching the ListMetrics parameters, across all the pages
+        """
+        pages = await self.paginate("list_metrics", **kwargs)
+        return [metric for page in pages for metric in page.get("Metrics", [])]
+
+    async def build_alarm_name_index(self, prefix):
+        """
+        Returns:
+            AlarmNameIndex: index of the MetricAlarm names matching the prefix
+        """
+        pages = await self.paginate("describe_alarms", AlarmNamePrefix=prefix,
+                                    AlarmTypes=["MetricAlarm"])
+        return AlarmNameIndex(alarm["AlarmName"] for page in pages
+                              for alarm in page.get("MetricAlarms", []))
+
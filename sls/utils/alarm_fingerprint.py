@@ -0,0 +1,71 @@
+"""
+Module to compare alarm definitions returned by DescribeAlarms with PutMetricAlarm parameters
+"""
+import hashlib
+import json
+
+# PutMetricAlarm parameters compared, with the value CloudWatch assumes when omitted
+ALARM_DEFAULTS = {
+    "AlarmDescription": "",
+    "ActionsEnabled": True,
+    "OKActions": [],
+    "AlarmActions": [],
+    "InsufficientDataActions": [],
+    "MetricName": None,
+    "Namespace": None,
+    "Statistic": None,
+    "ExtendedStatistic": None,
+    "Dimensions": [],
+    "Period": None,
+    "Unit": None,
+    "EvaluationPeriods": None,
+    "DatapointsToAlarm": None,
+    "Threshold": None,
+    "ComparisonOperator": None,
+    "TreatMissingData": "missing",
+    "EvaluateLowSampleCountPercentile": None,
+    "Metrics": None,
+    "ThresholdMetricId": None,
+}
+UNORDERED_LISTS = ("OKActions", "AlarmActions", "InsufficientDataActions")
+
+
+def normalize_alarm(alarm):
+    """
+    Returns the canonical form of an alarm definition. Defaults are filled in,
+    action lists and dimensions are sorted and the threshold is a float.
+
+    Args:
+        alarm: DescribeAlarms MetricAlarm or PutMetricAlarm parameters
+    """
+    normalized = {}
+    for key, default in ALARM_DEFAULTS.items():
+        value = alarm.get(key)
+        normalized[key] = default if value is None else value
+    for key in UNORDERED_LISTS:
+        normalized[key] = sorted(normalized[key])
+    normalized["Dimensions"] = sorted([dimension["Name"], dimension.get("Value")]
+                                      for dimension in normalized["Dimensions"])
+    if normalized["Threshold"] is not None:
+        normalized["Threshold"] = float(normalized["Threshold"])
+    if normalized["DatapointsToAlarm"] == normalized["EvaluationPeriods"]:
+        normalized["DatapointsToAlarm"] = None
+    return normalized
+
+
+def alarm_fingerprint(alarm):
+    """
+    Returns:
+        str: hash of the canonical alarm definition
+    """
+    canonical = json.dumps(normalize_alarm(alarm), sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def get_put_parameters(alarm):
+    """
+    Returns:
+        dict: PutMetricAlarm parameters, without AlarmName, recreating an alarm
+              definition returned by DescribeAlarms
+    """
+    return {key: alarm[key] for key in ALARM_DEFAULTS if alarm.get(key) is not None}
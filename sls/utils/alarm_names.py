@@ -0,0 +1,50 @@
+"""
+Module to name the alarms of discovered metrics. The legacy scheme appends a uuid1 to the
+alarm name, so the name of an existing alarm has to be looked up before it is updated. The
+hash scheme derives the suffix from the hostname, the metric name and the full dimension
+value, so the name is computed without any call.
+"""
+import hashlib
+import os
+import re
+
+NAME_SCHEME_UUID = "uuid"
+NAME_SCHEME_HASH = "hash"
+# Suffix of the alarm names of discovered metrics, switch to hash once the existing
+# alarms are renamed by the alarm_name_migration function
+ALARM_NAME_SCHEME = os.environ.get("ALARM_NAME_SCHEME", NAME_SCHEME_UUID)
+# Hexadecimal characters of the sha256 kept in the suffix
+HASH_SUFFIX_LENGTH = 12
+UUID1_SUFFIX = re.compile(r"-[0-9a-f]{8}-[0-9a-f]{4}-1[0-9a-f]{3}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def get_hash_suffix(hostname, metric_name, dimension_value):
+    """
+    Returns:
+        str: stable suffix of the alarm of a metric of a host
+    """
+    key = "\n".join((hostname, metric_name, dimension_value)).encode()
+    return hashlib.sha256(key).hexdigest()[:HASH_SUFFIX_LENGTH]
+
+
+def get_hashed_alarm_name(prefix, hostname, metric_name, dimension_value):
+    """
+    Args:
+        prefix: alarm name without suffix. Ex: itx-alarms-host-xvda1-DiskSpaceGt85PercentFor60Mins
+        hostname: value of the Hostname tag
+        metric_name: metric of the alarm. Ex: DiskSpaceUtilization
+        dimension_value: full value of the discovered dimension. Ex: /dev/xvda1
+
+    Returns:
+        str: alarm name of the hash scheme
+    """
+    return f"{prefix}-{get_hash_suffix(hostname, metric_name, dimension_value)}"
+
+
+def strip_uuid_suffix(alarm_name):
+    """
+    Returns:
+        str: the alarm name without its uuid1 suffix, None when it has none
+    """
+    match = UUID1_SUFFIX.search(alarm_name)
+    return alarm_name[:match.start()] if match else None
@@ -3,7 +3,7 @@ Module to get apihost from cloudformation stack
 """
 # pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module,import-error, wrong-import-position
 
-import boto3
+from sls.utils import get_boto3_client
 from sls.utils.aws_creds import AwsCreds
 
 
@@ -21,14 +21,8 @@ def boto3_client(context, service, logger):
     """
     aws_creds = AwsCreds(context.admin_account, logger)
     credentials = aws_creds.get_creds()
-    client = boto3.client(
-        service_name=service,
-        region_name=context.admin_region,
-        aws_access_key_id=credentials.get("AccessKeyId", ""),
-        aws_secret_access_key=credentials.get("SecretAccessKey", ""),
-        aws_session_token=credentials.get("SessionToken", ""),
-    )
-    return client
+    return get_boto3_client(service, context.admin_region, credentials,
+                            account=context.admin_account)
 
 
 def set_api_host(context, logger, env):
@@ -4,43 +4,90 @@ This module is used to do API calls to AWSAPI Microservices
 # pylint:disable= no-member, invalid-name, E0401, W1203, C0411
 import logging
 import os
+import threading
 import time
-import boto3
+from typing import TYPE_CHECKING
 
 #from cloudx_sls_authorization.create_token import get_bearer_token
-from flask import Response
-from requests import request as req
+
+from sls.utils import get_boto3_client
+from sls.utils.secret_cache import SECRET_CACHE
+
+if TYPE_CHECKING:
+    from requests import Response
 
 HTTP_GET = "get"
 HTTP_PUT = "put"
 HTTP_POST = "post"
 
+# Connections kept open per host by the shared session, one per concurrent credential fetch
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "50"))
+
 lgr = logging.getLogger()
 lgr.setLevel(logging.INFO)
 
+_SESSION = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def get_http_session():
+    """
+    Returns the requests.Session shared by the vpcxiam calls of the container, so
+    concurrent and successive calls reuse pooled keep-alive connections. requests is
+    imported on the first call instead of at import.
+    """
+    with _SESSION_LOCK:
+        if "session" not in _SESSION:
+            import requests  # pylint: disable=import-outside-toplevel
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE,
+                                                    pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION["session"] = session
+        return _SESSION["session"]
+
+
+def req(method, url, **kwargs):
+    """
+    requests.request on the shared session of get_http_session
+    """
+    return get_http_session().request(method, url, **kwargs)
+
 
 def boto_session_client(region, secret_name):
     """
-    Create boto client using a session
+    Retrieve the secret with the local credentials
 
     Args:
         region:
         secret_name:
 
     Returns:
+        dict: GetSecretValue response
+    """
+    return get_boto3_client("secretsmanager", region).get_secret_value(SecretId=secret_name)
 
+
+def fetch_secret_value(region_secret, secret_name):
     """
-    session = boto3.Session()
-    return (
-        session.client("secretsmanager", region)
-            .get_secret_value(SecretId=secret_name)
-            .get("SecretString")
-    )
+    Retrieve the secret, retrying once when the local credentials expired
+
+    Returns:
+        dict: GetSecretValue response
+    """
+    try:
+        return boto_session_client(region_secret, secret_name)
+    except Exception as error:
+        if "ExpiredTokenException" in str(error):
+            time.sleep(10)
+            return boto_session_client(region_secret, secret_name)
+        raise error
 
 
 def get_secret_value():
     """
-        Retrieve the client secret value for the app
+        Retrieve the client secret value for the app, cached by SECRET_CACHE
 
         Args:
 
@@ -51,15 +98,8 @@ def get_secret_value():
     secret_name = os.environ.get(
         "app_secret_name", "clx-awsapi-ec2-provisioning"
     )
-    try:
-        client_secret = boto_session_client(region_secret, secret_name)
-    except Exception as error:
-        if "ExpiredTokenException" in error.args[0]:
-            time.sleep(10)
-            client_secret = boto_session_client(region_secret, secret_name)
-        else:
-            raise error
-    return client_secret
+    return SECRET_CACHE.get((None, region_secret, secret_name),
+                            lambda: fetch_secret_value(region_secret, secret_name))
 
 
 class ApiRequests:
@@ -120,7 +160,7 @@ class ApiRequests:
             scope: str = None,
             additional_headers: dict = None,
             additional_payload: dict = None,
-    ) -> Response:
+    ) -> "Response":
         """
         Make a Http request to the provided url
 
@@ -5,22 +5,28 @@ Module for retrieving LDAP credential
 import logging
 import json
 import os
-import boto3
 
 #from cloudx_sls_authorization import lambda_auth
+from sls.utils import get_boto3_client
 from sls.utils.exceptions import Unauthorized
+from sls.utils.secret_cache import SECRET_CACHE
 
 # Initialize Logger
 LOGGER = logging.getLogger()
 LOGGER.setLevel(logging.INFO)
 
-# Define secrets client
-SECRETS_CLIENT = boto3.client('secretsmanager')
+
+def get_secrets_client():
+    """
+    Returns the pooled secrets client of the function region,
+    created on first use instead of at import
+    """
+    return get_boto3_client('secretsmanager', os.environ.get('AWS_REGION'))
 
 
 def retrieve_azure_auth_credentials():
     """
-    Retrieve password from secrets manager
+    Retrieve password from secrets manager, cached by SECRET_CACHE
 
     Args:
 
@@ -28,10 +34,11 @@ def retrieve_azure_auth_credentials():
          string: password
     """
     azure_auth_secret_name = os.environ.get('AZURE_AUTH_SECRET_NAME')
-    secret_response = SECRETS_CLIENT.get_secret_value(
-        SecretId=azure_auth_secret_name
+    secret_string = SECRET_CACHE.get(
+        ("azure_auth", azure_auth_secret_name),
+        lambda: get_secrets_client().get_secret_value(SecretId=azure_auth_secret_name)
     )
-    secret = json.loads(secret_response['SecretString'])
+    secret = json.loads(secret_string)
     return secret['client_secret']
 
 
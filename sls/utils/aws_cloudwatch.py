@@ -2,13 +2,79 @@
 Module to make cloudwatch calls
 """
 # pylint: disable=protected-access, arguments-differ,no-name-in-module, import-error, wrong-import-position
-import time
-import jmespath
+import bisect
+import collections
+import concurrent.futures
 
 from sls.utils.logger import Logger
 from sls.utils import get_boto3_client
+from sls.utils.backoff import chunks, poll_with_backoff
+from sls.utils.tracing import TRACER
 
 lgr = Logger()
+# DescribeAlarms and DeleteAlarms accept at most 100 alarm names
+MAX_ALARM_NAMES = 100
+# Seconds to wait for created alarms to be returned by DescribeAlarms
+ALARM_WAIT_TIMEOUT = 60
+# Maximum number of DeleteAlarms chunks submitted in parallel
+MAX_DELETE_WORKERS = 10
+ALARM_DELETED = "deleted"
+ALARM_NOT_DELETED = "not_deleted"
+# Window used by ListMetrics when only recently active metrics are requested
+RECENTLY_ACTIVE = "PT3H"
+
+MetricRecord = collections.namedtuple("MetricRecord", ["namespace", "metric_name", "dimensions"])
+AlarmRecord = collections.namedtuple("AlarmRecord",
+                                     ["name", "namespace", "metric_name", "dimensions"])
+
+
+class AlarmNameIndex:
+    """
+    In-memory index of alarm names, sorted so prefix lookups are answered
+    with a binary search instead of a DescribeAlarms call
+    """
+
+    def __init__(self, names=None):
+        """
+        Args:
+            names: iterable of alarm names
+        """
+        self._names = sorted(set(names or []))
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """
+        Add an alarm name to the index
+        """
+        position = bisect.bisect_left(self._names, name)
+        if position == len(self._names) or self._names[position] != name:
+            self._names.insert(position, name)
+
+    def find_with_prefix(self, prefix):
+        """
+        Returns:
+            List: alarm names starting with prefix
+        """
+        matches = []
+        position = bisect.bisect_left(self._names, prefix)
+        while position < len(self._names) and self._names[position].startswith(prefix):
+            matches.append(self._names[position])
+            position += 1
+        return matches
+
+    def find_unique(self, prefix):
+        """
+        Same contract as CloudWatchClient.find_existing_alarm_name
+
+        Returns:
+            String: the alarm name if one alarm is found with the prefix else None
+        """
+        matches = self.find_with_prefix(prefix)
+        if len(matches) == 1:
+            return matches[0]
+        return None
 
 
 class CloudWatchClient:
@@ -27,7 +93,8 @@ class CloudWatchClient:
         self.rds_region = rds_region
         self.aws_creds = aws_creds
         self.credentials = self.aws_creds.get_creds()
-        self.client = get_boto3_client("cloudwatch", self.rds_region, self.credentials)
+        self.client = get_boto3_client("cloudwatch", self.rds_region, self.credentials,
+                                       account=self.aws_creds.account)
 
     def create_metric_alarm(self, alarm_name, **kwargs):
         """Create Cloudwatch alarm
@@ -49,6 +116,64 @@ class CloudWatchClient:
                 alarm_name,
             ])
 
+    def put_metric_alarm(self, alarm_name, **kwargs):
+        """Create or update Cloudwatch alarm without waiting for it to exist.
+           Use wait_for_alarms to confirm a set of alarms at once.
+
+             Args:
+                 alarm_name: name of the alarm
+                 kwargs: other properties of the alarm
+
+             Raises:
+                 ClientError: Boto3 error
+        """
+        self.client.put_metric_alarm(AlarmName=alarm_name, **kwargs)
+
+    def find_missing_alarms(self, alarm_names):
+        """
+        Returns the alarm names not returned by DescribeAlarms, checked 100 names per call
+
+        Args:
+            alarm_names: list of alarm names
+        """
+        found = self.get_existing_alarm_names(alarm_names)
+        return [name for name in alarm_names if name not in found]
+
+    def find_existing_alarms(self, alarm_names):
+        """
+        Returns the alarm names returned by DescribeAlarms, checked 100 names per call
+
+        Args:
+            alarm_names: list of alarm names
+        """
+        found = self.get_existing_alarm_names(alarm_names)
+        return [name for name in alarm_names if name in found]
+
+    def get_existing_alarm_names(self, alarm_names):
+        """
+        Returns:
+            set: names of the alarms that exist among alarm_names
+        """
+        found = set()
+        for names in chunks(list(alarm_names), MAX_ALARM_NAMES):
+            response = self.client.describe_alarms(AlarmNames=names, MaxRecords=MAX_ALARM_NAMES)
+            found.update(alarm['AlarmName'] for alarm in
+                         response.get('MetricAlarms', []) + response.get('CompositeAlarms', []))
+        return found
+
+    def wait_for_alarms(self, alarm_names, timeout=ALARM_WAIT_TIMEOUT):
+        """
+        Wait for alarms to exist, re-checking only the unconfirmed ones with backoff
+
+        Args:
+            alarm_names: list of alarm names
+            timeout: seconds to wait
+
+        Returns:
+            list: alarm names still not found at the deadline
+        """
+        return poll_with_backoff(alarm_names, self.find_missing_alarms, timeout)
+
     def alarms_exist(self, **kwargs):
         """
         Checks if alarm exists
@@ -76,33 +201,103 @@ class CloudWatchClient:
         Returns:
             List: alarms names
         """
-        alarms = self.client.describe_alarms(AlarmNamePrefix=prefix)
-        return jmespath.search("MetricAlarms[].AlarmName", alarms)
+        return [alarm.name for alarm in self.iter_alarms(prefix)]
 
-    def delete_metric_alarms(self, alarm_name):
+    def iter_alarms(self, prefix=None, alarm_types=('MetricAlarm',)):
         """
-        Deletes a list of alarms
+        Lazily iterate over the alarms matching a prefix, following NextToken
+
+        Args:
+            prefix: alarm name prefix, every alarm when None
+            alarm_types: DescribeAlarms AlarmTypes
+
+        Returns:
+            Iterator: AlarmRecord for each alarm
+        """
+        kwargs = {'AlarmTypes': list(alarm_types)}
+        if prefix:
+            kwargs['AlarmNamePrefix'] = prefix
+        paginator = self.client.get_paginator('describe_alarms')
+        for page in paginator.paginate(**kwargs):
+            for alarm in page.get('MetricAlarms', []):
+                yield AlarmRecord(alarm['AlarmName'], alarm.get('Namespace'),
+                                  alarm.get('MetricName'), alarm.get('Dimensions', []))
+            for alarm in page.get('CompositeAlarms', []):
+                yield AlarmRecord(alarm['AlarmName'], None, None, [])
+
+    def iter_alarm_definitions(self, prefix):
+        """
+        Lazily iterate over the full definition of the MetricAlarms matching a prefix,
+        following NextToken with the largest page DescribeAlarms returns
+
+        Returns:
+            Iterator: DescribeAlarms MetricAlarm dicts
+        """
+        paginator = self.client.get_paginator('describe_alarms')
+        for page in paginator.paginate(AlarmNamePrefix=prefix, AlarmTypes=['MetricAlarm'],
+                                       PaginationConfig={'PageSize': MAX_ALARM_NAMES}):
+            for alarm in page.get('MetricAlarms', []):
+                yield alarm
+
+    def build_alarm_name_index(self, prefix):
+        """
+        Scan every MetricAlarm matching a prefix, following NextToken, into an AlarmNameIndex
+
+        Returns:
+            AlarmNameIndex: index of the alarm names
+        """
+        return AlarmNameIndex(alarm.name for alarm in self.iter_alarms(prefix))
+
+    def delete_metric_alarms(self, alarm_name, timeout=ALARM_WAIT_TIMEOUT):
+        """
+        Deletes a list of alarms. Names are deleted in chunks of 100 submitted in parallel,
+        then the deletion is confirmed immediately and re-checked with backoff.
+
         Args:
                  alarm_name: single alarm of a list of alarm
+                 timeout: seconds to wait for the alarms to disappear
+
+        Returns:
+            dict: outcome by alarm name, ALARM_DELETED, ALARM_NOT_DELETED when the alarm
+                  still exists at the deadline, or the error of the DeleteAlarms call
         """
         if isinstance(alarm_name, str):
             names = [alarm_name]
         else:
-            names = alarm_name
+            names = list(dict.fromkeys(alarm_name or []))
+        if not names:
+            return {}
+        outcomes = {}
+        name_chunks = list(chunks(names, MAX_ALARM_NAMES))
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(len(name_chunks), MAX_DELETE_WORKERS)) as executor:
+            future_to_chunk = {executor.submit(TRACER.wrap_task("delete_alarms_chunk",
+                                                                self.delete_alarms_chunk),
+                                               chunk): chunk
+                               for chunk in name_chunks}
+            for future in concurrent.futures.as_completed(future_to_chunk):
+                try:
+                    future.result()
+                except Exception as exc:
+                    outcomes.update({name: f"failed: {exc}" for name in future_to_chunk[future]})
+
+        submitted = [name for name in names if name not in outcomes]
+        self.logger.info(f"waiting for {len(submitted)} alarms to be deleted")
+        remaining = set(poll_with_backoff(submitted, self.find_existing_alarms, timeout))
+        for name in submitted:
+            outcomes[name] = ALARM_NOT_DELETED if name in remaining else ALARM_DELETED
+        return outcomes
+
+    def delete_alarms_chunk(self, names):
+        """
+        Deletes at most 100 alarms with one DeleteAlarms call
+        """
         try:
             self.client.delete_alarms(
                 AlarmNames=names
             )
         except self.client.exceptions.ResourceNotFound:
             self.logger.info(f"At least one alarm not found for {names}")
-        self.logger.info(f"waiting for alarms to be deleted")
-        number_of_retries = 25
-        alarm_found = True
-        while alarm_found and number_of_retries <= 25:
-            time.sleep(5)
-            alarm_found = self.alarms_exist(AlarmNames=names)
-            number_of_retries += 1
-            self.logger.info(f"Deleting alarm: {names}")
 
     def list_metrics(self, kwargs):
         """List Cloudwatch alarm
@@ -119,10 +314,43 @@ class CloudWatchClient:
                  }
 
              Returns:
-                 list: of alarms matching the search
+                 list: of alarms matching the search, across all the pages
 
              Raises:
                  ClientError: Boto3 error
         """
-        response = self.client.list_metrics(**kwargs)
-        return response["Metrics"]
+        paginator = self.client.get_paginator('list_metrics')
+        metrics = []
+        for page in paginator.paginate(**kwargs):
+            metrics.extend(page.get("Metrics", []))
+        return metrics
+
+    def iter_metrics(self, namespace=None, metric_name=None, dimensions=None,
+                     recently_active=False):
+        """
+        Lazily iterate over the metrics matching the filter, following NextToken
+
+        Args:
+            namespace: metric namespace
+            metric_name: metric name
+            dimensions: ListMetrics dimension filter, list of {'Name': .., 'Value': ..},
+                        Value can be omitted to match any value
+            recently_active: only return metrics with data points in the past 3 hours
+
+        Returns:
+            Iterator: MetricRecord for each metric
+        """
+        kwargs = {}
+        if namespace:
+            kwargs['Namespace'] = namespace
+        if metric_name:
+            kwargs['MetricName'] = metric_name
+        if dimensions:
+            kwargs['Dimensions'] = dimensions
+        if recently_active:
+            kwargs['RecentlyActive'] = RECENTLY_ACTIVE
+        paginator = self.client.get_paginator('list_metrics')
+        for page in paginator.paginate(**kwargs):
+            for metric in page.get('Metrics', []):
+                yield MetricRecord(metric.get('Namespace'), metric.get('MetricName'),
+                                   metric.get('Dimensions', []))
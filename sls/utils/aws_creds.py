@@ -1,16 +1,131 @@
 """
 Module to get credentials required to make rds, s3, sm calls
 """
-# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error
+# pylint: disable=unused-argument, protected-access, arguments-differ,no-name-in-module, import-error, broad-except
+import concurrent.futures
+import datetime
 import json
 import os
+import threading
+import time
+
+from botocore.utils import parse_timestamp
 
 from sls.utils.api_request import ApiRequests
 from sls.utils.exceptions import InvalidAccount
 from sls.utils.logger import Logger
+from sls.utils.tracing import TRACER
 
 lgr = Logger()
 
+# Lifetime requested from vpcxiam, used as expiry when the response has none
+CREDENTIALS_DURATION = 3600
+# Credentials are refreshed this many seconds before they expire
+CREDENTIALS_REFRESH_MARGIN = 300
+# Accounts whose credentials are fetched concurrently by prefetch_creds
+CREDENTIALS_PREFETCH_WORKERS = int(os.environ.get("CREDENTIALS_PREFETCH_WORKERS", "20"))
+
+
+def get_credentials_expiry(credentials, fetched_at):
+    """
+    Returns the expiry of the credentials as an epoch timestamp
+
+    Args:
+        credentials: credentials dict returned by vpcxiam
+        fetched_at: epoch timestamp of the fetch
+
+    Returns:
+        float: epoch timestamp of the expiry
+    """
+    expiration = credentials.get("Expiration")
+    try:
+        if isinstance(expiration, (int, float)):
+            return float(expiration)
+        if isinstance(expiration, str):
+            expiration = parse_timestamp(expiration)
+        if isinstance(expiration, datetime.datetime):
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=datetime.timezone.utc)
+            return expiration.timestamp()
+    except (ValueError, TypeError):
+        pass
+    return fetched_at + CREDENTIALS_DURATION
+
+
+class CredentialsCache:
+    """
+    Process-wide cache of credentials per account, shared by every AwsCreds
+    instance so warm invocations reuse credentials until shortly before they expire
+    """
+
+    def __init__(self, refresh_margin=CREDENTIALS_REFRESH_MARGIN, clock=time.time):
+        """
+        Args:
+            refresh_margin: seconds before expiry at which credentials are refetched
+            clock: callable returning the current epoch timestamp
+        """
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._entries = {}
+        self._account_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, account, fetch):
+        """
+        Return the cached credentials for the account, calling fetch on a miss.
+        Concurrent callers for the same account wait for a single fetch.
+
+        Args:
+            account: account the credentials belong to
+            fetch: callable returning a fresh credentials dict
+
+        Returns:
+            dict: credentials
+        """
+        credentials = self._get_fresh(account)
+        if credentials is not None:
+            return credentials
+        with self._get_account_lock(account):
+            credentials = self._get_fresh(account)
+            if credentials is not None:
+                return credentials
+            fetched_at = self.clock()
+            credentials = fetch()
+            self._entries[account] = (credentials,
+                                      get_credentials_expiry(credentials, fetched_at))
+            return credentials
+
+    def get_expiry(self, account):
+        """
+        Returns the expiry epoch timestamp of the cached credentials, or None
+        """
+        entry = self._entries.get(account)
+        return entry[1] if entry else None
+
+    def invalidate(self, account=None):
+        """
+        Drop the cached credentials of an account, or of every account
+        """
+        with self._lock:
+            if account is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(account, None)
+
+    def _get_fresh(self, account):
+        entry = self._entries.get(account)
+        if entry and entry[1] - self.refresh_margin > self.clock():
+            return entry[0]
+        return None
+
+    def _get_account_lock(self, account):
+        with self._lock:
+            return self._account_locks.setdefault(account, threading.Lock())
+
+
+CREDENTIALS_CACHE = CredentialsCache()
+
+
 class AwsCreds:
     """Class to get credentials required to make rds, sm calls"""
 
@@ -23,11 +138,21 @@ class AwsCreds:
         self.vpcxiam_scope = os.environ.get("vpcxiam_scope")
         self.vpcxiam_host = os.environ.get("vpcxiam_host")
         self.account = account
-        self.api_requests = ApiRequests(self.logger)
+        self._api_requests = None
+
+    @property
+    def api_requests(self):
+        """
+        ApiRequests instance, created on the first credentials cache miss
+        """
+        if self._api_requests is None:
+            self._api_requests = ApiRequests(self.logger)
+        return self._api_requests
 
     def get_creds(self, account=None):
         """
-        Get credentials for lambda function to use when using AWS service in target account
+        Get credentials for lambda function to use when using AWS service in target account.
+        Credentials are served from CREDENTIALS_CACHE until shortly before they expire.
 
         Args:
             account:
@@ -36,6 +161,20 @@ class AwsCreds:
 
         """
         target_account = account or self.account
+        return CREDENTIALS_CACHE.get(target_account,
+                                     lambda: self.fetch_creds(target_account))
+
+    @TRACER.traced("vpcxiam.credentials")
+    def fetch_creds(self, target_account):
+        """
+        Fetch credentials for the target account from vpcxiam, bypassing the cache
+
+        Args:
+            target_account:
+
+        Returns:
+
+        """
         url = (
             self.vpcxiam_endpoint
             + f"/v1/accounts/{target_account}/roles/admin/credentials"
@@ -51,7 +190,7 @@ class AwsCreds:
                         method="get",
                         scope=scope,
                         additional_headers=additional_headers,
-                        additional_payload={'duration': 3600}
+                        additional_payload={'duration': CREDENTIALS_DURATION}
                     )
                 ).text
             )
@@ -70,3 +209,34 @@ class AwsCreds:
                 raise InvalidAccount(f"Account not found: {target_account}") from error
             raise error
         raise Exception("Credentials not retrieved")
+
+
+def prefetch_creds(accounts, logger=None, max_workers=CREDENTIALS_PREFETCH_WORKERS):
+    """
+    Fetch the credentials of many accounts concurrently into CREDENTIALS_CACHE, the
+    vpcxiam calls share the pooled connections of the api_request session
+
+    Args:
+        accounts: list of account ids
+        logger: Logger instance
+        max_workers: accounts fetched at a time
+
+    Returns:
+        dict: error by account, for the accounts whose credentials were not fetched
+    """
+    accounts = list(dict.fromkeys(accounts))
+    errors = {}
+    if not accounts:
+        return errors
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(max_workers, len(accounts))) as executor:
+        future_to_account = {
+            executor.submit(TRACER.wrap_task("prefetch_credentials",
+                                             AwsCreds(account, logger).get_creds)): account
+            for account in accounts}
+        for future in concurrent.futures.as_completed(future_to_account):
+            try:
+                future.result()
+            except Exception as exc:
+                errors[future_to_account[future]] = str(exc)
+    return errors
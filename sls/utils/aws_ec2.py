@@ -2,36 +2,159 @@
 """
 Module to interact with EC2 client
 """
-import boto3
+import os
+import threading
+import time
+
 import botocore.exceptions
-import jmespath
 
 from botocore.exceptions import ClientError
 from sls.utils import get_boto3_client
+from sls.utils.backoff import chunks
+from sls.utils.aws_regions import REGION_CATALOG
+from sls.utils.hostname_index import HOSTNAME_INDEX, project_instance
 from sls.utils.exceptions import ResourceNotFound, InvalidParameter
 from sls.utils.logger import Logger
 
-# Define default ec2 client
-EC2_CLIENT = boto3.client('ec2', region_name="us-east-1")
 lgr = Logger()
 
+RUNNING_STATE_FILTER = {
+    "Name": "instance-state-name",
+    "Values": ["running", "rebooting"]
+}
+# Instances whose alarms are kept, a terminating instance has none
+LIVE_STATE_FILTER = {
+    "Name": "instance-state-name",
+    "Values": ["pending", "running", "rebooting", "stopping", "stopped"]
+}
+# DescribeInstances accepts at most 200 values per filter
+MAX_FILTER_VALUES = 200
+# DescribeInstanceTypes accepts at most 100 instance types
+MAX_INSTANCE_TYPES = 100
+# Seconds the instance type details are kept
+INSTANCE_TYPES_TTL = int(os.environ.get("INSTANCE_TYPES_TTL_SECONDS", "86400"))
+
+
+def get_hostname(instance):
+    """
+    Returns the value of the Hostname tag of an instance, or None
+    """
+    for tag in instance.get("Tags", []):
+        if tag.get("Key") == "Hostname":
+            return tag.get("Value")
+    return None
+
+
+def get_default_ec2_client():
+    """
+    Returns the pooled us-east-1 ec2 client using the local credentials,
+    created on first use instead of at import
+    """
+    return get_boto3_client("ec2", "us-east-1")
+
 
 def is_region_valid(region, logger):
-    try:
-        regions = EC2_CLIENT.describe_regions(
-            RegionNames=[
-                region,
-            ]
-        )
-        return regions['Regions'][0]['RegionName'] == region
-    except botocore.exceptions.ParamValidationError as err:
-        logger.error(err)
-        return False
-    except ClientError as error:
-        if error.response['Error']['Code'] == 'InvalidParameterValue':
-            logger.error(error)
-            return False
-        raise error
+    """
+    Check the region against the regions resolved once per container, see RegionCatalog
+
+    Args:
+        region: region name
+        logger: Logger instance
+    """
+    return REGION_CATALOG.is_valid(region, logger)
+
+
+class InstanceTypeCatalog:
+    """
+    Instance type details memoized per container. Missing types are described
+    100 names per call, or the whole catalog is loaded with prefetch_all.
+    Entries expire after the TTL.
+    """
+
+    def __init__(self, get_client=get_default_ec2_client, ttl=INSTANCE_TYPES_TTL, clock=time.monotonic):
+        """
+        Args:
+            get_client: callable returning the ec2 client
+            ttl: seconds an instance type is kept
+            clock: callable returning monotonic seconds
+        """
+        self.get_client = get_client
+        self.ttl = ttl
+        self.clock = clock
+        self._types = {}
+        self._lock = threading.Lock()
+
+    def get(self, instance_type):
+        """
+        Returns:
+            dict: DescribeInstanceTypes details of the instance type
+        """
+        instance_types = self.get_many([instance_type])
+        if instance_type not in instance_types:
+            raise ResourceNotFound(f"Instance type: {instance_type} not found")
+        return instance_types[instance_type]
+
+    def get_many(self, instance_types):
+        """
+        Returns:
+            dict: details by instance type, unknown instance types are missing
+        """
+        now = self.clock()
+        found, missing = {}, []
+        for instance_type in dict.fromkeys(instance_types):
+            entry = self._types.get(instance_type)
+            if entry is not None and now - entry[1] < self.ttl:
+                found[instance_type] = entry[0]
+            else:
+                missing.append(instance_type)
+        for names in chunks(missing, MAX_INSTANCE_TYPES):
+            found.update(self._store(self._describe(names)))
+        return found
+
+    def prefetch_all(self):
+        """
+        Load every instance type offered in the region of the client
+
+        Returns:
+            int: number of instance types loaded
+        """
+        paginator = self.get_client().get_paginator("describe_instance_types")
+        details = [info for page in paginator.paginate()
+                   for info in page.get("InstanceTypes", [])]
+        return len(self._store(details))
+
+    def clear(self):
+        """
+        Drop every memoized instance type
+        """
+        with self._lock:
+            self._types.clear()
+
+    def _describe(self, names):
+        """
+        Describe at most 100 instance types. An unknown name fails the whole call,
+        so the batch is split until the unknown names are isolated.
+        """
+        try:
+            response = self.get_client().describe_instance_types(InstanceTypes=names)
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "InvalidInstanceType":
+                raise
+            if len(names) == 1:
+                return []
+            middle = len(names) // 2
+            return self._describe(names[:middle]) + self._describe(names[middle:])
+        return response.get("InstanceTypes", [])
+
+    def _store(self, details):
+        now = self.clock()
+        stored = {info["InstanceType"]: info for info in details}
+        with self._lock:
+            self._types.update((name, (info, now)) for name, info in stored.items())
+        return stored
+
+
+INSTANCE_TYPE_CATALOG = InstanceTypeCatalog()
 
 
 def get_instance_memory(instance_type, logger):
@@ -42,12 +165,7 @@ def get_instance_memory(instance_type, logger):
         instance_type: Name of the instance class. Example t3.micro
         logger: Logger instance
     """
-    instance_type_info = EC2_CLIENT.describe_instance_types(
-        InstanceTypes=[
-            instance_type,
-        ]
-    )
-    size = instance_type_info['InstanceTypes'][0]['MemoryInfo']['SizeInMiB']
+    size = INSTANCE_TYPE_CATALOG.get(instance_type)['MemoryInfo']['SizeInMiB']
     logger.info(f"Memory in MiB for {instance_type}: {size} MiB")
     return size
 
@@ -64,11 +182,25 @@ class EC2Client:
         self.region = region
         self.aws_creds = aws_creds
         self.credentials = self.aws_creds.get_creds()
-        self.client = get_boto3_client("ec2", self.region, self.credentials)
+        self.client = get_boto3_client("ec2", self.region, self.credentials,
+                                       account=self.aws_creds.account)
 
     def get_running_instance_by_hostname(self, hostname):
         """
-        Get the EC2 instance from the hostname in the account and region
+        Get the EC2 instance from the hostname in the account and region,
+        resolved from the hostname index of the account and region
+
+        Args:
+            hostname: EC2 Hostname tag value
+
+        Returns:
+            Json: instance details
+        """
+        return HOSTNAME_INDEX.get(self, hostname)
+
+    def lookup_running_instance_by_hostname(self, hostname):
+        """
+        Get the EC2 instance from the hostname with a tag filtered describe_instances
 
         Args:
             hostname: EC2 Hostname tag value
@@ -96,3 +228,153 @@ class EC2Client:
 
         except botocore.exceptions.ParamValidationError as err:
             raise InvalidParameter(f"Hostname: {hostname} is not valid") from err
+
+    def get_running_instances(self, filters=None):
+        """
+        Iterate over the running instances matching the filters, following NextToken
+
+        Args:
+            filters: DescribeInstances filters
+
+        Returns:
+            Iterator: instance details
+        """
+        return self.iter_instances(list(filters or []) + [RUNNING_STATE_FILTER])
+
+    def iter_instances(self, filters):
+        """
+        Iterate over the instances matching the filters, following NextToken
+
+        Args:
+            filters: DescribeInstances filters
+
+        Returns:
+            Iterator: instance details
+        """
+        paginator = self.client.get_paginator("describe_instances")
+        try:
+            for page in paginator.paginate(Filters=filters):
+                for reservation in page.get("Reservations", []):
+                    for instance in reservation.get("Instances", []):
+                        yield instance
+        except botocore.exceptions.ParamValidationError as err:
+            raise InvalidParameter(f"Instance filters: {filters} are not valid") from err
+
+    def scan_live_instances(self):
+        """
+        Scan the instances that are not terminated, with or without a Hostname tag
+
+        Returns:
+            Iterator: instance details limited to INSTANCE_PROJECTION
+        """
+        for instance in self.iter_instances([LIVE_STATE_FILTER]):
+            yield project_instance(instance)
+
+    def scan_running_instances(self):
+        """
+        Scan the running instances having a Hostname tag
+
+        Returns:
+            Iterator: (hostname, instance details limited to INSTANCE_PROJECTION)
+        """
+        for instance in self.get_running_instances([{"Name": "tag-key", "Values": ["Hostname"]}]):
+            yield get_hostname(instance), project_instance(instance)
+
+    def get_running_instances_by_hostnames(self, hostnames):
+        """
+        Get the running instances for a list of hostnames from the hostname index
+        of the account and region
+
+        Args:
+            hostnames: list of EC2 Hostname tag values
+
+        Returns:
+            dict: instance details by hostname, hostnames not found are missing
+        """
+        return HOSTNAME_INDEX.get_many(self, list(dict.fromkeys(hostnames)))
+
+    def lookup_running_instances_by_hostnames(self, hostnames):
+        """
+        Get the running instances for a list of hostnames with one paginated
+        describe_instances per 200 hostnames
+
+        Args:
+            hostnames: list of EC2 Hostname tag values
+
+        Returns:
+            dict: instance details by hostname, hostnames not found are missing
+        """
+        hostnames = list(dict.fromkeys(hostnames))
+        instances = {}
+        for start in range(0, len(hostnames), MAX_FILTER_VALUES):
+            filters = [{"Name": "tag:Hostname",
+                        "Values": hostnames[start:start + MAX_FILTER_VALUES]}]
+            for instance in self.get_running_instances(filters):
+                instances.setdefault(get_hostname(instance), instance)
+        return instances
+
+    def confirm_running_instances(self, instances):
+        """
+        Describe instances resolved earlier again by id, with one paginated
+        describe_instances per 200 instance ids. An instance id that no longer exists
+        is not an error, it is missing from the result.
+
+        Args:
+            instances: instance details by hostname
+
+        Returns:
+            dict: current instance details by hostname of the instances still running
+                  with the same Hostname tag
+        """
+        current = {}
+        for instance_ids in chunks([instance["InstanceId"] for instance in instances.values()],
+                                   MAX_FILTER_VALUES):
+            for instance in self.get_running_instances([{"Name": "instance-id",
+                                                         "Values": instance_ids}]):
+                current[instance["InstanceId"]] = instance
+        return {hostname: current[instance["InstanceId"]]
+                for hostname, instance in instances.items()
+                if instance["InstanceId"] in current and
+                get_hostname(current[instance["InstanceId"]]) == hostname}
+
+    def get_instances_by_ids(self, instance_ids):
+        """
+        Get instances in any state, terminated instances stay visible for about an hour,
+        with one paginated describe_instances per 200 instance ids
+
+        Args:
+            instance_ids: list of instance ids
+
+        Returns:
+            dict: instance details by instance id, instances not found are missing
+        """
+        instance_ids = list(dict.fromkeys(instance_ids))
+        instances = {}
+        paginator = self.client.get_paginator("describe_instances")
+        for start in range(0, len(instance_ids), MAX_FILTER_VALUES):
+            filters = [{"Name": "instance-id",
+                        "Values": instance_ids[start:start + MAX_FILTER_VALUES]}]
+            for page in paginator.paginate(Filters=filters):
+                for reservation in page.get("Reservations", []):
+                    for instance in reservation.get("Instances", []):
+                        instances[instance["InstanceId"]] = instance
+        return instances
+
+    def get_running_instances_by_tags(self, tag_filters):
+        """
+        Get the running instances having the Hostname tag and matching the tag filters
+
+        Args:
+            tag_filters: list of {"Key": tag key, "Values": [tag values]}
+
+        Returns:
+            dict: instance details by hostname
+        """
+        filters = [{"Name": "tag-key", "Values": ["Hostname"]}]
+        for tag_filter in tag_filters:
+            filters.append({"Name": f"tag:{tag_filter['Key']}",
+                            "Values": tag_filter["Values"]})
+        instances = {}
+        for instance in self.get_running_instances(filters):
+            instances.setdefault(get_hostname(instance), instance)
+        return instances
@@ -0,0 +1,114 @@
+"""
+Module to validate AWS regions without calling EC2 DescribeRegions on every request
+"""
+# pylint: disable=import-error
+import os
+import threading
+import time
+
+import botocore.session
+from botocore.exceptions import BotoCoreError, ClientError
+
+from sls.utils import get_boto3_client
+
+# Seconds between DescribeRegions calls made for regions missing from the botocore
+# endpoint data, 0 to only trust the endpoint data
+REGIONS_REFRESH_SECONDS = int(os.environ.get("REGIONS_REFRESH_SECONDS", "0"))
+# Partition the API is deployed in, the regions of the other partitions (aws-cn,
+# aws-us-gov, ...) are not reachable with its credentials and are rejected
+REGIONS_PARTITION = os.environ.get("REGIONS_PARTITION", "aws")
+
+
+def get_bundled_regions(service_name="ec2", partition_name=REGIONS_PARTITION):
+    """
+    Returns:
+        set: regions of the service in the partition of the botocore endpoint data
+    """
+    session = botocore.session.get_session()
+    return set(session.get_available_regions(service_name, partition_name))
+
+
+class RegionCatalog:
+    """
+    Regions resolved once per container from the botocore endpoint data. When a refresh
+    interval is set, a region missing from the set triggers at most one DescribeRegions
+    call per interval, so regions launched after the botocore release are picked up.
+    """
+
+    def __init__(self, refresh_seconds=REGIONS_REFRESH_SECONDS, loader=get_bundled_regions,
+                 clock=time.monotonic):
+        """
+        Args:
+            refresh_seconds: seconds between DescribeRegions calls, 0 to disable them
+            loader: callable returning the initial region set
+            clock: callable returning monotonic seconds
+        """
+        self.refresh_seconds = refresh_seconds
+        self.loader = loader
+        self.clock = clock
+        self._regions = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def get_regions(self):
+        """
+        Returns:
+            frozenset: known region names
+        """
+        if self._regions is None:
+            with self._lock:
+                if self._regions is None:
+                    self._regions = frozenset(self.loader())
+        return self._regions
+
+    def is_valid(self, region, logger):
+        """
+        Check the region against the known regions, refreshing them on a miss
+        when the refresh interval has passed
+
+        Args:
+            region: region name
+            logger: Logger instance
+        """
+        if not isinstance(region, str) or not region:
+            logger.error(f"Invalid region: {region}")
+            return False
+        if region in self.get_regions():
+            return True
+        if self._refresh_due():
+            self.refresh(logger)
+        return region in self.get_regions()
+
+    def refresh(self, logger):
+        """
+        Add the regions returned by DescribeRegions to the known regions
+        """
+        with self._lock:
+            self._refreshed_at = self.clock()
+        try:
+            client = get_boto3_client("ec2", "us-east-1")
+            response = client.describe_regions(AllRegions=True)
+        except (BotoCoreError, ClientError) as error:
+            logger.error(f"Regions not refreshed: {error}")
+            return
+        regions = {region["RegionName"] for region in response.get("Regions", [])}
+        known = self.get_regions()
+        with self._lock:
+            self._regions = frozenset(known | regions)
+
+    def invalidate(self):
+        """
+        Drop the known regions, they are resolved again on the next check
+        """
+        with self._lock:
+            self._regions = None
+            self._refreshed_at = None
+
+    def _refresh_due(self):
+        if self.refresh_seconds <= 0:
+            return False
+        return self._refreshed_at is None or \
+            self.clock() - self._refreshed_at >= self.refresh_seconds
+
+
+REGION_CATALOG = RegionCatalog()
@@ -28,7 +28,8 @@ class ResourceGroupsTaggingClient:
         self.aws_creds = aws_creds
         self.credentials = self.aws_creds.get_creds()
         self.client = get_boto3_client("resourcegroupstaggingapi",
-                                       self.rds_region, self.credentials)
+                                       self.rds_region, self.credentials,
+                                       account=self.aws_creds.account)
 
     def get_sns_topic_arn(self, sns_topic_tag_key, sns_topic_tag_value):
         """Get the ARN for the SNS topic that will be configured
@@ -5,6 +5,7 @@ Module to make secret manager calls
 import logging
 
 from sls.utils import get_boto3_client
+from sls.utils.secret_cache import SECRET_CACHE
 
 lgr = logging.getLogger()
 
@@ -26,12 +27,13 @@ class SmClient:
         self.aws_creds = aws_creds
         self.credentials = self.aws_creds.get_creds()
         self.client = get_boto3_client(
-            "secretsmanager", self.secret_region, self.credentials
+            "secretsmanager", self.secret_region, self.credentials,
+            account=self.aws_creds.account
         )
 
     def retrieve_secret(self, secret_name):
         """
-        Retrieve secret from secret manager
+        Retrieve secret from secret manager, cached by SECRET_CACHE
 
         Args:
             secret_name:
@@ -39,5 +41,5 @@ class SmClient:
         Returns:
             Value of the secret
         """
-        secret_value = self.client.get_secret_value(SecretId=secret_name)
-        return secret_value.get("SecretString")
+        return SECRET_CACHE.get((self.aws_creds.account, self.secret_region, secret_name),
+                                lambda: self.client.get_secret_value(SecretId=secret_name))
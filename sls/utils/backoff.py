@@ -0,0 +1,73 @@
+"""
+Module to poll AWS for eventually consistent results with exponential backoff
+"""
+import asyncio
+import time
+
+
+def chunks(items, size):
+    """
+    Split a list into lists of at most size items
+
+    Args:
+        items: list to split
+        size: maximum chunk size
+
+    Returns:
+        Iterator: lists of items
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def poll_with_backoff(pending, check, timeout, initial_delay=0.5, max_delay=5,
+                      clock=time.monotonic, sleep=time.sleep):
+    """
+    Check the pending items immediately, then re-check only the items still pending
+    with an exponentially growing delay until none is left or the deadline passes
+
+    Args:
+        pending: list of items to confirm
+        check: callable taking the pending items and returning the ones still pending
+        timeout: seconds after which polling stops
+        initial_delay: delay before the first re-check
+        max_delay: upper bound of the delay between checks
+        clock: callable returning monotonic seconds
+        sleep: callable sleeping for the given seconds
+
+    Returns:
+        list: items still pending at the deadline
+    """
+    deadline = clock() + timeout
+    delay = initial_delay
+    pending = list(check(list(pending))) if pending else []
+    while pending:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            break
+        sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+        pending = list(check(pending))
+    return pending
+
+
+async def poll_with_backoff_async(pending, check, timeout, initial_delay=0.5, max_delay=5,
+                                  clock=time.monotonic):
+    """
+    Coroutine version of poll_with_backoff, check is a coroutine function and the
+    delays are awaited so no thread is held while polling
+
+    Returns:
+        list: items still pending at the deadline
+    """
+    deadline = clock() + timeout
+    delay = initial_delay
+    pending = list(await check(list(pending))) if pending else []
+    while pending:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+        pending = list(await check(pending))
+    return pending
@@ -0,0 +1,127 @@
+"""
+Module to reuse boto3 clients across invocations in the same container
+"""
+# pylint: disable=import-error, wrong-import-position
+import collections
+import threading
+
+import boto3
+
+from sls.utils.rate_limiter import RATE_LIMITER, RATE_LIMITED_SERVICES
+from sls.utils.tracing import TRACER
+
+# Upper bound on pooled clients, least recently used clients are dropped first
+CLIENT_POOL_MAX_SIZE = 128
+
+
+class Boto3ClientPool:
+    """
+    Pool of boto3 clients keyed by (service, region, account, credentials expiry).
+
+    All clients are created from one shared boto3 session so the service models
+    are loaded once per container, and a pooled client keeps its HTTP connection pool
+    across invocations. When the credentials of an account rotate, the clients built
+    with the previous credentials are evicted.
+
+    The calls of the CloudWatch, EC2 and tagging clients go through the rate limiter
+    bucket of their service, account and region, shared by the clients of every thread.
+    Every operation of a pooled client is recorded as a span of the current trace.
+    """
+
+    def __init__(self, max_size=CLIENT_POOL_MAX_SIZE, rate_limiter=RATE_LIMITER,
+                 tracer=TRACER):
+        """
+        Args:
+            max_size: maximum number of pooled clients
+            rate_limiter: RateLimiter of the pooled clients, None to disable rate limiting
+            tracer: Tracer recording the client operations, None to disable tracing
+        """
+        self.max_size = max_size
+        self.rate_limiter = rate_limiter
+        self.tracer = tracer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+
+    def get_client(self, service_name, region, credentials=None, account=None):
+        """
+        Return a pooled client, creating it on a miss
+
+        Args:
+            service_name: boto3 service name. Ex: cloudwatch
+            region: Aws Region for the client
+            credentials: dict with AccessKeyId, SecretAccessKey, SessionToken and
+                         optionally Expiration. Local credentials are used when None
+            account: account the credentials belong to
+
+        Returns:
+            boto3 client
+        """
+        credentials = credentials or {}
+        owner = account or credentials.get('AccessKeyId')
+        generation = (credentials.get('AccessKeyId'), str(credentials.get('Expiration', '')))
+        key = (service_name, region, owner, generation)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.hits += 1
+                self._clients.move_to_end(key)
+                return client
+            self.misses += 1
+            self._evict_rotated(service_name, region, owner, generation)
+            client = self._create_client(service_name, region, credentials)
+            if self.rate_limiter is not None and service_name in RATE_LIMITED_SERVICES:
+                self.rate_limiter.register(client.meta.events, service_name, owner, region)
+            if self.tracer is not None:
+                self.tracer.register(client.meta.events, service_name)
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+            return client
+
+    def stats(self):
+        """
+        Returns:
+            dict: pool hits, misses, evictions and current size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._clients),
+        }
+
+    def clear(self):
+        """
+        Drop every pooled client and reset the counters
+        """
+        with self._lock:
+            self._clients.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def _evict_rotated(self, service_name, region, owner, generation):
+        rotated = [key for key in self._clients
+                   if key[:3] == (service_name, region, owner) and key[3] != generation]
+        for key in rotated:
+            del self._clients[key]
+            self.evictions += 1
+
+    def _create_client(self, service_name, region, credentials):
+        if self._session is None:
+            self._session = boto3.session.Session()
+        session = self._session
+        if not credentials:
+            # Use local credentials
+            return session.client(service_name, region)
+        return session.client(service_name, region,
+                              aws_access_key_id=credentials.get('AccessKeyId', ''),
+                              aws_secret_access_key=credentials.get('SecretAccessKey', ''),
+                              aws_session_token=credentials.get('SessionToken', '')
+                              )
+
+
+CLIENT_POOL = Boto3ClientPool()
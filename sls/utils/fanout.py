@@ -0,0 +1,62 @@
+"""
+Module to run tasks grouped by key, ex: the hosts of many accounts, with a limit of
+tasks in flight per key and a global limit
+"""
+# pylint: disable=broad-except
+import collections
+import concurrent.futures
+import time
+
+
+def run_bounded(tasks, max_per_key, max_total, clock=time.monotonic):
+    """
+    Run the tasks on one thread pool of max_total threads. A task is only submitted
+    when its key has less than max_per_key tasks in flight, and the keys are served
+    round-robin so a large key does not hold every thread.
+
+    Args:
+        tasks: {key: list of callables taking no argument}
+        max_per_key: tasks of one key in flight at a time
+        max_total: tasks in flight at a time
+        clock: callable returning monotonic seconds
+
+    Returns:
+        dict: {key: {"results": result or raised exception of each task, in task order,
+                     "started": clock value of the first submission,
+                     "finished": clock value of the last completion}}
+    """
+    outcomes = {key: {"results": [None] * len(funcs), "started": None, "finished": None}
+                for key, funcs in tasks.items()}
+    pending = collections.OrderedDict((key, collections.deque(enumerate(funcs)))
+                                      for key, funcs in tasks.items() if funcs)
+    in_flight = collections.Counter()
+    futures = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_total) as executor:
+        while pending or futures:
+            submitted = True
+            while submitted and len(futures) < max_total:
+                submitted = False
+                for key in list(pending):
+                    if len(futures) >= max_total:
+                        break
+                    if in_flight[key] >= max_per_key:
+                        continue
+                    index, func = pending[key].popleft()
+                    if not pending[key]:
+                        del pending[key]
+                    if outcomes[key]["started"] is None:
+                        outcomes[key]["started"] = clock()
+                    futures[executor.submit(func)] = (key, index)
+                    in_flight[key] += 1
+                    submitted = True
+            done, _ = concurrent.futures.wait(futures,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                key, index = futures.pop(future)
+                in_flight[key] -= 1
+                try:
+                    outcomes[key]["results"][index] = future.result()
+                except Exception as exc:
+                    outcomes[key]["results"][index] = exc
+                outcomes[key]["finished"] = clock()
+    return outcomes
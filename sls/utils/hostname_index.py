@@ -0,0 +1,178 @@
+"""
+Module to resolve EC2 hostnames from an index shared by the warm invocations of a container
+"""
+# pylint: disable=import-error
+import collections
+import os
+import threading
+import time
+
+# Seconds an account and region index is used before it is scanned again
+HOSTNAME_INDEX_TTL = int(os.environ.get("HOSTNAME_INDEX_TTL_SECONDS", "300"))
+# Hostnames of a batch from which an account and region without a fresh index is scanned,
+# smaller batches are looked up by their Hostname tags
+HOSTNAME_INDEX_SCAN_MIN_HOSTNAMES = int(os.environ.get("HOSTNAME_INDEX_SCAN_MIN_HOSTNAMES",
+                                                       "50"))
+# Instance fields kept in the index
+INSTANCE_PROJECTION = ("InstanceId", "InstanceType", "Platform", "State", "Tags")
+
+
+def project_instance(instance):
+    """
+    Returns:
+        dict: the INSTANCE_PROJECTION fields of the instance details
+    """
+    return {key: instance[key] for key in INSTANCE_PROJECTION if key in instance}
+
+
+class HostnameIndex:
+    """
+    Running instances by hostname for each (account, region), built from one paginated
+    DescribeInstances scan of the instances having a Hostname tag. The scan covers the
+    whole account, so it is only run for a large batch of hostnames. An indexed instance
+    may have been terminated or replaced since the scan, so hits are confirmed by
+    instance id before they are used. Hostnames missing from the index, or whose
+    instance is no longer running, are looked up with a targeted call and added to it.
+    """
+
+    def __init__(self, ttl=HOSTNAME_INDEX_TTL, scan_min_hostnames=HOSTNAME_INDEX_SCAN_MIN_HOSTNAMES,
+                 clock=time.monotonic):
+        """
+        Args:
+            ttl: seconds an index is used before it is scanned again
+            scan_min_hostnames: hostnames of a get_many batch from which the account and
+                                region is scanned when it has no fresh index
+            clock: callable returning monotonic seconds
+        """
+        self.ttl = ttl
+        self.scan_min_hostnames = scan_min_hostnames
+        self.clock = clock
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._build_locks = collections.defaultdict(threading.Lock)
+
+    def get(self, ec2_client, hostname):
+        """
+        A single hostname never triggers the scan of the account: without a fresh
+        index it is looked up with a targeted call
+
+        Args:
+            ec2_client: EC2Client of the account and region
+
+        Returns:
+            dict: instance details, looked up with a targeted call on an index miss
+        """
+        key = (ec2_client.aws_creds.account, ec2_client.region)
+        index = self._fresh_index(key) or {}
+        instance = None
+        if hostname in index:
+            instance = self._confirm(ec2_client, key, {hostname: index[hostname]}).get(hostname)
+        if instance is None:
+            instance = ec2_client.lookup_running_instance_by_hostname(hostname)
+            self.upsert(key, hostname, instance)
+        return instance
+
+    def get_many(self, ec2_client, hostnames):
+        """
+        Without a fresh index, a batch smaller than scan_min_hostnames is looked up by
+        its Hostname tags instead of scanning the account. The misses of a fresh index
+        are always looked up by their Hostname tags.
+
+        Args:
+            ec2_client: EC2Client of the account and region
+            hostnames: list of EC2 Hostname tag values
+
+        Returns:
+            dict: instance details by hostname, hostnames not found are missing
+        """
+        key = (ec2_client.aws_creds.account, ec2_client.region)
+        index = self._fresh_index(key)
+        if index is None:
+            index = self._get_index(ec2_client) \
+                if len(hostnames) >= self.scan_min_hostnames else {}
+        instances = self._confirm(ec2_client, key, {hostname: index[hostname]
+                                                    for hostname in hostnames
+                                                    if hostname in index})
+        missing = [hostname for hostname in hostnames if hostname not in instances]
+        if missing:
+            for hostname, instance in ec2_client.lookup_running_instances_by_hostnames(
+                    missing).items():
+                self.upsert(key, hostname, instance)
+                instances[hostname] = instance
+        return instances
+
+    def upsert(self, key, hostname, instance):
+        """
+        Add or replace the instance of a hostname in the index of an (account, region)
+        """
+        with self._lock:
+            if key in self._indexes:
+                self._indexes[key][0][hostname] = project_instance(instance)
+
+    def remove(self, key, hostname, instance_id=None):
+        """
+        Remove a hostname from the index of an (account, region). When instance_id is
+        given, the hostname is only removed if it still resolves to that instance.
+        """
+        with self._lock:
+            index = self._indexes.get(key, ({},))[0]
+            instance = index.get(hostname)
+            if instance is not None and instance_id in (None, instance.get("InstanceId")):
+                del index[hostname]
+
+    def invalidate(self, key=None):
+        """
+        Drop the index of an (account, region), or every index when key is None
+        """
+        with self._lock:
+            if key is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(key, None)
+
+    def _confirm(self, ec2_client, key, instances):
+        """
+        Describe the indexed instances again by id, the hostnames whose instance is no
+        longer running under that hostname are removed from the index
+
+        Args:
+            instances: indexed instance details by hostname
+
+        Returns:
+            dict: current instance details by hostname of the confirmed instances
+        """
+        if not instances:
+            return {}
+        confirmed = ec2_client.confirm_running_instances(instances)
+        for hostname, instance in instances.items():
+            if hostname in confirmed:
+                self.upsert(key, hostname, confirmed[hostname])
+            else:
+                self.remove(key, hostname, instance.get("InstanceId"))
+        return confirmed
+
+    def _get_index(self, ec2_client):
+        key = (ec2_client.aws_creds.account, ec2_client.region)
+        index = self._fresh_index(key)
+        if index is not None:
+            return index
+        with self._lock:
+            build_lock = self._build_locks[key]
+        with build_lock:
+            index = self._fresh_index(key)
+            if index is None:
+                index = {}
+                for hostname, instance in ec2_client.scan_running_instances():
+                    index.setdefault(hostname, instance)
+                with self._lock:
+                    self._indexes[key] = (index, self.clock())
+            return index
+
+    def _fresh_index(self, key):
+        entry = self._indexes.get(key)
+        if entry is not None and self.clock() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+
+HOSTNAME_INDEX = HostnameIndex()
@@ -0,0 +1,492 @@
+"""
+Module to run api requests as asynchronous jobs: the request is queued, a worker runs it
+and records the alarm outcomes counted by host in a job store that the job status
+endpoint reads
+"""
+# pylint: disable=import-error, broad-except
+import collections
+import json
+import os
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from sls.utils import get_boto3_client
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+# SQS queue of the jobs, an in-memory queue is used when not set
+JOB_QUEUE_URL = os.environ.get("JOB_QUEUE_URL")
+# DynamoDB table of the jobs, keyed by job_id
+JOB_TABLE_NAME = os.environ.get("JOB_TABLE_NAME")
+# SQLite database of the jobs, used when JOB_TABLE_NAME is not set
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH")
+# Event fields a worker needs to replay a request, the authorization header is not kept
+JOB_EVENT_KEYS = ("resource", "httpMethod", "pathParameters", "queryStringParameters", "body")
+# Seconds a worker owns a running job, past that deadline the job is taken for a worker
+# that timed out and a new delivery of its message claims it again
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", "900"))
+# Claims of a job, after that a job whose worker timed out is marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+# Seconds a job is kept, the DynamoDB table deletes the jobs past their expires_at
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+# Seconds between two writes of the progress of a running job
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "5"))
+
+
+def is_claimable(job, now):
+    """
+    Returns:
+        bool: True when the job is queued, or running past the deadline of its worker
+    """
+    return job["status"] == JOB_QUEUED or \
+        (job["status"] == JOB_RUNNING and job.get("deadline") is not None and
+         job["deadline"] <= now)
+
+
+def claim_fields(job, now, lease_seconds):
+    """
+    Returns:
+        dict: fields of a job claimed by a worker
+    """
+    return {"status": JOB_RUNNING, "started_at": now, "deadline": now + lease_seconds,
+            "attempts": job.get("attempts", 0) + 1, "updated_at": now}
+
+
+def is_async_request(event):
+    """
+    Returns:
+        bool: True when the request has the query parameter async=true
+    """
+    query_params = event.get('queryStringParameters') or {}
+    return str(query_params.get('async', '')).lower() == "true"
+
+
+def new_job(operation, event, request_id):
+    """
+    Args:
+        operation: name of the operation in the worker registry. Ex: create_ec2_alarms
+        event: API gateway proxy event of the request
+        request_id: request-context-id of the request
+
+    Returns:
+        dict: queued job
+    """
+    job_event = {key: event.get(key) for key in JOB_EVENT_KEYS if key in event}
+    query_params = dict(job_event.get('queryStringParameters') or {})
+    query_params.pop('async', None)
+    job_event['queryStringParameters'] = query_params or None
+    job_event['headers'] = {'request-context-id': request_id}
+    now = time.time()
+    return {
+        "job_id": uuid.uuid4().hex,
+        "operation": operation,
+        "account_id": (event.get('pathParameters') or {}).get('account_id'),
+        "status": JOB_QUEUED,
+        "event": job_event,
+        "progress": {},
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": int(now + JOB_RETENTION_SECONDS)
+    }
+
+
+def public_job(job):
+    """
+    Returns:
+        dict: job fields returned by the api, without the replayed event
+    """
+    return {key: value for key, value in job.items() if key != "event"}
+
+
+class InMemoryJobQueue:
+    """
+    Queue of the jobs in the memory of the process, drained with receive
+    """
+
+    def __init__(self):
+        self._messages = collections.deque()
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """
+        Args:
+            message: JSON serializable job message
+        """
+        with self._lock:
+            self._messages.append(json.dumps(message))
+
+    def receive(self, max_messages=10):
+        """
+        Returns:
+            list: at most max_messages job messages, removed from the queue
+        """
+        with self._lock:
+            count = min(max_messages, len(self._messages))
+            return [json.loads(self._messages.popleft()) for _ in range(count)]
+
+
+class SqsJobQueue:
+    """
+    SQS queue of the jobs, consumed by the worker function through its SQS event source
+    """
+
+    def __init__(self, queue_url, client=None):
+        """
+        Args:
+            queue_url: url of the SQS queue
+            client: boto3 sqs client, a pooled client of the queue region when None
+        """
+        self.queue_url = queue_url
+        self._client = client
+
+    @property
+    def client(self):
+        """
+        sqs client, created on the first send
+        """
+        if self._client is None:
+            self._client = get_boto3_client("sqs", self.queue_url.split(".")[1])
+        return self._client
+
+    def send(self, message):
+        """
+        Args:
+            message: JSON serializable job message
+        """
+        self.client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+
+class InMemoryJobStore:
+    """
+    Jobs in the memory of the process
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job["job_id"]] = json.loads(json.dumps(job))
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: the job, None when there is no job with this id
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job is not None else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def claim(self, job_id, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        Mark the job running if it is claimable, see is_claimable
+
+        Returns:
+            dict: the claimed job, None when the job is not claimable or not found
+        """
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not is_claimable(job, now):
+                return None
+            job.update(claim_fields(job, now, lease_seconds))
+            return json.loads(json.dumps(job))
+
+
+class SqliteJobStore:
+    """
+    Jobs in a SQLite database, one JSON document per job
+    """
+
+    def __init__(self, path=":memory:"):
+        """
+        Args:
+            path: database file, an in-memory database by default
+        """
+        import sqlite3
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, job TEXT NOT NULL)")
+
+    def create(self, job):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT INTO jobs (job_id, job) VALUES (?, ?)",
+                                     (job["job_id"], json.dumps(job)))
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: the job, None when there is no job with this id
+        """
+        with self._lock:
+            return self._get(job_id)
+
+    def update(self, job_id, **fields):
+        with self._lock, self._connection:
+            job = self._get(job_id)
+            job.update(fields, updated_at=time.time())
+            self._put(job)
+
+    def claim(self, job_id, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        Mark the job running if it is claimable, see is_claimable
+
+        Returns:
+            dict: the claimed job, None when the job is not claimable or not found
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            job = self._get(job_id)
+            if job is None or not is_claimable(job, now):
+                return None
+            job.update(claim_fields(job, now, lease_seconds))
+            self._put(job)
+            return job
+
+    def _get(self, job_id):
+        row = self._connection.execute("SELECT job FROM jobs WHERE job_id = ?",
+                                       (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, job):
+        self._connection.execute("UPDATE jobs SET job = ? WHERE job_id = ?",
+                                 (json.dumps(job), job["job_id"]))
+
+
+class DynamoDBJobStore:
+    """
+    Jobs in a DynamoDB table keyed by job_id. The deadline and the attempts are number
+    attributes so a job is claimed by one conditional update, expires_at is the number
+    attribute of the time to live of the table.
+    """
+
+    def __init__(self, table_name, client=None):
+        """
+        Args:
+            table_name: DynamoDB table name
+            client: boto3 dynamodb client, a pooled client of AWS_REGION when None
+        """
+        self.table_name = table_name
+        self._client = client
+
+    @property
+    def client(self):
+        """
+        dynamodb client, created on the first call
+        """
+        if self._client is None:
+            self._client = get_boto3_client("dynamodb", os.environ.get("AWS_REGION"))
+        return self._client
+
+    def create(self, job):
+        item = {key: {"S": json.dumps(value)} for key, value in job.items()
+                if key not in ("job_id", "status", "expires_at")}
+        item.update(job_id={"S": job["job_id"]}, status={"S": job["status"]},
+                    expires_at={"N": str(job["expires_at"])})
+        self.client.put_item(TableName=self.table_name, Item=item)
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: the job, None when there is no job with this id
+        """
+        item = self.client.get_item(TableName=self.table_name, Key={"job_id": {"S": job_id}},
+                                    ConsistentRead=True).get("Item")
+        return self._to_job(item) if item is not None else None
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        names = {f"#f{number}": key for number, key in enumerate(fields)}
+        values = {f":v{number}": {"S": value if key == "status" else json.dumps(value)}
+                  for number, (key, value) in enumerate(fields.items())}
+        self.client.update_item(
+            TableName=self.table_name, Key={"job_id": {"S": job_id}},
+            UpdateExpression="SET " + ", ".join(f"#f{number} = :v{number}"
+                                                for number in range(len(fields))),
+            ExpressionAttributeNames=names, ExpressionAttributeValues=values)
+
+    def claim(self, job_id, lease_seconds=JOB_LEASE_SECONDS):
+        """
+        Mark the job running if it is claimable, see is_claimable. The condition is
+        checked by DynamoDB, so two deliveries of a message cannot both claim the job.
+
+        Returns:
+            dict: the claimed job, None when the job is not claimable or not found
+        """
+        now = time.time()
+        try:
+            response = self.client.update_item(
+                TableName=self.table_name, Key={"job_id": {"S": job_id}},
+                UpdateExpression="SET #s = :running, started_at = :now_json, "
+                                 "deadline = :deadline, updated_at = :now_json "
+                                 "ADD attempts :one",
+                ConditionExpression="#s = :queued OR (#s = :running AND deadline <= :now)",
+                ExpressionAttributeNames={"#s": "status"},
+                ExpressionAttributeValues={
+                    ":queued": {"S": JOB_QUEUED}, ":running": {"S": JOB_RUNNING},
+                    ":now": {"N": repr(now)}, ":now_json": {"S": json.dumps(now)},
+                    ":deadline": {"N": repr(now + lease_seconds)}, ":one": {"N": "1"}},
+                ReturnValues="ALL_NEW")
+        except ClientError as error:
+            if error.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return None
+        return self._to_job(response["Attributes"])
+
+    @staticmethod
+    def _to_job(item):
+        job = {key: json.loads(value["S"]) for key, value in item.items()
+               if key not in ("job_id", "status", "deadline", "attempts", "expires_at")}
+        job.update(job_id=item["job_id"]["S"], status=item["status"]["S"])
+        if "expires_at" in item:
+            job["expires_at"] = int(item["expires_at"]["N"])
+        if "deadline" in item:
+            job["deadline"] = float(item["deadline"]["N"])
+        if "attempts" in item:
+            job["attempts"] = int(item["attempts"]["N"])
+        return job
+
+
+_BACKENDS = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Returns:
+        SqsJobQueue when JOB_QUEUE_URL is set, else the InMemoryJobQueue of the process
+    """
+    with _BACKENDS_LOCK:
+        if "queue" not in _BACKENDS:
+            _BACKENDS["queue"] = SqsJobQueue(JOB_QUEUE_URL) if JOB_QUEUE_URL \
+                else InMemoryJobQueue()
+        return _BACKENDS["queue"]
+
+
+def get_job_store():
+    """
+    Returns:
+        DynamoDBJobStore when JOB_TABLE_NAME is set, SqliteJobStore when JOB_STORE_PATH
+        is set, else the InMemoryJobStore of the process
+    """
+    with _BACKENDS_LOCK:
+        if "store" not in _BACKENDS:
+            if JOB_TABLE_NAME:
+                _BACKENDS["store"] = DynamoDBJobStore(JOB_TABLE_NAME)
+            elif JOB_STORE_PATH:
+                _BACKENDS["store"] = SqliteJobStore(JOB_STORE_PATH)
+            else:
+                _BACKENDS["store"] = InMemoryJobStore()
+        return _BACKENDS["store"]
+
+
+def submit_job(operation, event, request_id, queue=None, store=None):
+    """
+    Record a queued job and send it to the workers
+
+    Args:
+        operation: name of the operation in the worker registry
+        event: API gateway proxy event of the request
+        request_id: request-context-id of the request
+        queue: job queue, get_job_queue() when None
+        store: job store, get_job_store() when None
+
+    Returns:
+        dict: the queued job, see public_job
+    """
+    store = store or get_job_store()
+    queue = queue or get_job_queue()
+    job = new_job(operation, event, request_id)
+    store.create(job)
+    queue.send({"job_id": job["job_id"], "operation": operation})
+    return public_job(job)
+
+
+class JobProgress:
+    """
+    Callable counting the outcomes of the alarms of a job by host. The counts are
+    written to the job store at most every interval seconds, so the job item stays small
+    and a job costs a few writes whatever its number of alarms.
+    """
+
+    def __init__(self, store, job_id, interval=JOB_PROGRESS_INTERVAL, clock=time.monotonic):
+        """
+        Args:
+            store: job store of the job
+            job_id: id of the job
+            interval: seconds between two writes of the counts
+            clock: callable returning monotonic seconds
+        """
+        self.store = store
+        self.job_id = job_id
+        self.interval = interval
+        self.clock = clock
+        self._outcomes = {}
+        self._changed = False
+        self._written_at = clock()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def __call__(self, hostname, alarm_name, outcome):
+        """
+        Record the latest outcome of an alarm, the counts are written when the interval
+        has passed since the last write
+
+        Args:
+            hostname: host of the alarm
+            alarm_name: name of the alarm
+            outcome: outcome of the alarm. Ex: created, failed: <error>
+        """
+        with self._lock:
+            self._outcomes[(hostname, alarm_name)] = outcome.split(":", 1)[0]
+            self._changed = True
+            due = self.clock() - self._written_at >= self.interval
+        if due:
+            self.flush()
+
+    def summary(self):
+        """
+        Returns:
+            dict: count of the alarms by outcome by hostname. Ex: {"host1": {"created": 12}}
+        """
+        with self._lock:
+            return self._summary()
+
+    def flush(self):
+        """
+        Write the counts to the job store if they changed since the last write
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._changed:
+                    return
+                summary = self._summary()
+                self._changed = False
+                self._written_at = self.clock()
+            try:
+                self.store.update(self.job_id, progress=summary)
+            except Exception:
+                with self._lock:
+                    self._changed = True
+                raise
+
+    def _summary(self):
+        counts = {}
+        for (hostname, _), outcome in self._outcomes.items():
+            host_counts = counts.setdefault(hostname, {})
+            host_counts[outcome] = host_counts.get(outcome, 0) + 1
+        return counts
@@ -2,11 +2,14 @@
 """
 Helper functions for Lambda helper
 """
+import logging
 import traceback
 
 from sls.utils.auth import authorize_lambda
 from sls.utils.construct_response import ConstructResponse
 from sls.utils.aws_ec2 import is_region_valid
+from sls.utils.jobs import is_async_request, submit_job
+from sls.utils.tracing import TRACER
 from sls.utils.exceptions import (InvalidAccount, Unauthorized,
                               InvalidRegion, DatabaseNotFound,
                               InvalidParameter, ResourceNotFound)
@@ -29,7 +32,7 @@ def set_logger_context_id(event, logger):
     return logger
 
 
-def process_api_request(event, func, logger):
+def process_api_request(event, func, logger, operation=None):
     """
     Create alarms for 2 RDS metrics: CPUUtilization, FreeStorageSpace
 
@@ -37,11 +40,37 @@ def process_api_request(event, func, logger):
         event: API gateway proxy event
         func: function to call to process api request
         logger
+        operation: name of func in the job worker registry. When set, a request with
+                   async=true is queued as a job and answered with 202 and the job
 
     Returns:
     """
     # set logger id
     logger = set_logger_context_id(event, logger)
+    TRACER.start_trace(logger.get_uuid())
+    try:
+        with TRACER.span("request", path=event.get('resource')):
+            return handle_api_request(event, func, logger, operation)
+    finally:
+        if logger.is_enabled_for(logging.INFO):
+            logger.info("Trace summary: %s", TRACER.summary())
+        TRACER.end_trace()
+
+
+def handle_api_request(event, func, logger, operation=None):
+    """
+    Validate the request and call func, or queue it as a job. Each stage is recorded
+    as a span.
+
+    Args:
+        event: API gateway proxy event
+        func: function to call to process api request
+        logger
+        operation: name of func in the job worker registry
+
+    Returns:
+        dict: API gateway proxy response
+    """
 
     # initiate Construct response
     const_resp = ConstructResponse(logger)
@@ -53,10 +82,18 @@ def process_api_request(event, func, logger):
         region = path_params.get("region_name")
         if not account_id:
             raise InvalidAccount(f"Account not found: {account_id}")
-        authorize_lambda(event)
-        if not is_region_valid(region, logger):
-            raise InvalidRegion(f"Region not found: {region}")
-        output = func(event)
+        with TRACER.span("authorize"):
+            authorize_lambda(event)
+        with TRACER.span("validate_region"):
+            if not is_region_valid(region, logger):
+                raise InvalidRegion(f"Region not found: {region}")
+        if operation and is_async_request(event):
+            with TRACER.span("submit_job"):
+                job = submit_job(operation, event, logger.get_uuid())
+            logger.info(f"Queued job {job['job_id']} for {operation}")
+            return const_resp.construct_response(202, "job", job)
+        with TRACER.span("process"):
+            output = func(event)
 
     except Unauthorized as exc:
         traceback.print_exc()
@@ -1,38 +1,107 @@
 # pylint: disable=logging-format-interpolation, redefined-outer-name, redefined-builtin, bad-option-value, import-error, missing-module-docstring, missing-function-docstring
 
+import json
 import logging
+import os
 import uuid
+import zlib
+
+# Level of the Logger messages, set by serverless.yml
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Messages longer than this are truncated, 0 to never truncate
+LOG_MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "4096"))
+# Fraction of the requests whose long messages are logged in full
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+
+def get_log_level(name=LOG_LEVEL):
+    """
+    Returns:
+        int: logging level of a level name, INFO for an unknown name
+    """
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else logging.INFO
+
+
+def is_sampled(request_id, rate=LOG_PAYLOAD_SAMPLE_RATE):
+    """
+    Returns:
+        bool: True for the given fraction of the request ids, always the same for one id
+    """
+    return zlib.crc32(str(request_id).encode()) % 10000 < rate * 10000
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format each record as one JSON line. The message is only rendered when a record is
+    emitted, and truncated to max_chars unless the record is sampled for a full payload.
+    """
+
+    def __init__(self, max_chars=LOG_MAX_MESSAGE_CHARS):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record):
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars and \
+                not getattr(record, "full_payload", False):
+            message = (f"{message[:self.max_chars]}..."
+                       f"[{len(message) - self.max_chars} chars truncated]")
+        entry = {"level": record.levelname, "timestamp": self.formatTime(record),
+                 "request_id": getattr(record, "request_id", None), "logger": record.name,
+                 "message": message}
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
 
 class Logger:
     """
-    Custom logger
+    Custom logger writing JSON lines tagged with the request-context-id.
+
+    Messages take logging style arguments, formatted only when the level is enabled:
+    logger.debug("Alarms configuration: %s", alarms_conf). Keyword arguments are added
+    as fields of the JSON line: logger.info("Alarms created", count=12).
     """
     def __init__(self):
         log = logging.getLogger()
         for h in log.handlers:
-            h.setFormatter(logging.Formatter("[%(levelname)s]:%(message)s"))
+            if not isinstance(h.formatter, JsonFormatter):
+                h.setFormatter(JsonFormatter())
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.INFO)
-        self._id = uuid.uuid4().hex
+        self.logger.setLevel(get_log_level())
+        self.set_new_uuid()
 
     def set_new_uuid(self):
-        self._id = uuid.uuid4().hex
+        self.set_uuid(uuid.uuid4().hex)
 
     def get_uuid(self):
         return self._id
 
     def set_uuid(self, logger_id):
         self._id = logger_id
+        self._full_payload = is_sampled(logger_id)
+
+    def error(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warn(self, msg, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
 
-    def error(self, msg):
-        self.logger.error("{}: {}".format(self._id, msg))
+    warning = warn
 
-    def info(self, msg):
-        self.logger.info("{}: {}".format(self._id, msg))
+    def debug(self, msg, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
 
-    def warn(self, msg):
-        self.logger.warning("{}: {}".format(self._id, msg))
+    def is_enabled_for(self, level):
+        return self.logger.isEnabledFor(level)
 
-    def debug(self, msg):
-        self.logger.debug("{}: {}".format(self._id, msg))
+    def _log(self, level, msg, args, fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args,
+                            extra={"request_id": self._id, "fields": fields,
+                                   "full_payload": self._full_payload})
@@ -0,0 +1,152 @@
+"""
+Module to cache the metrics discovered for each instance, ex: its filesystems, across the
+warm invocations of a container
+"""
+# pylint: disable=import-error
+import collections
+import os
+import threading
+import time
+
+# Seconds the discovered metrics of an instance are used without any ListMetrics call
+METRIC_DISCOVERY_TTL = int(os.environ.get("METRIC_DISCOVERY_TTL_SECONDS", "3600"))
+# Seconds after which the discovered metrics are listed again in full, in between a stale
+# entry is refreshed with the recently active metrics only
+METRIC_DISCOVERY_FULL_REFRESH = int(os.environ.get("METRIC_DISCOVERY_FULL_REFRESH_SECONDS",
+                                                   "86400"))
+# Entries kept, the least recently refreshed are dropped first
+METRIC_DISCOVERY_CACHE_SIZE = int(os.environ.get("METRIC_DISCOVERY_CACHE_SIZE", "50000"))
+
+REFRESH_FULL = "full"
+REFRESH_INCREMENTAL = "incremental"
+
+
+def get_metric_key(metric):
+    """
+    Returns:
+        tuple: identity of a ListMetrics metric, its dimensions in any order
+    """
+    return (metric.get("Namespace"), metric.get("MetricName"),
+            tuple(sorted((dimension["Name"], dimension.get("Value"))
+                         for dimension in metric.get("Dimensions", []))))
+
+
+class MetricDiscoveryCache:
+    """
+    ListMetrics results by (account, region, instance id, discovery key). A fresh entry is
+    served without any call. A stale entry is refreshed incrementally: only the recently
+    active metrics are listed and added to it, and it is listed in full again after
+    full_refresh seconds. An incremental refresh never drops a metric, so a caller that
+    deletes the alarms of the metrics no longer discovered asks for a full listing. An
+    empty discovery is not cached: right after a launch the CloudWatch agent has not
+    published any metric yet.
+    """
+
+    def __init__(self, ttl=METRIC_DISCOVERY_TTL, full_refresh=METRIC_DISCOVERY_FULL_REFRESH,
+                 max_entries=METRIC_DISCOVERY_CACHE_SIZE, clock=time.monotonic):
+        """
+        Args:
+            ttl: seconds an entry is served without any call, 0 disables the cache
+            full_refresh: seconds after which an entry is listed in full again
+            max_entries: entries kept
+            clock: callable returning monotonic seconds
+        """
+        self.ttl = ttl
+        self.full_refresh = full_refresh
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = collections.defaultdict(threading.Lock)
+
+    def get(self, key, list_metrics, full=False):
+        """
+        Args:
+            key: (account, region, instance id, discovery key)
+            list_metrics: callable(recently_active) returning the ListMetrics metrics,
+                          only the recently active ones when recently_active is True
+            full: True to list the metrics in full whatever the entry, the listing
+                  replaces the entry
+
+        Returns:
+            list: metrics of the discovery
+        """
+        metrics, refresh = self.lookup(key, full)
+        if refresh is None:
+            return metrics
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            if not full:
+                metrics, refresh = self.lookup(key)
+                if refresh is None:
+                    return metrics
+            return self.store(key, refresh, list_metrics(refresh == REFRESH_INCREMENTAL))
+
+    async def get_async(self, key, list_metrics, full=False):
+        """
+        Coroutine version of get, list_metrics returns an awaitable
+        """
+        metrics, refresh = self.lookup(key, full)
+        if refresh is None:
+            return metrics
+        return self.store(key, refresh, await list_metrics(refresh == REFRESH_INCREMENTAL))
+
+    def lookup(self, key, full=False):
+        """
+        Args:
+            key: (account, region, instance id, discovery key)
+            full: True when a full listing is required whatever the entry
+
+        Returns:
+            tuple: (cached metrics, None) when the entry is fresh, else
+                   (None, REFRESH_FULL or REFRESH_INCREMENTAL)
+        """
+        if full:
+            return None, REFRESH_FULL
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or now - entry["listed_at"] >= self.full_refresh:
+            return None, REFRESH_FULL
+        if now - entry["checked_at"] >= self.ttl:
+            return None, REFRESH_INCREMENTAL
+        return list(entry["metrics"].values()), None
+
+    def store(self, key, refresh, metrics):
+        """
+        Replace the entry with a full listing, or add the recently active metrics to it
+
+        Returns:
+            list: metrics of the entry
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if refresh == REFRESH_FULL or entry is None:
+                entry = {"metrics": collections.OrderedDict(), "listed_at": now}
+            entry["metrics"].update((get_metric_key(metric), metric) for metric in metrics)
+            entry["checked_at"] = now
+            if self.ttl > 0 and entry["metrics"]:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted, None)
+            else:
+                self._key_locks.pop(key, None)
+            return list(entry["metrics"].values())
+
+    def invalidate(self, key=None):
+        """
+        Drop the entry of a key, or every entry when key is None
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._key_locks.clear()
+            else:
+                self._entries.pop(key, None)
+                self._key_locks.pop(key, None)
+
+
+METRIC_DISCOVERY_CACHE = MetricDiscoveryCache()
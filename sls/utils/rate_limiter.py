@@ -0,0 +1,194 @@
+"""
+Module to share an adaptive rate limit between the threads calling the same AWS API
+"""
+# pylint: disable=unused-argument, import-error
+import json
+import os
+import threading
+import time
+
+# Calls per second allowed when a bucket is created, and its burst size
+DEFAULT_RATE = float(os.environ.get("AWS_CALLS_PER_SECOND", "20"))
+# Initial rate of the operations whose quota differs from DEFAULT_RATE, by
+# "service.Operation": the default CloudWatch quotas per account and region. A raised
+# quota is reached as the rate grows, AWS_OPERATION_CALLS_PER_SECOND overrides them as
+# a JSON object. Ex: {"cloudwatch.PutMetricAlarm": 10}
+OPERATION_RATES = {
+    "cloudwatch.PutMetricAlarm": 3.0,
+    "cloudwatch.DeleteAlarms": 3.0,
+    "cloudwatch.DescribeAlarms": 9.0,
+    "cloudwatch.DescribeAlarmsForMetric": 9.0,
+    "cloudwatch.ListMetrics": 25.0,
+}
+OPERATION_RATES.update(json.loads(os.environ.get("AWS_OPERATION_CALLS_PER_SECOND", "{}")))
+# The rate never grows above MAX_RATE or shrinks below MIN_RATE
+MAX_RATE = float(os.environ.get("AWS_MAX_CALLS_PER_SECOND", "50"))
+MIN_RATE = 0.5
+# The rate is multiplied by THROTTLE_FACTOR on a throttling error, at most once per cooldown
+THROTTLE_FACTOR = 0.5
+THROTTLE_COOLDOWN = 1.0
+# Calls per second added after each second without throttling
+RATE_INCREASE = 1.0
+RATE_LIMITED_SERVICES = ("cloudwatch", "ec2", "resourcegroupstaggingapi")
+THROTTLING_ERROR_CODES = {
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestThrottledException",
+    "RequestThrottled", "RequestLimitExceeded", "TooManyRequestsException", "SlowDown"
+}
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate shrinks multiplicatively on throttling errors
+    and grows additively while calls succeed
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: initial calls per second, also the burst size
+            min_rate: lower bound of the rate
+            max_rate: upper bound of the rate
+            clock: callable returning monotonic seconds
+            sleep: callable sleeping for the given seconds
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.clock = clock
+        self.sleep = sleep
+        self.throttles = 0
+        self._tokens = rate
+        self._updated_at = clock()
+        self._rate_changed_at = self._updated_at
+        self._throttled_at = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take a token, sleeping until it is available. Tokens are reserved under the lock
+        and the wait happens outside of it, so waiting threads are served in order.
+
+        Returns:
+            float: seconds waited
+        """
+        with self._lock:
+            self._refill(self.clock())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def on_throttle(self):
+        """
+        Shrink the rate after a throttling error. Errors arriving within the cooldown are
+        answers to calls sent before the previous decrease and do not shrink it again.
+        """
+        with self._lock:
+            now = self.clock()
+            self.throttles += 1
+            if self._throttled_at is not None and now - self._throttled_at < THROTTLE_COOLDOWN:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * THROTTLE_FACTOR)
+            self._tokens = min(self._tokens, self.rate)
+            self._rate_changed_at = self._throttled_at = now
+
+    def on_success(self):
+        """
+        Grow the rate by RATE_INCREASE for each second since the last change
+        """
+        with self._lock:
+            now = self.clock()
+            elapsed = now - self._rate_changed_at
+            if elapsed < 1 or self.rate >= self.max_rate:
+                return
+            self._refill(now)
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE * int(elapsed))
+            self._rate_changed_at = now
+
+    def _refill(self, now):
+        self._tokens = min(self.rate, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+class RateLimiter:
+    """
+    Token buckets by (service, operation, account, region), shared by every client of the
+    container. AWS sets a quota per API, so each operation has its own bucket: heavy
+    describes do not starve the puts, and a throttled operation only slows itself.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, operation_rates=None, bucket_factory=TokenBucket):
+        """
+        Args:
+            rate: initial calls per second of the buckets of the operations not in
+                  operation_rates
+            operation_rates: initial calls per second by "service.Operation",
+                             OPERATION_RATES when None
+            bucket_factory: callable taking the rate and returning a TokenBucket
+        """
+        self.rate = rate
+        self.operation_rates = OPERATION_RATES if operation_rates is None else operation_rates
+        self.bucket_factory = bucket_factory
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, service_name, operation_name, account, region):
+        """
+        Returns:
+            TokenBucket: bucket of the operation for the account and region
+        """
+        key = (service_name, operation_name, account, region)
+        with self._lock:
+            if key not in self._buckets:
+                rate = self.operation_rates.get(f"{service_name}.{operation_name}", self.rate)
+                self._buckets[key] = self.bucket_factory(rate)
+            return self._buckets[key]
+
+    def register(self, events, service_name, account, region):
+        """
+        Route the calls of a client through the bucket of their operation for the account
+        and region. A token is taken before each attempt, retries included, and the bucket
+        adapts to the response of each attempt.
+
+        Args:
+            events: botocore event emitter of the client, client.meta.events
+            service_name: boto3 service name. Ex: cloudwatch
+            account: account of the client credentials
+            region: Aws Region of the client
+        """
+        def get_bucket(event_name):
+            # Event names end with the operation. Ex: before-send.cloudwatch.PutMetricAlarm
+            return self.get_bucket(service_name, event_name.rsplit(".", 1)[-1], account,
+                                   region)
+
+        def before_send(event_name=None, **kwargs):
+            get_bucket(event_name).acquire()
+
+        def needs_retry(event_name=None, response=None, **kwargs):
+            if response is None:
+                return
+            bucket = get_bucket(event_name)
+            error_code = response[1].get("Error", {}).get("Code")
+            if error_code in THROTTLING_ERROR_CODES:
+                bucket.on_throttle()
+            elif error_code is None:
+                bucket.on_success()
+
+        events.register("before-send", before_send)
+        events.register("needs-retry", needs_retry)
+
+    def stats(self):
+        """
+        Returns:
+            dict: current rate and throttling errors by "service/operation/account/region"
+        """
+        with self._lock:
+            return {"/".join(str(part) for part in key): {"rate": bucket.rate,
+                                                          "throttles": bucket.throttles}
+                    for key, bucket in self._buckets.items()}
+
+
+RATE_LIMITER = RateLimiter()
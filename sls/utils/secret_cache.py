@@ -0,0 +1,138 @@
+"""
+Module to cache Secrets Manager secrets across the warm invocations of a container
+"""
+# pylint: disable=broad-except, import-error
+import logging
+import os
+import threading
+import time
+
+lgr = logging.getLogger()
+
+# Seconds a secret is served from the cache
+SECRET_CACHE_TTL = int(os.environ.get("SECRET_CACHE_TTL_SECONDS", "900"))
+# A secret is fetched again by the first request this many seconds before it expires
+SECRET_REFRESH_MARGIN = int(os.environ.get("SECRET_REFRESH_MARGIN_SECONDS", "120"))
+
+
+class SecretEntry:
+    """
+    Cached secret value with its version and expiry
+    """
+
+    def __init__(self, value, version_id, expires_at):
+        self.value = value
+        self.version_id = version_id
+        self.expires_at = expires_at
+
+
+class SecretCache:
+    """
+    Process-wide cache of secret values. A secret close to expiry is fetched again in
+    the calling thread by the first request inside the refresh margin, the requests
+    arriving during that fetch are served the cached value. Lambda freezes the container
+    between invocations, so no refresh is left running in the background. When a fetch
+    fails, the cached value is served until it expires, then the expired value if there
+    is one.
+    """
+
+    def __init__(self, ttl=SECRET_CACHE_TTL, refresh_margin=SECRET_REFRESH_MARGIN,
+                 clock=time.monotonic):
+        """
+        Args:
+            ttl: seconds a secret is served from the cache
+            refresh_margin: seconds before expiry from which a request fetches it again
+            clock: callable returning monotonic seconds
+        """
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._entries = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """
+        Return the cached secret value, calling fetch when it is missing or expired.
+        Concurrent callers for the same key wait for a single fetch.
+
+        Args:
+            key: cache key ending with the secret id, ex: (account, region, secret id)
+            fetch: callable returning a GetSecretValue response
+
+        Returns:
+            str: SecretString of the secret
+        """
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is not None and now < entry.expires_at:
+            if now >= entry.expires_at - self.refresh_margin:
+                return self._refresh(key, fetch, entry)
+            return entry.value
+
+        with self._get_key_lock(key):
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() < entry.expires_at:
+                return entry.value
+            try:
+                return self._fetch(key, fetch).value
+            except Exception as error:
+                if entry is None:
+                    raise
+                lgr.error(f"Serving expired secret for {key[-1]}: {error}")
+                return entry.value
+
+    def get_version(self, key):
+        """
+        Returns:
+            str: VersionId of the cached secret, or None
+        """
+        entry = self._entries.get(key)
+        return entry.version_id if entry is not None else None
+
+    def invalidate(self, key=None):
+        """
+        Drop the cached secret for a key, or every secret when key is None
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _fetch(self, key, fetch):
+        response = fetch()
+        version_id = response.get("VersionId")
+        previous = self._entries.get(key)
+        if previous is not None and previous.version_id != version_id:
+            lgr.info(f"Secret {key[-1]} rotated to version {version_id}")
+        entry = SecretEntry(response.get("SecretString"), version_id, self.clock() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def _get_key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key, fetch, entry):
+        """
+        Fetch a secret inside its refresh margin, unless another thread is fetching it
+
+        Returns:
+            str: the fetched value, the cached value while another thread fetches it
+                 or when the fetch fails
+        """
+        key_lock = self._get_key_lock(key)
+        if not key_lock.acquire(blocking=False):
+            return entry.value
+        try:
+            return self._fetch(key, fetch).value
+        except Exception as error:
+            lgr.error(f"Secret {key[-1]} not refreshed: {error}")
+            return entry.value
+        finally:
+            key_lock.release()
+
+
+SECRET_CACHE = SecretCache()
@@ -0,0 +1,76 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from sls.utils.aio import AsyncClient, AsyncCloudWatchClient, run_coroutine
+
+
+class NativeCloudWatch:
+    """Coroutine client storing the alarms in memory"""
+
+    def __init__(self):
+        self.alarms = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def put_metric_alarm(self, AlarmName, **kwargs):
+        self.calls.append(("put_metric_alarm", AlarmName))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if kwargs.get("fail"):
+            raise ValueError("invalid alarm")
+        self.alarms.add(AlarmName)
+
+    async def describe_alarms(self, AlarmNames, MaxRecords):
+        self.calls.append(("describe_alarms", len(AlarmNames)))
+        return {"MetricAlarms": [{"AlarmName": name} for name in AlarmNames
+                                 if name in self.alarms]}
+
+
+class TestAsyncClient(unittest.TestCase):
+    def test_sync_client_runs_on_executor(self):
+        client = MagicMock()
+        client.describe_alarms.return_value = {"MetricAlarms": []}
+
+        async def call():
+            aio = AsyncClient(client, concurrency=2)
+            try:
+                return await aio.call("describe_alarms", AlarmNames=["a"])
+            finally:
+                aio.close()
+        self.assertEqual(run_coroutine(call()), {"MetricAlarms": []})
+        client.describe_alarms.assert_called_once_with(AlarmNames=["a"])
+
+    def test_paginate(self):
+        client = MagicMock()
+        client.get_resources.side_effect = [{"PaginationToken": "next", "Items": [1]},
+                                            {"PaginationToken": "", "Items": [2]}]
+
+        async def paginate():
+            aio = AsyncClient(client)
+            try:
+                return await aio.paginate("get_resources", token_key="PaginationToken", Key="k")
+            finally:
+                aio.close()
+        pages = run_coroutine(paginate())
+        self.assertEqual([page["Items"] for page in pages], [[1], [2]])
+        self.assertEqual(client.get_resources.call_args_list[1].kwargs,
+                         {"Key": "k", "PaginationToken": "next"})
+
+
+class TestAsyncCloudWatchClient(unittest.TestCase):
+    def setUp(self):
+        self.native = NativeCloudWatch()
+        self.cloudwatch_client = MagicMock(client=self.native)
+
+    def test_put_bounded_and_confirmed(self):
+        async def put():
+            aio = AsyncCloudWatchClient(self.cloudwatch_client, concurrency=3)
+            await asyncio.gather(*[aio.put_metric_alarm(f"alarm{index}") for index in range(10)])
+            return await aio.wait_for_alarms([f"alarm{index}" for index in range(10)])
+        self.assertEqual(run_coroutine(put()), [])
+        self.assertEqual(self.native.max_in_flight, 3)
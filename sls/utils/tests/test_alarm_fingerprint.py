@@ -0,0 +1,54 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+
+from sls.utils.alarm_fingerprint import alarm_fingerprint
+
+
+def get_put_parameters():
+    return {
+        "AlarmDescription": "host CPU Utilization > 95% for 60 mins",
+        "MetricName": "CPUUtilization",
+        "Namespace": "AWS/EC2",
+        "Statistic": "Average",
+        "Period": 300,
+        "EvaluationPeriods": 12,
+        "Threshold": 95,
+        "ComparisonOperator": "GreaterThanThreshold",
+        "AlarmActions": ["topic"],
+        "OKActions": ["topic"],
+        "Dimensions": [{"Name": "InstanceId", "Value": "i-1"}]
+    }
+
+
+def get_described_alarm():
+    alarm = get_put_parameters()
+    alarm.update({
+        "AlarmName": "itx-alarms-host-CpuUtilizationGt95PercentFor60Mins",
+        "AlarmArn": "arn",
+        "StateValue": "OK",
+        "Threshold": 95.0,
+        "ActionsEnabled": True,
+        "InsufficientDataActions": [],
+        "TreatMissingData": "missing"
+    })
+    return alarm
+
+
+class TestAlarmFingerprint(unittest.TestCase):
+    def test_same_definition(self):
+        self.assertEqual(alarm_fingerprint(get_put_parameters()),
+                         alarm_fingerprint(get_described_alarm()))
+
+    def test_unordered_actions_and_dimensions(self):
+        first = get_put_parameters()
+        second = get_put_parameters()
+        first["AlarmActions"] = ["a", "b"]
+        second["AlarmActions"] = ["b", "a"]
+        first["Dimensions"] = [{"Name": "InstanceId", "Value": "i-1"}, {"Name": "Filesystem", "Value": "/"}]
+        second["Dimensions"] = list(reversed(first["Dimensions"]))
+        self.assertEqual(alarm_fingerprint(first), alarm_fingerprint(second))
+
+    def test_changed_definition(self):
+        changed = get_described_alarm()
+        changed["Threshold"] = 90.0
+        self.assertNotEqual(alarm_fingerprint(get_put_parameters()), alarm_fingerprint(changed))
@@ -0,0 +1,28 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+import uuid
+
+from sls.utils.alarm_names import get_hashed_alarm_name, strip_uuid_suffix
+
+
+class TestAlarmNames(unittest.TestCase):
+    def test_hashed_name_stable_and_distinct(self):
+        prefix = "itx-alarms-host-nvme1-DiskSpaceGt85PercentFor60Mins"
+        name = get_hashed_alarm_name(prefix, "host", "DiskSpaceUtilization", "/dev/nvme1n1")
+        self.assertEqual(name, get_hashed_alarm_name(prefix, "host", "DiskSpaceUtilization",
+                                                     "/dev/nvme1n1"))
+        self.assertRegex(name, "^" + prefix + "-[0-9a-f]{12}$")
+        self.assertNotEqual(name, get_hashed_alarm_name(prefix, "host", "DiskSpaceUtilization",
+                                                        "/dev/nvme1n2"))
+        self.assertNotEqual(name, get_hashed_alarm_name(prefix, "host2", "DiskSpaceUtilization",
+                                                        "/dev/nvme1n1"))
+
+    def test_strip_uuid_suffix(self):
+        base = "itx-alarms-host-C-PartitionUtilizationGt85PercentFor60Mins"
+        self.assertEqual(strip_uuid_suffix(f"{base}-{uuid.uuid1()}"), base)
+        self.assertIsNone(strip_uuid_suffix(base))
+        self.assertIsNone(strip_uuid_suffix(f"{base}-{uuid.uuid4()}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,8 @@ import os, sys
 module_dir = os.path.dirname(os.path.abspath(__file__))
 module_par = os.path.normpath(os.path.join(module_dir, '../../../'))
 sys.path.append(module_par)
-from sls.utils.aws_cloudwatch import CloudWatchClient
+from sls.utils.aws_cloudwatch import (CloudWatchClient, AlarmNameIndex,
+                                      ALARM_DELETED, ALARM_NOT_DELETED)
 
 
 def get_testing_alarm_config():
@@ -71,13 +72,35 @@ class TestCloudWatchClient(unittest.TestCase):
         boto3_client = MockBoto3.return_value
         boto3_client.describe_alarms.return_value = {}
         cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
-        cloudwatch_client.delete_metric_alarms(alarm_name)
+        outcomes = cloudwatch_client.delete_metric_alarms(alarm_name)
         boto3_client.delete_alarms.assert_called_with(AlarmNames=[alarm_name])
+        self.assertEqual(outcomes, {alarm_name: ALARM_DELETED})
+
+    def test_delete_no_alarms(self):
+        boto3_client = MockBoto3.return_value
+        boto3_client.delete_alarms.reset_mock()
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        self.assertEqual(cloudwatch_client.delete_metric_alarms([]), {})
+        boto3_client.delete_alarms.assert_not_called()
+
+    def test_delete_metric_alarms_chunked(self):
+        names = [f"alarm-{number}" for number in range(250)]
+        boto3_client = MockBoto3.return_value
+        boto3_client.delete_alarms.reset_mock()
+        boto3_client.describe_alarms.return_value = {"MetricAlarms": [{"AlarmName": "alarm-7"}]}
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        with patch("sls.utils.backoff.time.sleep"):
+            outcomes = cloudwatch_client.delete_metric_alarms(names, timeout=0)
+        boto3_client.describe_alarms.return_value = {}
+        self.assertEqual(boto3_client.delete_alarms.call_count, 3)
+        self.assertEqual(outcomes["alarm-7"], ALARM_NOT_DELETED)
+        self.assertEqual(outcomes["alarm-8"], ALARM_DELETED)
+        self.assertEqual(len(outcomes), 250)
 
     def test_find_existing_alarm_name(self):
         alarm_prefix = "testing"
         boto3_client = MockBoto3.return_value
-        boto3_client.describe_alarms.return_value = {
+        boto3_client.get_paginator.return_value.paginate.return_value = [{
             "MetricAlarms": [
                 {
                     "EvaluationPeriods": 2,
@@ -85,7 +108,105 @@ class TestCloudWatchClient(unittest.TestCase):
 
                 }
             ]
-        }
+        }]
         cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
         alarm_name = cloudwatch_client.find_existing_alarm_name(alarm_prefix)
         self.assertEqual(alarm_name, "testingAlarmName")
+
+    def test_build_alarm_name_index(self):
+        boto3_client = MockBoto3.return_value
+        paginator = boto3_client.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {"MetricAlarms": [{"AlarmName": "itx-alarms-host-boot-abc"}]},
+            {"MetricAlarms": [{"AlarmName": "itx-alarms-host-data-def"},
+                              {"AlarmName": "itx-alarms-host-datalog-ghi"}]}
+        ]
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        index = cloudwatch_client.build_alarm_name_index("itx-alarms-host")
+        paginator.paginate.assert_called_with(AlarmNamePrefix="itx-alarms-host",
+                                              AlarmTypes=["MetricAlarm"])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.find_unique("itx-alarms-host-boot"), "itx-alarms-host-boot-abc")
+        self.assertIsNone(index.find_unique("itx-alarms-host-data"))
+        self.assertIsNone(index.find_unique("itx-alarms-host-swap"))
+
+
+    def test_find_missing_alarms_chunked(self):
+        names = [f"alarm-{number}" for number in range(150)]
+        boto3_client = MockBoto3.return_value
+        boto3_client.describe_alarms.reset_mock()
+        boto3_client.describe_alarms.side_effect = [
+            {"MetricAlarms": [{"AlarmName": name} for name in names[:100]]},
+            {"MetricAlarms": [{"AlarmName": name} for name in names[100:149]]}
+        ]
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        missing = cloudwatch_client.find_missing_alarms(names)
+        boto3_client.describe_alarms.side_effect = None
+        self.assertEqual(missing, ["alarm-149"])
+        self.assertEqual(boto3_client.describe_alarms.call_count, 2)
+
+    def test_wait_for_alarms_rechecks_unconfirmed(self):
+        boto3_client = MockBoto3.return_value
+        boto3_client.describe_alarms.reset_mock()
+        boto3_client.describe_alarms.side_effect = [
+            {"MetricAlarms": [{"AlarmName": "alarm-1"}]},
+            {"MetricAlarms": [{"AlarmName": "alarm-2"}]}
+        ]
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        with patch("sls.utils.backoff.time.sleep"):
+            unconfirmed = cloudwatch_client.wait_for_alarms(["alarm-1", "alarm-2"])
+        boto3_client.describe_alarms.side_effect = None
+        self.assertEqual(unconfirmed, [])
+        self.assertEqual(boto3_client.describe_alarms.call_args.kwargs["AlarmNames"], ["alarm-2"])
+
+
+    def test_iter_alarms_follows_pages(self):
+        boto3_client = MockBoto3.return_value
+        paginator = boto3_client.get_paginator.return_value
+        paginator.paginate.return_value = iter([
+            {"MetricAlarms": [{"AlarmName": "alarm-1", "Namespace": "AWS/EC2",
+                               "MetricName": "CPUUtilization",
+                               "Dimensions": [{"Name": "InstanceId", "Value": "i-1"}]}]},
+            {"MetricAlarms": [{"AlarmName": "alarm-2"}]}
+        ])
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        alarms = cloudwatch_client.iter_alarms("alarm")
+        first = next(alarms)
+        self.assertEqual(first.name, "alarm-1")
+        self.assertEqual(first.dimensions, [{"Name": "InstanceId", "Value": "i-1"}])
+        self.assertEqual([alarm.name for alarm in alarms], ["alarm-2"])
+        boto3_client.get_paginator.assert_called_with("describe_alarms")
+
+    def test_iter_metrics_filters(self):
+        boto3_client = MockBoto3.return_value
+        paginator = boto3_client.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {"Metrics": [{"Namespace": "System/Linux", "MetricName": "DiskSpaceUtilization",
+                          "Dimensions": [{"Name": "Filesystem", "Value": "/dev/xvda1"}]}]},
+            {"Metrics": [{"Namespace": "System/Linux", "MetricName": "DiskSpaceUtilization",
+                          "Dimensions": [{"Name": "Filesystem", "Value": "/dev/xvdb1"}]}]}
+        ]
+        dimensions = [{"Name": "InstanceId", "Value": "i-1"}, {"Name": "Filesystem"}]
+        cloudwatch_client = CloudWatchClient(self.aws_creds, self.region)
+        metrics = list(cloudwatch_client.iter_metrics("System/Linux", "DiskSpaceUtilization",
+                                                      dimensions, recently_active=True))
+        paginator.paginate.assert_called_with(Namespace="System/Linux",
+                                              MetricName="DiskSpaceUtilization",
+                                              Dimensions=dimensions, RecentlyActive="PT3H")
+        self.assertEqual(len(metrics), 2)
+        self.assertEqual(metrics[1].dimensions[0]["Value"], "/dev/xvdb1")
+        self.assertEqual(len(cloudwatch_client.list_metrics({"Namespace": "System/Linux"})), 2)
+
+
+class TestAlarmNameIndex(unittest.TestCase):
+    def test_find_with_prefix(self):
+        index = AlarmNameIndex(["b-1", "a-2", "a-1", "ab-1"])
+        self.assertEqual(index.find_with_prefix("a-"), ["a-1", "a-2"])
+        self.assertEqual(index.find_with_prefix("c"), [])
+
+    def test_add(self):
+        index = AlarmNameIndex()
+        index.add("a-1")
+        index.add("a-1")
+        self.assertEqual(index.find_unique("a"), "a-1")
+        self.assertEqual(len(index), 1)
@@ -3,13 +3,15 @@
 import logging
 import unittest
 
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 import os, sys
 module_dir = os.path.dirname(os.path.abspath(__file__))
 module_par = os.path.normpath(os.path.join(module_dir, '../../../'))
 sys.path.append(module_par)
-from sls.utils.aws_ec2 import is_region_valid, get_instance_memory, EC2Client
 from botocore.exceptions import ClientError
+from sls.utils.aws_ec2 import (is_region_valid, get_instance_memory, EC2Client,
+                               InstanceTypeCatalog, INSTANCE_TYPE_CATALOG, LIVE_STATE_FILTER)
+from sls.utils.exceptions import ResourceNotFound
 
 
 class TestAwsEc2(unittest.TestCase):
@@ -17,49 +19,23 @@ class TestAwsEc2(unittest.TestCase):
     Test for RdsClient
     """
 
-    @patch("sls.utils.aws_ec2.EC2_CLIENT")
-    def test_is_region_valid(self, mock_client):
-        mock_client.describe_regions.return_value = {
-            "Regions": [
-                {
-                    "RegionName": "test_region"
-                }
-            ]
-        }
-        return_result = is_region_valid("test_region", logging.getLogger())
-        self.assertTrue(return_result)
+    def test_is_region_valid(self):
+        self.assertTrue(is_region_valid("us-east-1", logging.getLogger()))
+        self.assertFalse(is_region_valid("cn-north-1", logging.getLogger()))
+        self.assertFalse(is_region_valid("us-gov-west-1", logging.getLogger()))
+        self.assertFalse(is_region_valid("test_region", logging.getLogger()))
 
     def test_invalid_parameter(self):
         self.assertFalse(is_region_valid(None, logging.getLogger()))
 
-    @patch("sls.utils.aws_ec2.EC2_CLIENT")
-    def test_client_error(self, mock_client):
-        error = {
-            "Error": {
-                "Code": "InvalidParameterValue",
-                "Message": "Invalid region",
-            }
-        }
-        mock_client.side_effect = ClientError(error, "is_region_valid")
-        return_result = is_region_valid("test_region", logging.getLogger())
-        self.assertFalse(return_result)
-
-    @patch("sls.utils.aws_ec2.EC2_CLIENT")
-    def test_exception(self, mock_client):
-        error = {
-            "Error": {
-                "Code": "OtherClientError",
-                "Message": "Client error",
-            }
-        }
-        mock_client.describe_regions.side_effect = ClientError(error, "is_region_valid")
-        self.assertRaises(ClientError, is_region_valid, "test_region", logging.getLogger())
-
-    @patch("sls.utils.aws_ec2.EC2_CLIENT")
-    def test_get_instance_memory(self, mock_client):
+    @patch("sls.utils.aws_ec2.get_boto3_client")
+    def test_get_instance_memory(self, mock_boto3):
+        INSTANCE_TYPE_CATALOG.clear()
+        mock_client = mock_boto3.return_value
         mock_client.describe_instance_types.return_value = {
             "InstanceTypes": [
                 {
+                    "InstanceType": "test_instance_type",
                     "MemoryInfo": {
                         "SizeInMiB": 123
                     }
@@ -68,6 +44,10 @@ class TestAwsEc2(unittest.TestCase):
         }
         return_result = get_instance_memory("test_instance_type", logging.getLogger())
         self.assertEqual(return_result, 123)
+        get_instance_memory("test_instance_type", logging.getLogger())
+        mock_client.describe_instance_types.assert_called_once_with(
+            InstanceTypes=["test_instance_type"])
+        INSTANCE_TYPE_CATALOG.clear()
 
     @patch("sls.utils.aws_creds.AwsCreds")
     @patch("sls.utils.aws_ec2.get_boto3_client")
@@ -96,3 +76,112 @@ class TestAwsEc2(unittest.TestCase):
         ec2_client = EC2Client(aws_creds, "test_region")
         return_result = ec2_client.get_running_instance_by_hostname("testing")
         self.assertEqual(return_result, ec2_instance["Reservations"][0]["Instances"][0])
+
+    @patch("sls.utils.aws_creds.AwsCreds")
+    @patch("sls.utils.aws_ec2.get_boto3_client")
+    def test_lookup_running_instances_by_hostnames(self, mock_boto3, mock_creds):
+        paginator = mock_boto3.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [
+            {"Reservations": [{"Instances": [
+                {"InstanceId": "i-1", "Tags": [{"Key": "Hostname", "Value": "host1"}]}]}]},
+            {"Reservations": [{"Instances": [
+                {"InstanceId": "i-2", "Tags": [{"Key": "Hostname", "Value": "host2"}]}]}]}
+        ]
+        ec2_client = EC2Client(mock_creds.return_value, "test_region")
+        instances = ec2_client.lookup_running_instances_by_hostnames(["host1", "host2", "host3"])
+        self.assertEqual(sorted(instances), ["host1", "host2"])
+        self.assertEqual(instances["host2"]["InstanceId"], "i-2")
+        filters = paginator.paginate.call_args.kwargs["Filters"]
+        self.assertEqual(filters[0], {"Name": "tag:Hostname", "Values": ["host1", "host2", "host3"]})
+        self.assertEqual(filters[1]["Name"], "instance-state-name")
+
+    @patch("sls.utils.aws_creds.AwsCreds")
+    @patch("sls.utils.aws_ec2.get_boto3_client")
+    def test_get_instances_by_ids(self, mock_boto3, mock_creds):
+        paginator = mock_boto3.return_value.get_paginator.return_value
+        paginator.paginate.side_effect = lambda Filters: [{"Reservations": [{"Instances": [
+            {"InstanceId": instance_id, "State": {"Name": "terminated"}}
+            for instance_id in Filters[0]["Values"] if instance_id != "i-gone"]}]}]
+        ec2_client = EC2Client(mock_creds.return_value, "test_region")
+        instance_ids = [f"i-{number}" for number in range(250)] + ["i-gone"]
+        instances = ec2_client.get_instances_by_ids(instance_ids)
+        self.assertEqual(len(instances), 250)
+        self.assertEqual(paginator.paginate.call_count, 2)
+        self.assertEqual(paginator.paginate.call_args.kwargs["Filters"][0]["Name"], "instance-id")
+
+    @patch("sls.utils.aws_creds.AwsCreds")
+    @patch("sls.utils.aws_ec2.get_boto3_client")
+    def test_confirm_running_instances(self, mock_boto3, mock_creds):
+        paginator = mock_boto3.return_value.get_paginator.return_value
+        # i-2 was terminated and is no longer described, i-3 was renamed
+        paginator.paginate.return_value = [{"Reservations": [{"Instances": [
+            {"InstanceId": "i-1", "Tags": [{"Key": "Hostname", "Value": "host1"}]},
+            {"InstanceId": "i-3", "Tags": [{"Key": "Hostname", "Value": "host9"}]}]}]}]
+        ec2_client = EC2Client(mock_creds.return_value, "test_region")
+        confirmed = ec2_client.confirm_running_instances(
+            {"host1": {"InstanceId": "i-1"}, "host2": {"InstanceId": "i-2"},
+             "host3": {"InstanceId": "i-3"}})
+        self.assertEqual(list(confirmed), ["host1"])
+        filters = paginator.paginate.call_args.kwargs["Filters"]
+        self.assertEqual(filters[0], {"Name": "instance-id", "Values": ["i-1", "i-2", "i-3"]})
+        self.assertEqual(filters[1]["Name"], "instance-state-name")
+
+    @patch("sls.utils.aws_creds.AwsCreds")
+    @patch("sls.utils.aws_ec2.get_boto3_client")
+    def test_scan_live_instances(self, mock_boto3, mock_creds):
+        paginator = mock_boto3.return_value.get_paginator.return_value
+        paginator.paginate.return_value = [{"Reservations": [{"Instances": [
+            {"InstanceId": "i-1", "State": {"Name": "stopped"}, "ImageId": "ami-1"}]}]}]
+        ec2_client = EC2Client(mock_creds.return_value, "test_region")
+        instances = list(ec2_client.scan_live_instances())
+        self.assertEqual(instances, [{"InstanceId": "i-1", "State": {"Name": "stopped"}}])
+        paginator.paginate.assert_called_once_with(Filters=[LIVE_STATE_FILTER])
+        self.assertNotIn("terminated", LIVE_STATE_FILTER["Values"])
+
+
+def describe_instance_types(InstanceTypes):
+    if "bogus" in InstanceTypes:
+        raise ClientError({"Error": {"Code": "InvalidInstanceType", "Message": "bogus"}},
+                          "DescribeInstanceTypes")
+    return {"InstanceTypes": [{"InstanceType": name, "MemoryInfo": {"SizeInMiB": 1024}}
+                              for name in InstanceTypes]}
+
+
+class TestInstanceTypeCatalog(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.client = MagicMock()
+        self.client.describe_instance_types.side_effect = describe_instance_types
+        self.catalog = InstanceTypeCatalog(get_client=lambda: self.client, ttl=60,
+                                           clock=lambda: self.now)
+
+    def test_batches_of_100(self):
+        names = [f"type{number}" for number in range(250)]
+        self.assertEqual(len(self.catalog.get_many(names + names[:10])), 250)
+        self.assertEqual([len(call.kwargs["InstanceTypes"]) for call in
+                          self.client.describe_instance_types.call_args_list], [100, 100, 50])
+        self.catalog.get_many(names)
+        self.assertEqual(self.client.describe_instance_types.call_count, 3)
+
+    def test_ttl(self):
+        self.catalog.get("t3.micro")
+        self.now = 59
+        self.catalog.get("t3.micro")
+        self.assertEqual(self.client.describe_instance_types.call_count, 1)
+        self.now = 60
+        self.catalog.get("t3.micro")
+        self.assertEqual(self.client.describe_instance_types.call_count, 2)
+
+    def test_unknown_instance_type(self):
+        found = self.catalog.get_many(["t3.micro", "m5.large", "bogus", "c5.xlarge"])
+        self.assertEqual(sorted(found), ["c5.xlarge", "m5.large", "t3.micro"])
+        self.assertRaises(ResourceNotFound, self.catalog.get, "bogus")
+
+    def test_prefetch_all(self):
+        self.client.get_paginator.return_value.paginate.return_value = [
+            describe_instance_types(["t3.micro", "t3.small"]),
+            describe_instance_types(["m5.large"])
+        ]
+        self.assertEqual(self.catalog.prefetch_all(), 3)
+        self.assertEqual(self.catalog.get("m5.large")["MemoryInfo"]["SizeInMiB"], 1024)
+        self.client.describe_instance_types.assert_not_called()
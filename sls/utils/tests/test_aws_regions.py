@@ -0,0 +1,61 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import logging
+import unittest
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+from sls.utils.aws_regions import RegionCatalog, get_bundled_regions
+
+
+class TestRegionCatalog(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.loads = 0
+
+    def clock(self):
+        return self.now
+
+    def loader(self):
+        self.loads += 1
+        return {"us-east-1", "eu-west-1"}
+
+    def test_bundled_regions(self):
+        regions = get_bundled_regions()
+        self.assertIn("us-east-1", regions)
+        self.assertNotIn("us-gov-west-1", regions)
+        self.assertNotIn("cn-north-1", regions)
+        self.assertIn("cn-north-1", get_bundled_regions(partition_name="aws-cn"))
+
+    @patch("sls.utils.aws_regions.get_boto3_client")
+    def test_regions_loaded_once_without_refresh(self, mock_boto3):
+        catalog = RegionCatalog(refresh_seconds=0, loader=self.loader, clock=self.clock)
+        for _ in range(3):
+            self.assertTrue(catalog.is_valid("us-east-1", logging.getLogger()))
+        self.assertFalse(catalog.is_valid("xx-new-1", logging.getLogger()))
+        self.assertFalse(catalog.is_valid(None, logging.getLogger()))
+        self.assertEqual(self.loads, 1)
+        mock_boto3.assert_not_called()
+
+    @patch("sls.utils.aws_regions.get_boto3_client")
+    def test_refresh_on_miss(self, mock_boto3):
+        client = mock_boto3.return_value
+        client.describe_regions.return_value = {"Regions": [{"RegionName": "xx-new-1"}]}
+        catalog = RegionCatalog(refresh_seconds=60, loader=self.loader, clock=self.clock)
+
+        self.assertFalse(catalog.is_valid("test_region", logging.getLogger()))
+        self.assertTrue(catalog.is_valid("xx-new-1", logging.getLogger()))
+        self.assertFalse(catalog.is_valid("test_region", logging.getLogger()))
+        client.describe_regions.assert_called_once_with(AllRegions=True)
+
+        self.now = 60
+        self.assertFalse(catalog.is_valid("test_region", logging.getLogger()))
+        self.assertEqual(client.describe_regions.call_count, 2)
+
+    @patch("sls.utils.aws_regions.get_boto3_client")
+    def test_refresh_error(self, mock_boto3):
+        error = {"Error": {"Code": "UnauthorizedOperation", "Message": "denied"}}
+        mock_boto3.return_value.describe_regions.side_effect = ClientError(error, "DescribeRegions")
+        catalog = RegionCatalog(refresh_seconds=60, loader=self.loader, clock=self.clock)
+        self.assertFalse(catalog.is_valid("xx-new-1", logging.getLogger()))
+        self.assertTrue(catalog.is_valid("eu-west-1", logging.getLogger()))
@@ -7,8 +7,8 @@ import os, sys
 module_dir = os.path.dirname(os.path.abspath(__file__))
 module_par = os.path.normpath(os.path.join(module_dir, '../../../'))
 sys.path.append(module_par)
-from sls.utils.api_request import ApiRequests
-from sls.utils.aws_creds import AwsCreds
+from sls.utils.api_request import ApiRequests, get_http_session
+from sls.utils.aws_creds import AwsCreds, CredentialsCache, CREDENTIALS_CACHE, prefetch_creds
 from sls.utils.aws_sm import SmClient
 
 os.environ["token_url"] = "mock"
@@ -71,10 +71,79 @@ class TestUtilities(unittest.TestCase):
         instance.request.return_value = type(
             "Response1s", (object,), dict(text='{"credentials":{"AccessKeyId":"mock"}}')
         )
+        CREDENTIALS_CACHE.invalidate()
         aws_credentials = AwsCreds("test-account")
         value = aws_credentials.get_creds("test-account")
         self.assertEqual(value.get("AccessKeyId"), "mock")
 
+    @patch("sls.utils.aws_creds.ApiRequests")
+    def test_get_credentials_cached(self, mock_req):
+        """
+        test_get_credentials_cached: credentials are fetched once per account
+        """
+        instance = mock_req.return_value
+        instance.request.return_value = type(
+            "Response1s", (object,), dict(text='{"credentials":{"AccessKeyId":"mock"}}')
+        )
+        CREDENTIALS_CACHE.invalidate()
+        AwsCreds("cached-account").get_creds()
+        AwsCreds("cached-account").get_creds()
+        value = AwsCreds("cached-account").get_creds()
+        self.assertEqual(value.get("AccessKeyId"), "mock")
+        self.assertEqual(instance.request.call_count, 1)
+        mock_req.assert_called_once()
+
+    def test_credentials_cache_refresh_before_expiry(self):
+        """
+        test_credentials_cache_refresh_before_expiry: credentials refetched within the margin
+        """
+        now = [1000.0]
+        cache = CredentialsCache(refresh_margin=300, clock=lambda: now[0])
+        fetched = []
+
+        def fetch():
+            fetched.append(now[0])
+            return {"AccessKeyId": f"key-{len(fetched)}", "Expiration": now[0] + 3600}
+
+        self.assertEqual(cache.get("account", fetch)["AccessKeyId"], "key-1")
+        now[0] += 3000
+        self.assertEqual(cache.get("account", fetch)["AccessKeyId"], "key-1")
+        now[0] += 400
+        self.assertEqual(cache.get("account", fetch)["AccessKeyId"], "key-2")
+        self.assertEqual(len(fetched), 2)
+
+    @patch("sls.utils.aws_creds.ApiRequests")
+    def test_prefetch_creds(self, mock_req):
+        """
+        test_prefetch_creds: every account fetched once, failures returned by account
+        """
+        def request(url, **kwargs):
+            if "/accounts/bad-account/" in url:
+                raise Exception("Invalid account")
+            return type("Response1s", (object,), dict(text='{"credentials":{"AccessKeyId":"mock"}}'))
+        mock_req.return_value.request.side_effect = request
+        CREDENTIALS_CACHE.invalidate()
+        accounts = [f"account-{number}" for number in range(5)] + ["bad-account", "account-0"]
+        errors = prefetch_creds(accounts, max_workers=3)
+        self.assertEqual(list(errors), ["bad-account"])
+        self.assertEqual(mock_req.return_value.request.call_count, 6)
+        self.assertIsNotNone(CREDENTIALS_CACHE.get_expiry("account-4"))
+        CREDENTIALS_CACHE.invalidate()
+
+    def test_http_session_shared(self):
+        """
+        test_http_session_shared: the vpcxiam calls reuse one pooled session
+        """
+        self.assertIs(get_http_session(), get_http_session())
+
+    def test_credentials_cache_iso_expiration(self):
+        """
+        test_credentials_cache_iso_expiration: string Expiration is honoured
+        """
+        cache = CredentialsCache(clock=lambda: 0)
+        cache.get("account", lambda: {"Expiration": "1970-01-01T01:00:00Z"})
+        self.assertEqual(cache.get_expiry("account"), 3600)
+
     # Tests for aws_sm.py
     @patch("sls.utils.aws_sm.get_boto3_client")
     @patch("sls.utils.aws_creds.AwsCreds")
@@ -92,3 +161,5 @@ class TestUtilities(unittest.TestCase):
         sm_client = SmClient(aws_creds)
         return_secret = sm_client.retrieve_secret("Test")
         self.assertEqual(return_secret, "mockPwd")
+        self.assertEqual(sm_client.retrieve_secret("Test"), "mockPwd")
+        client.get_secret_value.assert_called_once_with(SecretId="Test")
@@ -0,0 +1,41 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+
+from sls.utils.backoff import chunks, poll_with_backoff
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestBackoff(unittest.TestCase):
+    def test_chunks(self):
+        self.assertEqual(list(chunks(list(range(5)), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_poll_confirmed_immediately(self):
+        fake = FakeClock()
+        pending = poll_with_backoff(["a"], lambda items: [], 10,
+                                    clock=fake.clock, sleep=fake.sleep)
+        self.assertEqual(pending, [])
+        self.assertEqual(fake.sleeps, [])
+
+    def test_poll_empty(self):
+        checked = []
+        self.assertEqual(poll_with_backoff([], checked.append, 10), [])
+        self.assertEqual(checked, [])
+
+    def test_poll_deadline(self):
+        fake = FakeClock()
+        pending = poll_with_backoff(["a", "b"], lambda items: ["b"], 10, initial_delay=1,
+                                    max_delay=4, clock=fake.clock, sleep=fake.sleep)
+        self.assertEqual(pending, ["b"])
+        self.assertEqual(fake.sleeps, [1, 2, 4, 3])
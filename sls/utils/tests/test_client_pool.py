@@ -0,0 +1,48 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+
+from sls.utils.client_pool import Boto3ClientPool
+
+
+def get_credentials(key="mock", expiration="2030-01-01T00:00:00Z"):
+    return {
+        "AccessKeyId": key,
+        "SecretAccessKey": "mock",
+        "SessionToken": "mock",
+        "Expiration": expiration
+    }
+
+
+class TestBoto3ClientPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = Boto3ClientPool(max_size=3)
+
+    def test_client_reused(self):
+        client = self.pool.get_client("cloudwatch", "us-east-1", get_credentials(), "account")
+        same_client = self.pool.get_client("cloudwatch", "us-east-1", get_credentials(), "account")
+        self.assertIs(client, same_client)
+        self.assertEqual(self.pool.stats()["hits"], 1)
+        self.assertEqual(self.pool.stats()["misses"], 1)
+
+    def test_client_per_service_and_region(self):
+        cloudwatch = self.pool.get_client("cloudwatch", "us-east-1", get_credentials(), "account")
+        ec2 = self.pool.get_client("ec2", "us-east-1", get_credentials(), "account")
+        other_region = self.pool.get_client("cloudwatch", "us-west-2", get_credentials(), "account")
+        self.assertIsNot(cloudwatch, ec2)
+        self.assertIsNot(cloudwatch, other_region)
+        self.assertEqual(self.pool.stats()["misses"], 3)
+
+    def test_rotated_credentials_evicted(self):
+        old_client = self.pool.get_client("cloudwatch", "us-east-1", get_credentials(), "account")
+        new_client = self.pool.get_client("cloudwatch", "us-east-1",
+                                          get_credentials("rotated", "2030-01-01T01:00:00Z"),
+                                          "account")
+        self.assertIsNot(old_client, new_client)
+        self.assertEqual(self.pool.stats()["evictions"], 1)
+        self.assertEqual(self.pool.stats()["size"], 1)
+
+    def test_max_size(self):
+        for region in ["us-east-1", "us-east-2", "us-west-1", "us-west-2"]:
+            self.pool.get_client("cloudwatch", region, get_credentials(), "account")
+        self.assertEqual(self.pool.stats()["size"], 3)
+        self.assertEqual(self.pool.stats()["evictions"], 1)
@@ -0,0 +1,52 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import collections
+import threading
+import time
+import unittest
+
+from sls.utils.fanout import run_bounded
+
+
+class TestRunBounded(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.in_flight = collections.Counter()
+        self.peaks = collections.Counter()
+
+    def task(self, key, value):
+        def run():
+            with self.lock:
+                self.in_flight[key] += 1
+                self.in_flight["total"] += 1
+                self.peaks[key] = max(self.peaks[key], self.in_flight[key])
+                self.peaks["total"] = max(self.peaks["total"], self.in_flight["total"])
+            time.sleep(0.01)
+            with self.lock:
+                self.in_flight[key] -= 1
+                self.in_flight["total"] -= 1
+            if value is None:
+                raise ValueError(f"{key} failed")
+            return value
+        return run
+
+    def test_limits_per_key_and_total(self):
+        tasks = {key: [self.task(key, number) for number in range(6)]
+                 for key in ("account-1", "account-2", "account-3")}
+        outcomes = run_bounded(tasks, max_per_key=2, max_total=4)
+        for key in tasks:
+            self.assertEqual(outcomes[key]["results"], list(range(6)))
+            self.assertLessEqual(self.peaks[key], 2)
+            self.assertLessEqual(outcomes[key]["started"], outcomes[key]["finished"])
+        self.assertLessEqual(self.peaks["total"], 4)
+        self.assertGreater(self.peaks["total"], 2)
+
+    def test_exceptions_returned_in_task_order(self):
+        outcomes = run_bounded({"account": [self.task("account", 1), self.task("account", None)],
+                                "empty": []}, max_per_key=1, max_total=2)
+        self.assertEqual(outcomes["account"]["results"][0], 1)
+        self.assertIsInstance(outcomes["account"]["results"][1], ValueError)
+        self.assertEqual(outcomes["empty"], {"results": [], "started": None, "finished": None})
+
+
+if __name__ == "__main__":
+    unittest.main()
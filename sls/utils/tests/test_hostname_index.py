@@ -0,0 +1,107 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+from unittest.mock import MagicMock
+
+from sls.utils.hostname_index import HostnameIndex
+
+
+def get_instance(hostname, instance_id):
+    return {"InstanceId": instance_id, "Platform": "Windows", "ImageId": "ami-1",
+            "Tags": [{"Key": "Hostname", "Value": hostname}]}
+
+
+class TestHostnameIndex(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.index = HostnameIndex(ttl=60, scan_min_hostnames=1, clock=lambda: self.now)
+        self.ec2_client = MagicMock(region="us-east-1")
+        self.ec2_client.aws_creds.account = "itx-001"
+        self.ec2_client.scan_running_instances.side_effect = lambda: iter([
+            ("host1", {"InstanceId": "i-1"}), ("host2", {"InstanceId": "i-2"})])
+        self.ec2_client.confirm_running_instances.side_effect = dict
+        self.ec2_client.lookup_running_instances_by_hostnames.return_value = {}
+
+    def test_get_without_index_looked_up(self):
+        self.ec2_client.lookup_running_instance_by_hostname.return_value = {"InstanceId": "i-1"}
+        self.assertEqual(self.index.get(self.ec2_client, "host1"), {"InstanceId": "i-1"})
+        self.ec2_client.scan_running_instances.assert_not_called()
+        self.ec2_client.lookup_running_instance_by_hostname.assert_called_once_with("host1")
+
+    def test_get_from_one_scan_confirmed(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.assertEqual(self.index.get(self.ec2_client, "host1"), {"InstanceId": "i-1"})
+        self.assertEqual(self.index.get(self.ec2_client, "host2"), {"InstanceId": "i-2"})
+        self.ec2_client.scan_running_instances.assert_called_once()
+        self.ec2_client.confirm_running_instances.assert_called_with(
+            {"host2": {"InstanceId": "i-2"}})
+        self.ec2_client.lookup_running_instance_by_hostname.assert_not_called()
+
+    def test_replaced_instance_looked_up_again(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        # host1 was replaced by i-9 since the scan
+        self.ec2_client.confirm_running_instances.side_effect = lambda instances: {}
+        self.ec2_client.lookup_running_instance_by_hostname.return_value = get_instance("host1",
+                                                                                        "i-9")
+        self.assertEqual(self.index.get(self.ec2_client, "host1")["InstanceId"], "i-9")
+        self.ec2_client.confirm_running_instances.side_effect = dict
+        self.assertEqual(self.index.get(self.ec2_client, "host1")["InstanceId"], "i-9")
+        self.ec2_client.lookup_running_instance_by_hostname.assert_called_once_with("host1")
+
+    def test_miss_looked_up_and_added(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.ec2_client.lookup_running_instance_by_hostname.return_value = get_instance("host3", "i-3")
+        self.assertEqual(self.index.get(self.ec2_client, "host3")["ImageId"], "ami-1")
+        self.assertNotIn("ImageId", self.index.get(self.ec2_client, "host3"))
+        self.ec2_client.lookup_running_instance_by_hostname.assert_called_once_with("host3")
+
+    def test_get_many(self):
+        self.ec2_client.lookup_running_instances_by_hostnames.return_value = {
+            "host3": get_instance("host3", "i-3")}
+        instances = self.index.get_many(self.ec2_client, ["host1", "host3", "host4"])
+        self.assertEqual(sorted(instances), ["host1", "host3"])
+        self.ec2_client.lookup_running_instances_by_hostnames.assert_called_once_with(
+            ["host3", "host4"])
+
+    def test_get_many_small_batch_not_scanned(self):
+        index = HostnameIndex(ttl=60, scan_min_hostnames=3, clock=lambda: self.now)
+        self.ec2_client.lookup_running_instances_by_hostnames.return_value = {
+            "host1": get_instance("host1", "i-1")}
+        instances = index.get_many(self.ec2_client, ["host1", "host2"])
+        self.assertEqual(sorted(instances), ["host1"])
+        self.ec2_client.scan_running_instances.assert_not_called()
+        self.ec2_client.lookup_running_instances_by_hostnames.assert_called_once_with(
+            ["host1", "host2"])
+
+        index.get_many(self.ec2_client, ["host1", "host2", "host3"])
+        self.ec2_client.scan_running_instances.assert_called_once()
+
+    def test_get_many_terminated_instance_looked_up_again(self):
+        self.ec2_client.confirm_running_instances.side_effect = lambda instances: {
+            hostname: instance for hostname, instance in instances.items()
+            if hostname != "host2"}
+        self.index.get_many(self.ec2_client, ["host1", "host2"])
+        self.ec2_client.lookup_running_instances_by_hostnames.assert_called_once_with(["host2"])
+
+    def test_ttl_and_remove(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.index.remove(("itx-001", "us-east-1"), "host2")
+        self.index.get(self.ec2_client, "host2")
+        self.ec2_client.lookup_running_instance_by_hostname.assert_called_once_with("host2")
+        self.now = 60
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.assertEqual(self.ec2_client.scan_running_instances.call_count, 2)
+
+    def test_remove_only_matching_instance(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.index.remove(("itx-001", "us-east-1"), "host1", instance_id="i-old")
+        self.index.get(self.ec2_client, "host1")
+        self.ec2_client.lookup_running_instance_by_hostname.assert_not_called()
+        self.index.remove(("itx-001", "us-east-1"), "host1", instance_id="i-1")
+        self.ec2_client.lookup_running_instance_by_hostname.return_value = {"InstanceId": "i-9"}
+        self.assertEqual(self.index.get(self.ec2_client, "host1"), {"InstanceId": "i-9"})
+
+    def test_index_per_account_and_region(self):
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.ec2_client.region = "us-west-2"
+        self.index.get_many(self.ec2_client, ["host1"])
+        self.assertEqual(self.ec2_client.scan_running_instances.call_count, 2)
@@ -0,0 +1,196 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from sls.utils.jobs import (InMemoryJobQueue, SqsJobQueue, InMemoryJobStore, SqliteJobStore,
+                            DynamoDBJobStore, JobProgress, is_async_request, new_job, submit_job,
+                            JOB_QUEUED, JOB_RUNNING)
+
+EVENT = {
+    "resource": "/v1/accounts/{account_id}/regions/{region_name}/instances/{ec2_hostname}/EC2Alarms",
+    "headers": {"authorization": "Bearer token"},
+    "pathParameters": {"account_id": "itx-000", "region_name": "us-east-1",
+                       "ec2_hostname": "AWS000testing"},
+    "queryStringParameters": {"async": "true", "mode": "reconcile"}
+}
+
+
+class JobStoreTests:
+    """Behaviour shared by the job store backends"""
+
+    def get_store(self):
+        raise NotImplementedError
+
+    def test_job_lifecycle(self):
+        store = self.get_store()
+        job = new_job("create_ec2_alarms", EVENT, "request-id")
+        store.create(job)
+        self.assertEqual(store.get(job["job_id"])["status"], JOB_QUEUED)
+
+        progress = JobProgress(store, job["job_id"], interval=0)
+        progress("host1", "alarm1", "submitted")
+        progress("host1", "alarm1", "created")
+        progress("host1", "alarm2", "failed: throttled")
+        self.assertEqual(store.get(job["job_id"])["progress"],
+                         {"host1": {"created": 1, "failed": 1}})
+        store.update(job["job_id"], status="succeeded", result={"created": 1})
+
+        stored = store.get(job["job_id"])
+        self.assertEqual(stored["status"], "succeeded")
+        self.assertEqual(stored["result"], {"created": 1})
+        self.assertEqual(stored["expires_at"], job["expires_at"])
+        self.assertEqual(stored["event"]["pathParameters"], EVENT["pathParameters"])
+        self.assertIsNone(store.get("unknown"))
+
+
+class JobClaimTests:
+    """Claims of the job store backends checked in process"""
+
+    def get_store(self):
+        raise NotImplementedError
+
+    def test_claimed_once(self):
+        store = self.get_store()
+        job = new_job("create_ec2_alarms", EVENT, "request-id")
+        store.create(job)
+        claimed = store.claim(job["job_id"])
+        self.assertEqual(claimed["status"], JOB_RUNNING)
+        self.assertEqual(claimed["attempts"], 1)
+        self.assertGreater(claimed["deadline"], claimed["started_at"])
+        self.assertIsNone(store.claim(job["job_id"]))
+        self.assertIsNone(store.claim("unknown"))
+
+    def test_claimed_again_past_deadline(self):
+        store = self.get_store()
+        job = new_job("create_ec2_alarms", EVENT, "request-id")
+        store.create(job)
+        store.claim(job["job_id"], lease_seconds=0)
+        self.assertEqual(store.claim(job["job_id"])["attempts"], 2)
+        store.update(job["job_id"], status="succeeded")
+        self.assertIsNone(store.claim(job["job_id"], lease_seconds=0))
+
+
+class TestInMemoryJobStore(JobStoreTests, JobClaimTests, unittest.TestCase):
+    def get_store(self):
+        return InMemoryJobStore()
+
+
+class TestSqliteJobStore(JobStoreTests, JobClaimTests, unittest.TestCase):
+    def get_store(self):
+        return SqliteJobStore()
+
+
+class FakeDynamoDB:
+    """Enough of GetItem, PutItem and UpdateItem for DynamoDBJobStore"""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, TableName, Item):
+        self.items[Item["job_id"]["S"]] = Item
+
+    def get_item(self, TableName, Key, ConsistentRead):
+        item = self.items.get(Key["job_id"]["S"])
+        return {"Item": item} if item else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ExpressionAttributeNames,
+                    ExpressionAttributeValues):
+        item = self.items[Key["job_id"]["S"]]
+        for assignment in UpdateExpression[len("SET "):].split(", "):
+            name, value = assignment.split(" = ")
+            item[ExpressionAttributeNames[name]] = ExpressionAttributeValues[value]
+
+
+class TestDynamoDBJobStore(JobStoreTests, unittest.TestCase):
+    def get_store(self):
+        return DynamoDBJobStore("jobs", FakeDynamoDB())
+
+    def test_claim_is_conditional(self):
+        client = MagicMock()
+        store = DynamoDBJobStore("jobs", FakeDynamoDB())
+        job = new_job("create_ec2_alarms", EVENT, "request-id")
+        store.create(job)
+        attributes = dict(store.client.items[job["job_id"]], status={"S": JOB_RUNNING},
+                          deadline={"N": "960.5"}, attempts={"N": "1"})
+        client.update_item.return_value = {"Attributes": attributes}
+        claimed = DynamoDBJobStore("jobs", client).claim(job["job_id"])
+
+        self.assertEqual(claimed["status"], JOB_RUNNING)
+        self.assertEqual(claimed["deadline"], 960.5)
+        self.assertEqual(claimed["attempts"], 1)
+        kwargs = client.update_item.call_args.kwargs
+        self.assertEqual(kwargs["ConditionExpression"],
+                         "#s = :queued OR (#s = :running AND deadline <= :now)")
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":queued"], {"S": JOB_QUEUED})
+
+    def test_claim_condition_failed(self):
+        client = MagicMock()
+        client.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException", "Message": "failed"}},
+            "UpdateItem")
+        self.assertIsNone(DynamoDBJobStore("jobs", client).claim("job"))
+        client.update_item.side_effect = ClientError(
+            {"Error": {"Code": "ProvisionedThroughputExceededException", "Message": "slow"}},
+            "UpdateItem")
+        with self.assertRaises(ClientError):
+            DynamoDBJobStore("jobs", client).claim("job")
+
+
+class TestJobProgress(unittest.TestCase):
+    def test_counts_written_once_per_interval(self):
+        store, now = MagicMock(), [0]
+        progress = JobProgress(store, "job", interval=5, clock=lambda: now[0])
+        for number in range(100):
+            progress("host1", f"alarm{number}", "created")
+        progress("host2", "alarm1", "failed: throttled")
+        store.update.assert_not_called()
+
+        now[0] = 5
+        progress("host2", "alarm2", "unconfirmed")
+        store.update.assert_called_once_with("job", progress={
+            "host1": {"created": 100}, "host2": {"failed": 1, "unconfirmed": 1}})
+        progress.flush()
+        self.assertEqual(store.update.call_count, 1)
+
+    def test_counts_written_again_after_failed_write(self):
+        store = MagicMock()
+        store.update.side_effect = [Exception("throttled"), None]
+        progress = JobProgress(store, "job", interval=0)
+        with self.assertRaises(Exception):
+            progress("host1", "alarm1", "created")
+        progress.flush()
+        store.update.assert_called_with("job", progress={"host1": {"created": 1}})
+        self.assertEqual(store.update.call_count, 2)
+
+
+class TestJobs(unittest.TestCase):
+    def test_is_async_request(self):
+        self.assertTrue(is_async_request(EVENT))
+        self.assertFalse(is_async_request({"queryStringParameters": None}))
+
+    def test_submit_job(self):
+        queue, store = InMemoryJobQueue(), InMemoryJobStore()
+        job = submit_job("create_ec2_alarms", EVENT, "request-id", queue, store)
+        self.assertNotIn("event", job)
+        self.assertEqual(job["account_id"], "itx-000")
+        self.assertEqual(queue.receive(), [{"job_id": job["job_id"],
+                                            "operation": "create_ec2_alarms"}])
+        self.assertEqual(queue.receive(), [])
+
+        event = store.get(job["job_id"])["event"]
+        self.assertEqual(event["queryStringParameters"], {"mode": "reconcile"})
+        self.assertEqual(event["headers"], {"request-context-id": "request-id"})
+
+    def test_sqs_queue(self):
+        client = MagicMock()
+        queue = SqsJobQueue("https://sqs.us-east-1.amazonaws.com/123456789012/jobs", client)
+        queue.send({"job_id": "1"})
+        client.send_message.assert_called_once_with(
+            QueueUrl="https://sqs.us-east-1.amazonaws.com/123456789012/jobs",
+            MessageBody='{"job_id": "1"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
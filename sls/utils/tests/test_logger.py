@@ -0,0 +1,66 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import json
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+
+from sls.utils.logger import Logger, JsonFormatter, get_log_level, is_sampled
+
+
+class TestLogger(unittest.TestCase):
+    def setUp(self):
+        self.logger = Logger()
+        self.logger.set_uuid("request-context-id")
+        self.records = []
+        self.handler = logging.Handler()
+        self.handler.emit = self.records.append
+        self.logger.logger.addHandler(self.handler)
+        self.formatter = JsonFormatter(max_chars=20)
+
+    def tearDown(self):
+        self.logger.logger.removeHandler(self.handler)
+        self.logger.logger.setLevel(logging.INFO)
+
+    def test_json_line_with_request_id_and_fields(self):
+        self.logger.info("Created %d alarms", 3, hostname="host")
+        entry = json.loads(self.formatter.format(self.records[0]))
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["request_id"], "request-context-id")
+        self.assertEqual(entry["message"], "Created 3 alarms")
+        self.assertEqual(entry["hostname"], "host")
+
+    def test_disabled_level_not_formatted(self):
+        payload = MagicMock()
+        self.logger.debug("Alarms configuration: %s", payload)
+        self.assertEqual(self.records, [])
+        payload.__str__.assert_not_called()
+
+    def test_long_message_truncated_unless_sampled(self):
+        self.logger.info("x" * 30)
+        entry = json.loads(self.formatter.format(self.records[0]))
+        self.assertEqual(entry["message"], "x" * 20 + "...[10 chars truncated]")
+
+        with patch("sls.utils.logger.is_sampled", return_value=True):
+            self.logger.set_uuid("sampled-request")
+        self.logger.info("x" * 30)
+        entry = json.loads(self.formatter.format(self.records[1]))
+        self.assertEqual(entry["message"], "x" * 30)
+
+    def test_warning_alias(self):
+        self.logger.warning("careful")
+        self.assertEqual(self.records[0].levelname, "WARNING")
+
+
+class TestLogSettings(unittest.TestCase):
+    def test_get_log_level(self):
+        self.assertEqual(get_log_level("DEBUG"), logging.DEBUG)
+        self.assertEqual(get_log_level("NOTALEVEL"), logging.INFO)
+
+    def test_is_sampled(self):
+        self.assertFalse(is_sampled("request", rate=0))
+        self.assertTrue(is_sampled("request", rate=1))
+        self.assertEqual(is_sampled("request", 0.5), is_sampled("request", 0.5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring, protected-access
+import unittest
+
+from sls.utils.aio import run_coroutine
+from sls.utils.metric_discovery_cache import MetricDiscoveryCache
+
+KEY = ("itx-000", "us-east-1", "i-1", "filesystems")
+
+
+def get_metric(filesystem):
+    return {"Namespace": "System/Linux", "MetricName": "DiskSpaceUtilization",
+            "Dimensions": [{"Name": "InstanceId", "Value": "i-1"},
+                           {"Name": "Filesystem", "Value": filesystem}]}
+
+
+class TestMetricDiscoveryCache(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.cache = MetricDiscoveryCache(ttl=60, full_refresh=600, clock=lambda: self.now[0])
+        self.calls = []
+        self.listed = {False: [get_metric("/"), get_metric("/data")],
+                       True: [get_metric("/data"), get_metric("/logs")]}
+
+    def list_metrics(self, recently_active):
+        self.calls.append(recently_active)
+        return self.listed[recently_active]
+
+    def get_filesystems(self):
+        return [metric["Dimensions"][1]["Value"]
+                for metric in self.cache.get(KEY, self.list_metrics)]
+
+    def test_fresh_entry_skips_list_metrics(self):
+        self.assertEqual(self.get_filesystems(), ["/", "/data"])
+        self.now[0] = 59
+        self.assertEqual(self.get_filesystems(), ["/", "/data"])
+        self.assertEqual(self.calls, [False])
+
+    def test_incremental_then_full_refresh(self):
+        self.get_filesystems()
+        self.now[0] = 60
+        # Recently active metrics are added, the others are kept
+        self.assertEqual(self.get_filesystems(), ["/", "/data", "/logs"])
+        self.now[0] = 100
+        self.get_filesystems()
+        self.now[0] = 600
+        self.listed[False] = [get_metric("/data")]
+        self.assertEqual(self.get_filesystems(), ["/data"])
+        self.assertEqual(self.calls, [False, True, False])
+
+    def test_full_listing_drops_inactive_metrics(self):
+        self.get_filesystems()
+        self.now[0] = 60
+        self.get_filesystems()
+        # /logs was unmounted: a full listing replaces the entry before the full refresh
+        self.listed[False] = [get_metric("/"), get_metric("/data")]
+        metrics = self.cache.get(KEY, self.list_metrics, full=True)
+        self.assertEqual([metric["Dimensions"][1]["Value"] for metric in metrics],
+                         ["/", "/data"])
+        self.assertEqual(self.get_filesystems(), ["/", "/data"])
+        self.assertEqual(self.calls, [False, True, False])
+
+    def test_invalidate_and_disabled(self):
+        self.get_filesystems()
+        self.cache.invalidate(KEY)
+        self.get_filesystems()
+        self.assertEqual(self.calls, [False, False])
+        self.cache.ttl = 0
+        self.cache.invalidate()
+        self.get_filesystems()
+        self.get_filesystems()
+        self.assertEqual(self.calls, [False, False, False, False])
+
+    def test_empty_discovery_not_cached(self):
+        self.listed[False] = []
+        self.assertEqual(self.get_filesystems(), [])
+        self.listed[False] = [get_metric("/")]
+        self.assertEqual(self.get_filesystems(), ["/"])
+        self.assertEqual(self.get_filesystems(), ["/"])
+        self.assertEqual(self.calls, [False, False])
+
+    def test_key_locks_dropped_with_entries(self):
+        self.cache.max_entries = 1
+        self.get_filesystems()
+        self.cache.get(("itx-000", "us-east-1", "i-2", "filesystems"), self.list_metrics)
+        self.assertEqual(list(self.cache._key_locks),
+                         [("itx-000", "us-east-1", "i-2", "filesystems")])
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache._key_locks), 0)
+
+    def test_get_async(self):
+        async def list_metrics(recently_active):
+            return self.list_metrics(recently_active)
+
+        async def get_twice():
+            await self.cache.get_async(KEY, list_metrics)
+            return await self.cache.get_async(KEY, list_metrics)
+
+        self.assertEqual(len(run_coroutine(get_twice())), 2)
+        self.assertEqual(self.calls, [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.hooks import HierarchicalEmitter
+
+from sls.utils.client_pool import Boto3ClientPool
+from sls.utils.rate_limiter import TokenBucket, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=4, min_rate=1, max_rate=6, clock=self.clock,
+                                  sleep=self.clock.sleep)
+
+    def test_acquire_waits_once_burst_is_used(self):
+        waits = [self.bucket.acquire() for _ in range(6)]
+        self.assertEqual(waits[:4], [0, 0, 0, 0])
+        self.assertAlmostEqual(waits[4], 0.25)
+        self.assertAlmostEqual(waits[5], 0.25)
+        self.assertAlmostEqual(self.clock.now, 0.5)
+
+    def test_throttle_shrinks_rate_once_per_cooldown(self):
+        self.bucket.on_throttle()
+        self.bucket.on_throttle()
+        self.assertEqual(self.bucket.rate, 2)
+        self.clock.now += 1
+        self.bucket.on_throttle()
+        self.bucket.on_throttle()
+        self.assertEqual(self.bucket.rate, 1)
+        self.assertEqual(self.bucket.throttles, 4)
+
+    def test_success_regrows_rate(self):
+        self.bucket.on_throttle()
+        self.bucket.on_success()
+        self.assertEqual(self.bucket.rate, 2)
+        self.clock.now += 3
+        self.bucket.on_success()
+        self.assertEqual(self.bucket.rate, 5)
+        self.clock.now += 5
+        self.bucket.on_success()
+        self.assertEqual(self.bucket.rate, 6)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.bucket = MagicMock()
+        self.limiter = RateLimiter(bucket_factory=lambda rate: self.bucket)
+
+    def test_bucket_per_operation_account_and_region(self):
+        limiter = RateLimiter()
+        bucket = limiter.get_bucket("cloudwatch", "PutMetricAlarm", "itx-001", "us-east-1")
+        self.assertIs(bucket, limiter.get_bucket("cloudwatch", "PutMetricAlarm", "itx-001",
+                                                 "us-east-1"))
+        self.assertIsNot(bucket, limiter.get_bucket("cloudwatch", "PutMetricAlarm", "itx-002",
+                                                    "us-east-1"))
+        self.assertIsNot(bucket, limiter.get_bucket("cloudwatch", "DescribeAlarms", "itx-001",
+                                                    "us-east-1"))
+        self.assertIsNot(bucket, limiter.get_bucket("ec2", "PutMetricAlarm", "itx-001",
+                                                    "us-east-1"))
+
+    def test_operation_rates(self):
+        limiter = RateLimiter(rate=20, operation_rates={"cloudwatch.PutMetricAlarm": 3})
+        self.assertEqual(limiter.get_bucket("cloudwatch", "PutMetricAlarm", "itx-001",
+                                            "us-east-1").rate, 3)
+        self.assertEqual(limiter.get_bucket("ec2", "DescribeInstances", "itx-001",
+                                            "us-east-1").rate, 20)
+
+    def test_throttled_operation_slows_only_itself(self):
+        limiter = RateLimiter(rate=20, operation_rates={})
+        events = HierarchicalEmitter()
+        limiter.register(events, "cloudwatch", "itx-001", "us-east-1")
+        events.emit("needs-retry.cloudwatch.DescribeAlarms",
+                    response=(None, {"Error": {"Code": "Throttling"}}))
+        self.assertEqual(limiter.stats(), {
+            "cloudwatch/DescribeAlarms/itx-001/us-east-1": {"rate": 10, "throttles": 1}})
+        self.assertEqual(limiter.get_bucket("cloudwatch", "PutMetricAlarm", "itx-001",
+                                            "us-east-1").rate, 20)
+
+    def test_register(self):
+        events = HierarchicalEmitter()
+        self.limiter.register(events, "cloudwatch", "itx-001", "us-east-1")
+        events.emit("before-send.cloudwatch.PutMetricAlarm", request=None)
+        self.bucket.acquire.assert_called_once()
+
+        responses = events.emit("needs-retry.cloudwatch.PutMetricAlarm",
+                                response=(None, {"Error": {"Code": "Throttling"}}))
+        self.bucket.on_throttle.assert_called_once()
+        self.assertEqual([response for _, response in responses], [None])
+        events.emit("needs-retry.cloudwatch.PutMetricAlarm", response=(None, {}))
+        self.bucket.on_success.assert_called_once()
+        events.emit("needs-retry.cloudwatch.PutMetricAlarm", response=None,
+                    caught_exception=ConnectionError())
+        self.assertEqual(self.bucket.on_throttle.call_count, 1)
+
+    def test_pooled_clients_rate_limited(self):
+        pool = Boto3ClientPool(rate_limiter=self.limiter)
+        credentials = {"AccessKeyId": "mock", "SecretAccessKey": "mock", "SessionToken": "mock"}
+        client = pool.get_client("cloudwatch", "us-east-1", credentials, "itx-001")
+        client.meta.events.emit("before-send.cloudwatch.DescribeAlarms", request=None)
+        self.bucket.acquire.assert_called_once()
+
+        other = pool.get_client("sts", "us-east-1", credentials, "itx-001")
+        other.meta.events.emit("before-send.sts.GetCallerIdentity", request=None)
+        self.bucket.acquire.assert_called_once()
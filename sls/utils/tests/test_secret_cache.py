@@ -0,0 +1,69 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import unittest
+import threading
+from unittest.mock import MagicMock
+
+from sls.utils.secret_cache import SecretCache
+
+KEY = ("account", "us-east-1", "secret")
+
+
+class TestSecretCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.fetch = MagicMock(side_effect=[{"SecretString": "v1", "VersionId": "1"},
+                                            {"SecretString": "v2", "VersionId": "2"}])
+        self.cache = SecretCache(ttl=100, refresh_margin=10, clock=lambda: self.now)
+
+    def test_warm_reads_do_not_fetch(self):
+        for _ in range(3):
+            self.assertEqual(self.cache.get(KEY, self.fetch), "v1")
+        self.fetch.assert_called_once()
+        self.assertEqual(self.cache.get_version(KEY), "1")
+
+    def test_refresh_before_expiry(self):
+        self.cache.get(KEY, self.fetch)
+        self.now = 95
+        self.assertEqual(self.cache.get(KEY, self.fetch), "v2")
+        self.assertEqual(self.cache.get(KEY, self.fetch), "v2")
+        self.assertEqual(self.cache.get_version(KEY), "2")
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_expired_value_served_when_fetch_fails(self):
+        self.fetch.side_effect = [{"SecretString": "v1", "VersionId": "1"}, Exception("down")]
+        self.cache.get(KEY, self.fetch)
+        self.now = 100
+        self.assertEqual(self.cache.get(KEY, self.fetch), "v1")
+        self.fetch.side_effect = Exception("down")
+        self.cache.invalidate(KEY)
+        self.assertRaises(Exception, self.cache.get, KEY, self.fetch)
+
+    def test_refresh_failure_serves_cached_value(self):
+        self.fetch.side_effect = [{"SecretString": "v1", "VersionId": "1"}, Exception("down")]
+        self.cache.get(KEY, self.fetch)
+        self.now = 95
+        self.assertEqual(self.cache.get(KEY, self.fetch), "v1")
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_refresh_in_calling_thread_only_once(self):
+        self.cache.get(KEY, self.fetch)
+        self.now = 95
+        started, release = threading.Event(), threading.Event()
+        fetched = []
+
+        def slow_fetch():
+            fetched.append(threading.current_thread().name)
+            started.set()
+            release.wait(5)
+            return {"SecretString": "v2", "VersionId": "2"}
+
+        refresher = threading.Thread(target=self.cache.get, args=(KEY, slow_fetch),
+                                     name="refresher")
+        refresher.start()
+        started.wait(5)
+        # Served from the cache while the first request fetches
+        self.assertEqual(self.cache.get(KEY, slow_fetch), "v1")
+        release.set()
+        refresher.join(5)
+        self.assertEqual(fetched, ["refresher"])
+        self.assertEqual(self.cache.get(KEY, slow_fetch), "v2")
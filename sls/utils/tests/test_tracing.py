@@ -0,0 +1,154 @@
+# pylint: disable=missing-module-docstring, missing-function-docstring, missing-class-docstring
+import asyncio
+import concurrent.futures
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from botocore.stub import Stubber
+
+from sls.utils.aio import run_coroutine
+from sls.utils.client_pool import Boto3ClientPool
+from sls.utils.tracing import Tracer, JsonFileExporter, XRayExporter, get_default_exporter
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.exporter = MagicMock()
+        self.tracer = Tracer(self.exporter)
+
+    def test_spans_nested_and_exported(self):
+        self.tracer.start_trace("request-id")
+        with self.tracer.span("request"):
+            with self.tracer.span("authorize"):
+                pass
+        spans = self.tracer.end_trace()
+        self.assertEqual([span.name for span in spans], ["request", "authorize"])
+        self.assertEqual(spans[1].parent_id, spans[0].span_id)
+        self.exporter.export.assert_called_once_with("request-id", spans)
+
+    def test_no_span_outside_a_trace(self):
+        with self.tracer.span("orphan") as span:
+            self.assertIsNone(span)
+        self.assertEqual(self.tracer.end_trace(), [])
+        self.exporter.export.assert_not_called()
+
+    def test_span_records_error(self):
+        self.tracer.start_trace("request-id")
+        with self.assertRaises(ValueError):
+            with self.tracer.span("process"):
+                raise ValueError("bad")
+        self.assertEqual(self.tracer.end_trace()[0].error, "ValueError: bad")
+
+    def test_wrap_task_records_queue_wait(self):
+        self.tracer.start_trace("request-id")
+        with self.tracer.span("put_alarms") as parent, \
+                concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            futures = [executor.submit(self.tracer.wrap_task("put_alarm", lambda x: x * 2), x)
+                       for x in range(3)]
+            self.assertEqual([future.result() for future in futures], [0, 2, 4])
+        tasks = [span for span in self.tracer.end_trace() if span.name == "put_alarm"]
+        self.assertEqual(len(tasks), 3)
+        for span in tasks:
+            self.assertEqual(span.parent_id, parent.span_id)
+            self.assertIn("queue_wait_ms", span.attributes)
+            self.assertIn("run_ms", span.attributes)
+
+    def test_interleaved_asyncio_tasks_nested_apart(self):
+        async def host(name):
+            with self.tracer.span("host", hostname=name) as host_span:
+                await asyncio.sleep(0)
+                with self.tracer.span("put_alarms") as put_span:
+                    await asyncio.sleep(0)
+                return host_span, put_span
+
+        async def hosts():
+            return await asyncio.gather(host("host1"), host("host2"))
+
+        self.tracer.start_trace("request-id")
+        with self.tracer.span("request") as request:
+            results = run_coroutine(hosts())
+        self.tracer.end_trace()
+        for host_span, put_span in results:
+            self.assertEqual(host_span.parent_id, request.span_id)
+            self.assertEqual(put_span.parent_id, host_span.span_id)
+
+    def test_summary(self):
+        self.tracer.start_trace("request-id")
+        for _ in range(2):
+            with self.tracer.span("cloudwatch.PutMetricAlarm"):
+                pass
+        self.assertEqual(self.tracer.summary()["cloudwatch.PutMetricAlarm"]["count"], 2)
+
+    def test_pooled_client_operations_traced(self):
+        pool = Boto3ClientPool(rate_limiter=None, tracer=self.tracer)
+        client = pool.get_client("cloudwatch", "us-east-1",
+                                 {"AccessKeyId": "mock", "SecretAccessKey": "mock"}, "account")
+        self.tracer.start_trace("request-id")
+        with Stubber(client) as stubber:
+            stubber.add_response("describe_alarms", {"MetricAlarms": []})
+            stubber.add_client_error("delete_alarms", "ResourceNotFound")
+            with self.tracer.span("process"):
+                client.describe_alarms(AlarmNames=["alarm"])
+                with self.assertRaises(client.exceptions.ResourceNotFound):
+                    client.delete_alarms(AlarmNames=["alarm"])
+        spans = {span.name: span for span in self.tracer.end_trace()}
+        self.assertEqual(spans["cloudwatch.DescribeAlarms"].parent_id, spans["process"].span_id)
+        self.assertIn("ResourceNotFound", spans["cloudwatch.DeleteAlarms"].error)
+
+
+class TestExporters(unittest.TestCase):
+    def test_default_exporter(self):
+        with patch.dict(os.environ, {}, clear=True), \
+                patch("sls.utils.tracing.TRACE_EXPORTER", ""):
+            self.assertIsNone(get_default_exporter())
+        with patch("sls.utils.tracing.TRACE_EXPORTER", "json"):
+            self.assertIsInstance(get_default_exporter(), JsonFileExporter)
+
+    def test_json_file_exporter(self):
+        tracer = Tracer(MagicMock())
+        tracer.start_trace("request-id")
+        with tracer.span("request"):
+            pass
+        spans = tracer.end_trace()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            JsonFileExporter(path).export("request-id", spans)
+            with open(path) as trace_file:
+                record = json.loads(trace_file.readline())
+        self.assertEqual(record["trace_id"], "request-id")
+        self.assertEqual(record["spans"][0]["name"], "request")
+
+    def test_xray_exporter(self):
+        recorder = MagicMock()
+        tracer = Tracer(XRayExporter(recorder))
+        tracer.start_trace("request-id")
+        with tracer.span("sns_lookup"):
+            pass
+        span = tracer.end_trace()[0]
+        recorder.begin_subsegment.assert_called_once_with("sns_lookup")
+        self.assertEqual(recorder.begin_subsegment.return_value.start_time, span.start)
+        recorder.end_subsegment.assert_called_once_with(span.end)
+
+    def test_xray_exporter_nests_subsegments(self):
+        recorder = MagicMock()
+        tracer = Tracer(XRayExporter(recorder))
+        tracer.start_trace("request-id")
+        with tracer.span("put_alarms"), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(tracer.wrap_task("put_alarm", lambda: None)).result()
+        with tracer.span("wait_for_alarms"):
+            pass
+        tracer.end_trace()
+        self.assertEqual([call[0] for call in recorder.method_calls
+                          if call[0] in ("begin_subsegment", "end_subsegment")],
+                         ["begin_subsegment", "begin_subsegment", "end_subsegment",
+                          "end_subsegment", "begin_subsegment", "end_subsegment"])
+        self.assertEqual([call.args[0] for call in recorder.begin_subsegment.call_args_list],
+                         ["put_alarms", "put_alarm", "wait_for_alarms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
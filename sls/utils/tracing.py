@@ -0,0 +1,388 @@
+"""
+Module to record per-request spans around the stages, AWS calls and vpcxiam calls
+of an api request, exported to X-Ray in Lambda or, when TRACE_EXPORTER=json, to a local
+JSON trace file
+"""
+# pylint: disable=broad-except, import-error
+import contextlib
+import functools
+import importlib.util
+import itertools
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import contextvars
+except ImportError:  # python 3.6
+    contextvars = None
+
+lgr = logging.getLogger()
+
+# Set to "off" to disable span recording
+TRACING = os.environ.get("TRACING", "on")
+# xray, json or none. Default: xray in Lambda when aws_xray_sdk is installed, else none
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "")
+# JSON lines file the offline traces are appended to
+TRACE_FILE = os.environ.get("TRACE_FILE",
+                            os.path.join(tempfile.gettempdir(), "ec2-alarms-traces.jsonl"))
+
+
+class Span:
+    """
+    Timed operation of a trace. Executor tasks also record the seconds spent queued.
+    """
+
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "thread", "attributes",
+                 "error")
+
+    def __init__(self, span_id, parent_id, name, start, attributes=None):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def duration(self):
+        """
+        Returns:
+            float: seconds between start and end, None while the span is open
+        """
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON serializable span
+        """
+        return {"id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start": self.start, "end": self.end,
+                "duration_ms": None if self.end is None else round(self.duration * 1000, 3),
+                "thread": self.thread, "attributes": self.attributes, "error": self.error}
+
+
+class JsonFileExporter:
+    """
+    Append each trace as one JSON line to a file
+    """
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+
+    def export(self, trace_id, spans):
+        """
+        Args:
+            trace_id: id of the request
+            spans: finished Span list
+        """
+        record = {"trace_id": trace_id, "spans": [span.to_dict() for span in spans]}
+        with open(self.path, "a") as trace_file:
+            trace_file.write(json.dumps(record, default=str) + "\n")
+
+
+class XRayExporter:
+    """
+    Record the spans as subsegments of the current X-Ray segment, the Lambda
+    function segment when tracing is enabled in serverless.yml. The subsegments are
+    nested as the spans: stage, then its AWS calls and executor tasks.
+    """
+
+    def __init__(self, recorder=None):
+        """
+        Args:
+            recorder: X-Ray recorder, aws_xray_sdk.core.xray_recorder when None. The sdk
+                      is imported on the first export to keep it off the cold start.
+        """
+        self._recorder = recorder
+
+    @property
+    def recorder(self):
+        """
+        X-Ray recorder the subsegments are recorded with
+        """
+        if self._recorder is None:
+            from aws_xray_sdk.core import xray_recorder
+            self._recorder = xray_recorder
+        return self._recorder
+
+    def export(self, trace_id, spans):
+        """
+        Args:
+            trace_id: id of the request
+            spans: finished Span list
+        """
+        span_ids = {span.span_id for span in spans}
+        children = collections.defaultdict(list)
+        for span in sorted(spans, key=lambda item: item.start):
+            # Spans whose parent did not finish are recorded at the top level
+            children[span.parent_id if span.parent_id in span_ids else None].append(span)
+        for span in children[None]:
+            if not self._record(trace_id, span, children):
+                return
+
+    def _record(self, trace_id, span, children):
+        """
+        Record a span then its children inside its subsegment
+
+        Returns:
+            bool: False when there is no segment to record the subsegments in
+        """
+        subsegment = self.recorder.begin_subsegment(span.name)
+        if subsegment is None:
+            return False
+        subsegment.start_time = span.start
+        subsegment.put_annotation("request_id", str(trace_id))
+        for key, value in span.attributes.items():
+            subsegment.put_metadata(key, value)
+        if span.error:
+            subsegment.put_metadata("error", span.error)
+        for child in children[span.span_id]:
+            self._record(trace_id, child, children)
+        self.recorder.end_subsegment(span.end)
+        return True
+
+
+class ThreadLocalVar:
+    """
+    threading.local stand-in of contextvars.ContextVar for python 3.6, where asyncio tasks
+    do not have their own context
+    """
+
+    def __init__(self, default):
+        self._default = default
+        self._local = threading.local()
+
+    def get(self):
+        """
+        Returns:
+            value set in the current thread, the default when none was set
+        """
+        return getattr(self._local, "value", self._default)
+
+    def set(self, value):
+        """
+        Set the value of the current thread
+        """
+        self._local.value = value
+
+
+def get_default_exporter():
+    """
+    Returns:
+        exporter selected by TRACE_EXPORTER, None when traces are not exported
+    """
+    exporter = TRACE_EXPORTER.lower()
+    if not exporter:
+        exporter = "xray" if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") else "none"
+    if exporter == "xray":
+        if importlib.util.find_spec("aws_xray_sdk") is None:
+            lgr.info("aws_xray_sdk is not installed, traces are not exported")
+            return None
+        return XRayExporter()
+    if exporter == "json":
+        return JsonFileExporter()
+    return None
+
+
+class Tracer:
+    """
+    Collect the spans of the current request. Spans are nested under the span opened last
+    in the same context: each thread and each asyncio task has its own stack of open
+    spans, so the coroutines of several hosts interleaved on one thread do not nest under
+    each other. Tasks submitted to an executor with wrap_task are nested under the span
+    of the submitter.
+    """
+
+    def __init__(self, exporter=None, enabled=TRACING != "off", clock=time.time):
+        """
+        Args:
+            exporter: object with export(trace_id, spans), see get_default_exporter
+            enabled: False to make every span a no-op
+            clock: callable returning epoch seconds
+        """
+        self.exporter = exporter
+        self.enabled = enabled
+        self.clock = clock
+        self.trace_id = None
+        self._spans = []
+        self._ids = itertools.count(1)
+        # Open spans of the context as a tuple, copied on change so that the asyncio tasks
+        # inheriting a stack do not share it
+        self._stack = contextvars.ContextVar(f"trace_stack_{id(self)}", default=()) \
+            if contextvars is not None else ThreadLocalVar(())
+        self._lock = threading.Lock()
+
+    def start_trace(self, trace_id):
+        """
+        Drop the spans of the previous request and start collecting for a new one
+        """
+        with self._lock:
+            self.trace_id = trace_id
+            self._spans = []
+        self._stack.set(())
+
+    def end_trace(self):
+        """
+        Export the spans of the current request
+
+        Returns:
+            list: finished spans of the request
+        """
+        with self._lock:
+            spans = [span for span in self._spans if span.end is not None]
+            trace_id, self.trace_id, self._spans = self.trace_id, None, []
+        if spans and self.exporter is not None:
+            try:
+                self.exporter.export(trace_id, spans)
+            except Exception as error:
+                lgr.error(f"Trace {trace_id} not exported: {error}")
+        return spans
+
+    def start_span(self, name, parent_id=None, start=None, **attributes):
+        """
+        Open a span nested under parent_id, or under the current span of the thread
+
+        Returns:
+            Span: the open span, None when tracing is disabled or no trace is started
+        """
+        if not self.enabled or self.trace_id is None:
+            return None
+        stack = self._stack.get()
+        if parent_id is None and stack:
+            parent_id = stack[-1].span_id
+        span = Span(next(self._ids), parent_id, name,
+                    self.clock() if start is None else start, attributes)
+        self._stack.set(stack + (span,))
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    def finish_span(self, span, error=None):
+        """
+        Close a span opened with start_span
+        """
+        if span is None:
+            return
+        span.end = self.clock()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        stack = self._stack.get()
+        if span in stack:
+            self._stack.set(tuple(item for item in stack if item is not span))
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        """
+        Context manager timing its block. Ex: with TRACER.span("instance_lookup"): ...
+        """
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as error:
+            self.finish_span(span, error)
+            raise
+        self.finish_span(span)
+
+    def wrap_task(self, name, func):
+        """
+        Wrap a callable submitted to an executor, the span of the task records the seconds
+        between the submission and the start of the task as queue_wait_ms
+
+        Args:
+            name: span name of the task
+            func: callable run by the executor
+
+        Returns:
+            callable with the signature of func
+        """
+        if not self.enabled or self.trace_id is None:
+            return func
+        stack = self._stack.get()
+        parent_id = stack[-1].span_id if stack else None
+        submitted = self.clock()
+
+        @functools.wraps(func)
+        def task(*args, **kwargs):
+            started = self.clock()
+            span = self.start_span(name, parent_id=parent_id, start=submitted,
+                                   queue_wait_ms=round((started - submitted) * 1000, 3))
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as error:
+                self.finish_span(span, error)
+                raise
+            span.attributes["run_ms"] = round((self.clock() - started) * 1000, 3)
+            self.finish_span(span)
+            return result
+        return task
+
+    def register(self, events, service_name):
+        """
+        Time every operation of a boto3 client. Retries and rate limiter waits are
+        included in the span of the operation.
+
+        Args:
+            events: client.meta.events of a boto3 client
+            service_name: boto3 service name. Ex: cloudwatch
+        """
+        events.register_first("before-call.*.*",
+                              functools.partial(self._before_call, service_name))
+        events.register("after-call", self._after_call)
+        events.register("after-call-error", self._after_call_error)
+
+    def summary(self):
+        """
+        Returns:
+            dict: total milliseconds and count of the finished spans by name
+        """
+        totals = {}
+        with self._lock:
+            spans = list(self._spans)
+        for span in spans:
+            if span.end is None:
+                continue
+            total = totals.setdefault(span.name, {"ms": 0.0, "count": 0})
+            total["ms"] = round(total["ms"] + span.duration * 1000, 3)
+            total["count"] += 1
+        return totals
+
+    def traced(self, name):
+        """
+        Decorator recording a span around each call of the function
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _before_call(self, service_name, model=None, context=None, **kwargs):
+        if context is not None:
+            context["trace_span"] = self.start_span(f"{service_name}.{model.name}")
+
+    def _after_call(self, parsed=None, context=None, **kwargs):
+        if context is None:
+            return
+        span = context.pop("trace_span", None)
+        self.finish_span(span)
+        error = (parsed or {}).get("Error")
+        if span is not None and error:
+            span.error = f"{error.get('Code')}: {error.get('Message')}"
+
+    def _after_call_error(self, exception=None, context=None, **kwargs):
+        if context is not None:
+            self.finish_span(context.pop("trace_span", None), exception)
+
+
+TRACER = Tracer(get_default_exporter())
+traced = TRACER.traced